@@ -0,0 +1,36 @@
+import numpy as np
+
+def score_all(student_matrix, event_matrix, event_norms, top_n):
+    # Sparse students x events product for binary tag rows, done through the
+    # event postings: every (student, tag) pair expands to the events holding
+    # that tag, and counting equal (student, event) pairs gives the overlap.
+    # Returns (student_rows, event_rows, scores) holding each student's top_n
+    # events by cosine, best first; ties keep event order like recommend().
+    n_events = event_matrix.shape[0]
+    col_indptr, col_rows = event_matrix.postings()
+
+    s_rows = student_matrix.row_ids
+    cols = student_matrix.indices
+    starts = col_indptr[cols]
+    lens = col_indptr[cols + 1] - starts
+    total = int(lens.sum())
+    if total == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+
+    ends = np.cumsum(lens)
+    offsets = np.arange(total) - np.repeat(ends - lens, lens)
+    e_rows = col_rows[np.repeat(starts, lens) + offsets]
+    keys = np.repeat(s_rows.astype(np.int64), lens) * n_events + e_rows
+
+    pairs, overlap = np.unique(keys, return_counts=True)
+    students = pairs // n_events
+    events = pairs % n_events
+    scores = overlap / (student_matrix.row_norms()[students] * event_norms[events])
+
+    # order by student, then score desc, then event row; keep top_n per student
+    order = np.lexsort((events, -scores, students))
+    students, events, scores = students[order], events[order], scores[order]
+    group_start = np.searchsorted(students, students, side="left")
+    keep = (np.arange(len(students)) - group_start) < top_n
+    return students[keep], events[keep], scores[keep]
@@ -0,0 +1,135 @@
+import numpy as np
+
+# co-occurring (event, event) pairs materialized at once while building;
+# students are processed in chunks below this, so build memory stays flat
+CHUNK_PAIRS = 2_000_000
+
+
+class ItemNeighbors:
+    # Top-N item-item neighbours, CSR by event row: event_ids[i]'s neighbours
+    # are rows neighbors[indptr[i]:indptr[i + 1]] (int32, into event_ids)
+    # with float32 cosine weights, best first
+    def __init__(self, event_ids, indptr, neighbors, weights):
+        self.event_ids = event_ids
+        self.indptr = indptr
+        self.neighbors = neighbors
+        self.weights = weights
+
+    @property
+    def nbytes(self):
+        return (self.event_ids.nbytes + self.indptr.nbytes
+                + self.neighbors.nbytes + self.weights.nbytes)
+
+    def rows_of(self, event_ids):
+        # rows of the given event ids, unknown ids dropped
+        event_ids = np.asarray(event_ids, dtype=np.int64)
+        if len(self.event_ids) == 0:
+            return np.array([], dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.event_ids, event_ids), len(self.event_ids) - 1)
+        return np.unique(rows[self.event_ids[rows] == event_ids])
+
+    def score(self, history):
+        # Sparse dot product of a student's RSVP history (event ids, as a 0/1
+        # vector) with the neighbour matrix: each event scores the sum of its
+        # similarity to the events in the history. The history itself is
+        # left out. -> (event_ids, scores), ordered by event id.
+        rows = self.rows_of(history)
+        starts = self.indptr[rows]
+        lens = self.indptr[rows + 1] - starts
+        total = int(lens.sum())
+        if total == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+
+        ends = np.cumsum(lens)
+        picks = np.repeat(starts, lens) + np.arange(total) - np.repeat(ends - lens, lens)
+        hit, inverse = np.unique(self.neighbors[picks], return_inverse=True)
+        scores = np.bincount(inverse, weights=self.weights[picks])
+
+        fresh = ~np.isin(hit, rows)
+        return self.event_ids[hit[fresh]], scores[fresh]
+
+
+def _pairs(e_rows, indptr, n_events):
+    # every ordered pair of distinct events RSVPed by the same student, as
+    # a * n_events + b keys; e_rows is grouped by student along indptr
+    degree = np.diff(indptr)
+    lens = np.repeat(degree, degree)
+    starts = np.repeat(indptr[:-1], degree)
+    total = int(lens.sum())
+    ends = np.cumsum(lens)
+    a = np.repeat(e_rows, lens)
+    b = e_rows[np.repeat(starts, lens) + np.arange(total) - np.repeat(ends - lens, lens)]
+    keep = a != b
+    return a[keep].astype(np.int64) * n_events + b[keep]
+
+
+def build_neighbors(student_ids, event_ids, top_n=20, chunk_pairs=CHUNK_PAIRS):
+    # (student_id, event_id) pairs, one per RSVP -> ItemNeighbors. Cosine on
+    # the binary student x event matrix: co-RSVPs / sqrt(|a| * |b|).
+    student_ids = np.asarray(student_ids, dtype=np.int64)
+    event_ids = np.asarray(event_ids, dtype=np.int64)
+    events, e_rows = np.unique(event_ids, return_inverse=True)
+    students, s_rows = np.unique(student_ids, return_inverse=True)
+    n_events = len(events)
+    if n_events == 0:
+        return ItemNeighbors(
+            events, np.zeros(1, dtype=np.int64),
+            np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+        )
+
+    # student x event CSR, duplicate pairs dropped
+    keys = np.unique(s_rows.astype(np.int64) * n_events + e_rows)
+    s_rows, e_rows = keys // n_events, (keys % n_events).astype(np.int32)
+    indptr = np.zeros(len(students) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(s_rows, minlength=len(students)))
+    item_norms = np.sqrt(np.bincount(e_rows, minlength=n_events).astype(np.float64))
+
+    # co-occurrence counts, a chunk of students at a time; each chunk is
+    # reduced to distinct pairs before the next one is expanded
+    expanded = np.cumsum(np.diff(indptr) ** 2)
+    pair_keys, pair_counts, start = [], [], 0
+    while start < len(students):
+        done = expanded[start - 1] if start else 0
+        stop = max(int(np.searchsorted(expanded, done + chunk_pairs, side="right")), start + 1)
+        chunk = indptr[start:stop + 1]
+        keys, counts = np.unique(
+            _pairs(e_rows[chunk[0]:chunk[-1]], chunk - chunk[0], n_events),
+            return_counts=True
+        )
+        pair_keys.append(keys)
+        pair_counts.append(counts)
+        start = stop
+
+    if pair_keys:
+        keys, inverse = np.unique(np.concatenate(pair_keys), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(pair_counts))
+    else:
+        keys, counts = np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    a, b = keys // n_events, keys % n_events
+    weights = counts / (item_norms[a] * item_norms[b])
+
+    # keep the top_n per event: order by event, weight desc, neighbour row
+    order = np.lexsort((b, -weights, a))
+    a, b, weights = a[order], b[order], weights[order]
+    keep = (np.arange(len(a)) - np.searchsorted(a, a, side="left")) < top_n
+    a, b, weights = a[keep], b[keep], weights[keep]
+
+    row_ptr = np.zeros(n_events + 1, dtype=np.int64)
+    row_ptr[1:] = np.cumsum(np.bincount(a, minlength=n_events))
+    return ItemNeighbors(
+        events, row_ptr, b.astype(np.int32), weights.astype(np.float32)
+    )
+
+
+def blend(rows, content, cf_rows, cf_scores, weight):
+    # Union of two sparse score vectors over the same rows, both sorted by
+    # row: (1 - weight) * content + weight * cf, with cf scaled to [0, 1]
+    # by its best score. -> (rows, scores), still sorted by row.
+    union = np.union1d(rows, cf_rows)
+    scores = np.zeros(len(union))
+    scores[np.searchsorted(union, rows)] = (1 - weight) * content
+    if len(cf_scores):
+        peak = cf_scores.max()
+        if peak > 0:
+            scores[np.searchsorted(union, cf_rows)] += weight * cf_scores / peak
+    return union, scores
@@ -0,0 +1,352 @@
+import datetime
+import threading
+import time
+import numpy as np
+from ai.vectorizer import TagVectorizer, SparseTagMatrix
+from ai.recommender import EventRecommender
+from ai.ranker import day_number
+from ai.collaborative import ItemNeighbors, blend
+from ai.utils import top_k_indices
+
+# ItemNeighbors fields, stored as cf_<name> in a snapshot
+CF_ARRAYS = ("event_ids", "indptr", "neighbors", "weights")
+
+
+class _IndexState:
+    # immutable snapshot of the matrix side of the index (popularity is the
+    # one array patched in place, by add_rsvp). Rows are events sorted by
+    # event_id; all arrays may be read-only memory maps.
+    def __init__(self, recommender, tag_ids, event_ids, titles, matrix, norms,
+                 days, popularity):
+        self.recommender = recommender
+        self.tag_ids = tag_ids
+        self.event_ids = event_ids
+        self.titles = titles
+        self.matrix = matrix
+        self.norms = norms
+        self.days = days
+        self.popularity = popularity
+
+    def row(self, event_id):
+        i = int(np.searchsorted(self.event_ids, event_id))
+        if i < len(self.event_ids) and self.event_ids[i] == event_id:
+            return i
+        return None
+
+
+def _date_of(day):
+    # inverse of ai.ranker.day_number
+    return None if np.isnan(day) else datetime.date.fromordinal(int(day))
+
+
+class RecommendationIndex:
+    # Long-lived, in-memory copy of the event/tag data used by /ai/recommend.
+    # Writes patch the per-event table; the sparse matrix is rebuilt from
+    # memory (never from the DB) on the first read after a write.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tag_ids = set()
+        # event_id -> {"title", "tag_ids", "event_date", "popularity"};
+        # None while the index only holds the arrays of a snapshot
+        self._events = {}
+        self._loaded = False
+        self._state = None  # _IndexState, None = stale
+        self.snapshot_version = None
+        # ai.collaborative.ItemNeighbors, replaced whole by set_neighbors
+        self._neighbors = None
+        self._neighbors_built = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    @property
+    def neighbors(self):
+        return self._neighbors
+
+    def neighbors_age(self):
+        # seconds since set_neighbors, None if never set
+        if self._neighbors_built is None:
+            return None
+        return time.monotonic() - self._neighbors_built
+
+    def set_neighbors(self, neighbors):
+        # built off-line from rsvps; swapped in without touching the matrix
+        with self._lock:
+            self._neighbors = neighbors
+            self._neighbors_built = time.monotonic()
+
+    def load(self, tag_ids, events):
+        with self._lock:
+            self._tag_ids = set(tag_ids)
+            self._events = {
+                e["event_id"]: {
+                    "title": e["title"],
+                    "tag_ids": set(e["tag_ids"]),
+                    "event_date": e.get("event_date"),
+                    "popularity": e.get("popularity", 0)
+                }
+                for e in events
+            }
+            self._tag_ids.update(*(e["tag_ids"] for e in self._events.values()))
+            self._loaded = True
+            self._state = None
+            self.snapshot_version = None
+
+    def reset(self):
+        with self._lock:
+            self._tag_ids = set()
+            self._events = {}
+            self._loaded = False
+            self._state = None
+            self._neighbors = None
+            self._neighbors_built = None
+            self.snapshot_version = None
+
+    # ---------- snapshots (ai.snapshot) ----------
+
+    def snapshot_arrays(self):
+        # name -> array for ai.snapshot.publish
+        state = self._current_state()
+        col_indptr, col_rows = state.matrix.postings()
+        arrays = {
+            "tag_ids": state.tag_ids,
+            "event_ids": state.event_ids,
+            "titles": np.array(state.titles, dtype=str),
+            "days": state.days,
+            "popularity": state.popularity,
+            "indptr": state.matrix.indptr,
+            "indices": state.matrix.indices,
+            "row_ids": state.matrix.row_ids,
+            "norms": state.norms,
+            "col_indptr": col_indptr,
+            "col_rows": col_rows
+        }
+        neighbors = self._neighbors
+        if neighbors is not None:
+            arrays.update(
+                (f"cf_{name}", getattr(neighbors, name)) for name in CF_ARRAYS
+            )
+        return arrays
+
+    def load_snapshot(self, version, arrays):
+        # Serve straight from the (memory-mapped) arrays of ai.snapshot.load:
+        # nothing is rebuilt and nothing is read from the DB. Only
+        # popularity is copied, since add_rsvp patches it.
+        tag_ids = arrays["tag_ids"]
+        recommender = EventRecommender(TagVectorizer(tag_ids.tolist(), sparse=True))
+        matrix = SparseTagMatrix(
+            arrays["indptr"], arrays["indices"], len(tag_ids),
+            row_ids=arrays["row_ids"],
+            postings=(arrays["col_indptr"], arrays["col_rows"])
+        )
+        state = _IndexState(
+            recommender, tag_ids, arrays["event_ids"], arrays["titles"], matrix,
+            arrays["norms"], arrays["days"], np.array(arrays["popularity"])
+        )
+        neighbors = None
+        if "cf_indptr" in arrays:
+            neighbors = ItemNeighbors(*(arrays[f"cf_{name}"] for name in CF_ARRAYS))
+
+        with self._lock:
+            self._tag_ids = set(tag_ids.tolist())
+            self._events = None
+            self._state = state
+            self._loaded = True
+            self._neighbors = neighbors
+            self._neighbors_built = time.monotonic() if neighbors is not None else None
+            self.snapshot_version = version
+
+    def _materialize(self):
+        # first write after a snapshot load: rebuild the per-event table the
+        # incremental updates patch (the next read rebuilds private arrays)
+        if self._events is not None:
+            return
+        state = self._state
+        self._events = {
+            int(event_id): {
+                "title": str(state.titles[i]),
+                "tag_ids": set(state.tag_ids[state.matrix.row(i)].tolist()),
+                "event_date": _date_of(state.days[i]),
+                "popularity": int(state.popularity[i])
+            }
+            for i, event_id in enumerate(state.event_ids)
+        }
+
+    # ---------- incremental updates ----------
+
+    def add_tags(self, tag_ids):
+        with self._lock:
+            new = set(tag_ids) - self._tag_ids
+            if new:
+                self._materialize()
+                self._tag_ids |= new
+                self._state = None
+
+    def upsert_event(self, event_id, title, tag_ids=(), event_date=None):
+        tag_ids = set(tag_ids)
+        with self._lock:
+            self._materialize()
+            previous = self._events.get(event_id, {})
+            self._events[event_id] = {
+                "title": title,
+                "tag_ids": tag_ids,
+                "event_date": event_date,
+                "popularity": previous.get("popularity", 0)
+            }
+            self._tag_ids |= tag_ids
+            self._state = None
+
+    def update_event(self, event_id, title, event_date=None):
+        with self._lock:
+            self._materialize()
+            event = self._events.get(event_id)
+            if event is None:
+                return
+            event["title"] = title
+            event["event_date"] = event_date
+            self._state = None
+
+    def add_event_tag(self, event_id, tag_id):
+        with self._lock:
+            self._materialize()
+            event = self._events.get(event_id)
+            if event is None:
+                return
+            event["tag_ids"].add(tag_id)
+            self._tag_ids.add(tag_id)
+            self._state = None
+
+    def set_event_tags(self, event_id, tag_ids):
+        tag_ids = set(tag_ids)
+        with self._lock:
+            self._materialize()
+            event = self._events.get(event_id)
+            if event is None:
+                return
+            event["tag_ids"] = tag_ids
+            self._tag_ids |= tag_ids
+            self._state = None
+
+    def remove_event(self, event_id):
+        with self._lock:
+            self._materialize()
+            if self._events.pop(event_id, None) is not None:
+                self._state = None
+
+    def add_rsvp(self, event_id, delta=1):
+        # popularity only: patched in place, no matrix rebuild
+        with self._lock:
+            if self._events is not None:
+                event = self._events.get(event_id)
+                if event is None:
+                    return
+                event["popularity"] += delta
+            state = self._state
+            row = None if state is None else state.row(event_id)
+            if row is not None:
+                state.popularity[row] += delta
+
+    def set_popularity(self, event_ids, counts):
+        # absolute RSVP counts from the DB, which also hold other workers'
+        # RSVPs; events not listed keep theirs
+        with self._lock:
+            if self._events is not None:
+                for event_id, count in zip(event_ids, counts):
+                    event = self._events.get(event_id)
+                    if event is not None:
+                        event["popularity"] = count
+            state = self._state
+            if state is not None:
+                for event_id, count in zip(event_ids, counts):
+                    row = state.row(event_id)
+                    if row is not None:
+                        state.popularity[row] = count
+
+    def event_tag_ids(self, event_id):
+        with self._lock:
+            if self._events is None:
+                row = self._state.row(event_id)
+                if row is None:
+                    return set()
+                return set(self._state.tag_ids[self._state.matrix.row(row)].tolist())
+            event = self._events.get(event_id)
+            return set(event["tag_ids"]) if event else set()
+
+    # ---------- scoring ----------
+
+    def _current_state(self):
+        with self._lock:
+            if self._state is None:
+                # ordered by event_id like the old GROUP BY query; untagged
+                # events have empty rows, so tag scoring never reaches them
+                # but collaborative scores can
+                rows = [
+                    {"event_id": eid, "title": e["title"], "tag_ids": e["tag_ids"]}
+                    for eid, e in sorted(self._events.items())
+                ]
+                vectorizer = TagVectorizer(self._tag_ids, sparse=True)
+                recommender = EventRecommender(vectorizer)
+                matrix, norms = recommender.build_matrix(rows)
+                events = [self._events[r["event_id"]] for r in rows]
+                self._state = _IndexState(
+                    recommender,
+                    np.array(sorted(self._tag_ids), dtype=np.int64),
+                    np.array([r["event_id"] for r in rows], dtype=np.int64),
+                    [r["title"] for r in rows],
+                    matrix, norms,
+                    np.array([day_number(e["event_date"]) for e in events], dtype=np.float64),
+                    np.array([e["popularity"] for e in events], dtype=np.int64)
+                )
+            return self._state
+
+    def recommend(self, student_tag_ids, top_k=None, stats=None, ranker=None,
+                  today=None, history=None, cf_weight=0.0):
+        # only events sharing a tag with the student are scored, so every
+        # returned score is > 0. stats (optional dict) gets the candidate
+        # count and the number of results there would be without top_k.
+        # With a ranker (ai.ranker.HybridRanker) the score is the blended one
+        # and events before `today` are left out.
+        # history (event ids the student RSVPed) adds the events similar to
+        # them by co-RSVPs, weighted cf_weight against the tag cosine; a
+        # student without tags gets collaborative scores only.
+        state = self._current_state()
+        candidates, scores = state.recommender.score_candidates(
+            student_tag_ids, state.matrix, state.norms
+        )
+
+        neighbors = self._neighbors
+        if history and cf_weight > 0 and neighbors is not None:
+            cf_ids, cf_scores = neighbors.score(history)
+            cf_rows = np.searchsorted(state.event_ids, cf_ids)
+            known = cf_rows < len(state.event_ids)
+            known[known] = state.event_ids[cf_rows[known]] == cf_ids[known]
+            candidates, scores = blend(
+                candidates, scores, cf_rows[known], cf_scores[known],
+                cf_weight if len(student_tag_ids) else 1.0
+            )
+
+        if ranker is None:
+            total = len(candidates)
+            order = top_k_indices(scores, top_k)
+            scores = scores[order]
+        else:
+            today = today or datetime.date.today()
+            days_until = state.days[candidates] - today.toordinal()
+            total = len(ranker.eligible(days_until))
+            order, scores = ranker.rank(
+                scores, state.popularity[candidates], days_until, top_k
+            )
+
+        if stats is not None:
+            stats["candidates"] = len(candidates)
+            stats["total"] = total
+
+        return [
+            {
+                "event_id": int(state.event_ids[candidates[i]]),
+                "title": str(state.titles[candidates[i]]),
+                "score": float(score)
+            }
+            for i, score in zip(order, scores)
+        ]
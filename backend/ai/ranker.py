@@ -0,0 +1,53 @@
+import datetime
+import numpy as np
+from ai.utils import top_k_indices
+
+def day_number(value):
+    # date / datetime / "YYYY-MM-DD" -> proleptic ordinal, None -> nan
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return float(value.toordinal())
+
+
+class HybridRanker:
+    # Blends tag cosine with log-scaled popularity and a time decay on the
+    # event date. Works on whole candidate arrays at once; past events are
+    # dropped, undated events get no recency boost.
+    def __init__(self, w_similarity=1.0, w_popularity=0.3, w_recency=0.3,
+                 half_life_days=14.0):
+        self.w_similarity = w_similarity
+        self.w_popularity = w_popularity
+        self.w_recency = w_recency
+        self.half_life_days = half_life_days
+
+    def score(self, similarity, popularity, days_until):
+        log_pop = np.log1p(popularity)
+        peak = log_pop.max() if len(log_pop) else 0.0
+        pop = log_pop / peak if peak > 0 else np.zeros_like(log_pop)
+
+        recency = np.zeros(len(days_until))
+        dated = ~np.isnan(days_until)
+        recency[dated] = 0.5 ** (np.maximum(days_until[dated], 0) / self.half_life_days)
+
+        return (
+            self.w_similarity * similarity
+            + self.w_popularity * pop
+            + self.w_recency * recency
+        )
+
+    def eligible(self, days_until):
+        # indices of events that may be ranked (not in the past)
+        return np.flatnonzero(~(days_until < 0))
+
+    def rank(self, similarity, popularity, days_until, top_k=None):
+        # -> (indices into the inputs, combined scores), best first
+        upcoming = self.eligible(days_until)
+        combined = self.score(
+            similarity[upcoming], popularity[upcoming], days_until[upcoming]
+        )
+        order = top_k_indices(combined, top_k)
+        return upcoming[order], combined[order]
@@ -1,4 +1,5 @@
 import numpy as np
+from ai.utils import top_k_indices
 
 class EventRecommender:
     def __init__(self, vectorizer):
@@ -9,19 +10,53 @@ class EventRecommender:
             return 0.0
         return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
 
-    def recommend(self, student_tag_ids, events):
-        student_vec = self.vectorizer.vectorize(student_tag_ids)
+    def build_matrix(self, events):
+        # event x tag matrix plus row norms, computed once for all events
+        matrix = self.vectorizer.vectorize_many([e["tag_ids"] for e in events])
+        if self.vectorizer.sparse:
+            norms = matrix.row_norms()
+        else:
+            norms = np.linalg.norm(matrix, axis=1)
+        return matrix, norms
 
-        scored = []
-        for event in events:
-            event_vec = self.vectorizer.vectorize(event["tag_ids"])
-            score = self.cosine_similarity(student_vec, event_vec)
+    def score(self, student_tag_ids, matrix, norms):
+        if self.vectorizer.sparse:
+            student_cols = self.vectorizer.indices(student_tag_ids)
+            student_norm = np.sqrt(float(len(student_cols)))
+        else:
+            student_vec = self.vectorizer.vectorize(student_tag_ids)
+            student_norm = np.linalg.norm(student_vec)
 
-            scored.append({
-                "event_id": event["event_id"],
-                "title": event["title"],
-                "score": score
-            })
+        scores = np.zeros(len(norms))
+        if student_norm == 0:
+            return scores
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
-        return scored
+        if self.vectorizer.sparse:
+            dots = matrix.overlap(student_cols)
+        else:
+            dots = matrix @ student_vec
+
+        nonzero = norms > 0
+        scores[nonzero] = dots[nonzero] / (student_norm * norms[nonzero])
+        return scores
+
+    def score_candidates(self, student_tag_ids, matrix, norms):
+        # sparse mode only: score just the events reachable through the
+        # student's tags (all others would score 0); rows come back sorted
+        student_cols = self.vectorizer.indices(student_tag_ids)
+        rows, overlap = matrix.candidates(student_cols)
+        student_norm = np.sqrt(float(len(student_cols)))
+        return rows, overlap / (student_norm * norms[rows])
+
+    def recommend(self, student_tag_ids, events, top_k=None):
+        matrix, norms = self.build_matrix(events)
+        scores = self.score(student_tag_ids, matrix, norms)
+
+        return [
+            {
+                "event_id": events[i]["event_id"],
+                "title": events[i]["title"],
+                "score": float(scores[i])
+            }
+            for i in top_k_indices(scores, top_k)
+        ]
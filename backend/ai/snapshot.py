@@ -0,0 +1,149 @@
+"""Versioned, memory-mappable snapshots of the recommendation index.
+
+A snapshot root holds one directory per published version and a CURRENT
+file naming the live one:
+
+    snapshots/
+        CURRENT                      "20261018T141205123456"
+        20261018T141205123456/
+            manifest.json            format, counts, dtype/shape per array
+            tag_ids.npy              vectorizer columns (sorted tag ids)
+            event_ids.npy, titles.npy, days.npy, popularity.npy
+            indptr.npy, indices.npy, row_ids.npy, norms.npy
+            col_indptr.npy, col_rows.npy          tag -> events postings
+            cf_*.npy                 collaborative neighbours, if built
+
+Arrays are plain .npy (no pickles) and are opened with
+np.load(mmap_mode="r"), so every worker on a host maps the same page-cache
+pages instead of rebuilding and holding its own copy. publish() writes a
+version into a temporary directory, renames it into place and only then
+replaces CURRENT (os.replace, atomic), so a reader sees either the old
+snapshot or the complete new one, never a partial write. Old versions are
+pruned; workers still mapping them keep their pages until they swap.
+Publishers serialize on a lock file in the root (publishing()), so workers
+that notice a stale snapshot together build one new version, not one each.
+"""
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+FORMAT = 1
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"
+LOCK = ".publish.lock"
+
+
+def current_version(root):
+    # name of the live version, None when nothing was published yet
+    try:
+        with open(os.path.join(root, CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def publishing(root, blocking=True):
+    # exclusive publisher lock for root, across processes; yields False
+    # when not blocking and another publisher holds it
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish(root, arrays, meta=None, keep=3):
+    # arrays: name -> ndarray; returns the new version name
+    os.makedirs(root, exist_ok=True)
+    version = datetime.datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    os.chmod(tmp, 0o755)    # mkdtemp's 0700 would hide it from other users
+    try:
+        manifest = {
+            "format": FORMAT,
+            "version": version,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            **(meta or {}),
+            "arrays": {}
+        }
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise ValueError(f"{name}: object arrays cannot be memory-mapped")
+            np.save(os.path.join(tmp, f"{name}.npy"), array, allow_pickle=False)
+            manifest["arrays"][name] = {
+                "dtype": array.dtype.str, "shape": list(array.shape)
+            }
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        _fsync_dir(tmp)
+        os.rename(tmp, os.path.join(root, version))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(root, f".{CURRENT}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(root, CURRENT))
+    _fsync_dir(root)
+
+    prune(root, keep)
+    return version
+
+
+def load(root, version=None):
+    # -> (manifest, name -> read-only memory-mapped array)
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"no snapshot published in {root}")
+    path = os.path.join(root, version)
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT:
+        raise ValueError(
+            f"snapshot {version} has format {manifest.get('format')}, expected {FORMAT}"
+        )
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"snapshot {version}: {name} does not match the manifest")
+        arrays[name] = array
+    return manifest, arrays
+
+
+def prune(root, keep=3):
+    # drop all but the newest `keep` versions; CURRENT's is always kept
+    live = current_version(root)
+    versions = sorted(
+        name for name in os.listdir(root)
+        if not name.startswith(".") and os.path.isdir(os.path.join(root, name))
+    )
+    for name in versions[:-keep] if keep else versions:
+        if name != live:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
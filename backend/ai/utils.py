@@ -6,3 +6,19 @@ def cosine_similarity(vec1, vec2):
     return np.dot(vec1, vec2) / (
         np.linalg.norm(vec1) * np.linalg.norm(vec2)
     )
+
+
+def top_k_indices(scores, k=None):
+    # indices of the k best scores, highest first; ties keep input order
+    # (same result as a stable descending sort, without sorting everything)
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - len(above)]
+    idx = np.concatenate([above, ties])
+    return idx[np.argsort(-scores[idx], kind="stable")]
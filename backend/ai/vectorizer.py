@@ -1,12 +1,88 @@
 import numpy as np
 
+class SparseTagMatrix:
+    # CSR layout for binary tag rows: row i owns indices[indptr[i]:indptr[i + 1]],
+    # sorted int32 column ids; the values are implicitly 1
+    def __init__(self, indptr, indices, dim, row_ids=None, postings=None):
+        # row_ids / postings may be passed in precomputed (e.g. memory-mapped
+        # from an ai.snapshot) instead of being derived per process
+        self.indptr = indptr
+        self.indices = indices
+        self.dim = dim
+        if row_ids is None:
+            row_ids = np.repeat(
+                np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr)
+            )
+        self.row_ids = row_ids
+        self._postings = postings
+
+    @classmethod
+    def from_rows(cls, rows, dim):
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        if rows:
+            indices = np.concatenate(rows).astype(np.int32, copy=False)
+        else:
+            indices = np.array([], dtype=np.int32)
+        return cls(indptr, indices, dim)
+
+    @property
+    def shape(self):
+        return (len(self.indptr) - 1, self.dim)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def row(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def slice_rows(self, start, stop):
+        indptr = self.indptr[start:stop + 1]
+        indices = self.indices[indptr[0]:indptr[-1]]
+        return SparseTagMatrix(indptr - indptr[0], indices, self.dim)
+
+    def row_norms(self):
+        return np.sqrt(np.diff(self.indptr).astype(np.float64))
+
+    def overlap(self, cols):
+        # |row ∩ cols| for every row, i.e. the dot product with a binary vector
+        mask = np.isin(self.indices, cols)
+        return np.bincount(self.row_ids[mask], minlength=self.shape[0])
+
+    def postings(self):
+        # column-major copy of the matrix, i.e. the inverted tag -> rows index:
+        # rows holding column c are col_rows[col_indptr[c]:col_indptr[c + 1]]
+        if self._postings is None:
+            order = np.argsort(self.indices, kind="stable")
+            col_indptr = np.zeros(self.dim + 1, dtype=np.int64)
+            col_indptr[1:] = np.cumsum(np.bincount(self.indices, minlength=self.dim))
+            self._postings = (col_indptr, self.row_ids[order])
+        return self._postings
+
+    def candidates(self, cols):
+        # rows sharing at least one column with cols, with the overlap size;
+        # touches only the postings of cols, not the whole matrix
+        col_indptr, col_rows = self.postings()
+        hits = [col_rows[col_indptr[c]:col_indptr[c + 1]] for c in cols]
+        if not hits:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(hits), return_counts=True)
+
+    def toarray(self):
+        dense = np.zeros(self.shape)
+        dense[self.row_ids, self.indices] = 1
+        return dense
+
+
 class TagVectorizer:
-    def __init__(self, all_tag_ids):
+    def __init__(self, all_tag_ids, sparse=False):
         # map tag_id -> index
         self.tag_to_index = {
             tag_id: idx for idx, tag_id in enumerate(sorted(all_tag_ids))
         }
         self.dim = len(self.tag_to_index)
+        self.sparse = sparse
 
     def vectorize(self, tag_ids):
         vec = np.zeros(self.dim)
@@ -14,3 +90,21 @@ class TagVectorizer:
             if tag_id in self.tag_to_index:
                 vec[self.tag_to_index[tag_id]] = 1
         return vec
+
+    def indices(self, tag_ids):
+        # sparse counterpart of vectorize(): sorted, unique int32 column ids
+        cols = {self.tag_to_index[t] for t in tag_ids if t in self.tag_to_index}
+        return np.array(sorted(cols), dtype=np.int32)
+
+    def vectorize_many(self, tag_id_lists):
+        if self.sparse:
+            return SparseTagMatrix.from_rows(
+                [self.indices(tag_ids) for tag_ids in tag_id_lists], self.dim
+            )
+
+        # one row per entry, same 0/1 encoding as vectorize()
+        matrix = np.zeros((len(tag_id_lists), self.dim))
+        for row, tag_ids in enumerate(tag_id_lists):
+            cols = [self.tag_to_index[t] for t in tag_ids if t in self.tag_to_index]
+            matrix[row, cols] = 1
+        return matrix
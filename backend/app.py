@@ -1,17 +1,84 @@
 from flask import Flask
 from config import Config
 from flask_cors import CORS
+from flask_migrate import Migrate
 from models import db
 from routes import api
+from metrics import pool_metrics, route_profiler, InstrumentedQueuePool
+from rsvp_queue import rsvp_ingest, write_rsvps
+import auth_utils
+import rec_state
 
-app = Flask(__name__)
-app.config.from_object(Config)
 
-# 👇 THIS IS THE IMPORTANT PART
-CORS(app)
+def create_app(config=Config):
+    # admin routes verify Clerk session tokens locally; without a key set
+    # every one of them would answer 401
+    if not (config.CLERK_JWKS_URL or config.CLERK_JWKS_FILE):
+        raise RuntimeError(
+            "set CLERK_JWKS_URL (or CLERK_JWKS_FILE, e.g. dev_jwks.py's key set)"
+        )
+    auth_utils.jwks.configure(
+        url=config.CLERK_JWKS_URL, path=config.CLERK_JWKS_FILE, ttl=config.JWKS_TTL
+    )
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **config.SQLALCHEMY_ENGINE_OPTIONS,
+        "poolclass": InstrumentedQueuePool
+    }
+
+    # 👇 THIS IS THE IMPORTANT PART
+    CORS(app, expose_headers=[
+        "X-Candidate-Count", "X-Total-Count", "X-Next-Offset", "ETag",
+        "X-Next-Cursor", "Link"
+    ])
+
+    db.init_app(app)
+    Migrate(app, db)
+    app.register_blueprint(api)
+
+    with app.app_context():
+        pool_metrics.install(db.engine)
+        if config.PROFILE_REQUESTS:
+            route_profiler.install(
+                app, db.engine,
+                sample_rate=config.PROFILE_SAMPLE_RATE,
+                slow_ms=config.PROFILE_SLOW_MS,
+                profile_dir=config.PROFILE_DIR
+            )
+
+    # the writer thread starts on the first queued RSVP
+    rsvp_ingest.configure(
+        write_rsvps, app=app,
+        maxsize=config.RSVP_QUEUE_SIZE,
+        batch_size=config.RSVP_BATCH_SIZE,
+        flush_ms=config.RSVP_FLUSH_MS,
+        spill_file=config.RSVP_SPILL_FILE
+    )
+
+    return app
+
+
+def init_worker(app):
+    # Run once in every server worker process after it is forked: never share
+    # pooled DB sockets with the parent, start from empty per-process
+    # recommendation state and warm the index before taking traffic.
+    with app.app_context():
+        db.engine.dispose(close=False)
+        rec_state.rec_cache.clear()
+        rec_state.catalog_cache.clear()
+        rec_state.rec_index.reset()
+        try:
+            # mapped from the published snapshot (published first when
+            # there is none) when REC_SNAPSHOT_DIR is set
+            rec_state.get_rec_index()
+        except Exception as e:
+            # the index loads lazily on first use instead
+            app.logger.warning("recommendation index warm-up failed: %s", e)
+        finally:
+            db.session.remove()
 
-db.init_app(app)
-app.register_blueprint(api)
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
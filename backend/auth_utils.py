@@ -1,9 +1,128 @@
+import json
+import logging
+import threading
+import time
+import urllib.request
 from functools import wraps
+
+import jwt
 from flask import request, jsonify
-from models import User
-from clerk_backend_api import Clerk
+from sqlalchemy import text
+
+from cache import TTLCache
+from config import Config
+from models import db
+
+log = logging.getLogger(__name__)
+
+# Identity lookups behind require_role:
+#   ("clerk", clerk_user_id) -> role ("" = no such user)
+#   token -> clerk_user_id, never past the token's own exp
+# auth_sync calls invalidate_identity() whenever it writes a user.
+identity_cache = TTLCache(maxsize=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_CACHE_TTL)
+token_cache = TTLCache(maxsize=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_CACHE_TTL)
+
+
+class JWKSCache:
+    # Clerk's signing keys, fetched once and refreshed every `ttl` seconds,
+    # or early when a token names an unknown kid (at most once a minute).
+    # `path` points at a local JWKS file instead of the URL (tests / dev,
+    # see dev_jwks.py). A failed refresh keeps serving the keys we already
+    # have and is not retried for MIN_REFRESH seconds, so an outage at Clerk
+    # costs one blocked request a minute rather than every request.
+    MIN_REFRESH = 60
+
+    def __init__(self, url=None, path=None, ttl=3600):
+        self._lock = threading.Lock()
+        self.configure(url, path, ttl)
+
+    def configure(self, url=None, path=None, ttl=3600):
+        # point at another key set; the cached keys are dropped
+        with self._lock:
+            self.url = url
+            self.path = path
+            self.ttl = ttl
+            self._keys = {}
+            self._fetched_at = None
+            self._retry_at = 0.0
+
+    def _fetch(self):
+        if self.path:
+            with open(self.path) as f:
+                data = json.load(f)
+        else:
+            with urllib.request.urlopen(self.url, timeout=5) as resp:
+                data = json.load(resp)
+        return {k.key_id: k for k in jwt.PyJWKSet.from_dict(data).keys}
+
+    def get_key(self, kid):
+        with self._lock:
+            now = time.monotonic()
+            age = None if self._fetched_at is None else now - self._fetched_at
+            stale = age is None or age > self.ttl
+            unknown = kid not in self._keys and (age is None or age > self.MIN_REFRESH)
+            if (stale or unknown) and now >= self._retry_at:
+                try:
+                    self._keys = self._fetch()
+                    self._fetched_at = now
+                except Exception:
+                    log.exception("JWKS refresh failed; keeping %d cached keys", len(self._keys))
+                    self._retry_at = now + self.MIN_REFRESH
+            return self._keys.get(kid)
+
+
+# pointed at the app config's key set by create_app
+jwks = JWKSCache()
+
+
+def verify_token(token):
+    # -> clerk_user_id; raises jwt.InvalidTokenError
+    clerk_user_id = token_cache.get(token)
+    if clerk_user_id is not None:
+        return clerk_user_id
+
+    header = jwt.get_unverified_header(token)
+    key = jwks.get_key(header.get("kid"))
+    if key is None:
+        raise jwt.InvalidTokenError("Unknown signing key")
+
+    claims = jwt.decode(
+        token,
+        key.key,
+        algorithms=["RS256"],
+        issuer=Config.CLERK_ISSUER,
+        audience=Config.CLERK_AUDIENCE,
+        options={
+            "require": ["exp", "sub"],
+            "verify_iss": bool(Config.CLERK_ISSUER),
+            "verify_aud": bool(Config.CLERK_AUDIENCE)
+        },
+        leeway=5
+    )
+    token_cache.set(token, claims["sub"], ttl=max(claims["exp"] - time.time(), 0))
+    return claims["sub"]
+
+
+def _cached_role(key, query, params):
+    role = identity_cache.get(key)
+    if role is None:
+        row = db.session.execute(text(query), params).fetchone()
+        role = row.role if row else ""
+        identity_cache.set(key, role)
+    return role or None
+
+
+def role_for_clerk_user(clerk_user_id):
+    return _cached_role(
+        ("clerk", clerk_user_id),
+        "SELECT role FROM users WHERE clerk_user_id = :cid",
+        {"cid": clerk_user_id}
+    )
+
+
+def invalidate_identity(clerk_user_id):
+    identity_cache.pop(("clerk", clerk_user_id))
 
-clerk = Clerk()
 
 def require_role(required_role):
     def decorator(fn):
@@ -17,13 +136,11 @@ def require_role(required_role):
             token = auth_header.replace("Bearer ", "")
 
             try:
-                session = clerk.verify_session(token)
-                clerk_user_id = session["sub"]
+                clerk_user_id = verify_token(token)
             except Exception:
                 return {"error": "Invalid token"}, 401
 
-            user = User.query.filter_by(clerk_user_id=clerk_user_id).first()
-            if not user or user.role != required_role:
+            if role_for_clerk_user(clerk_user_id) != required_role:
                 return {"error": "Forbidden"}, 403
 
             return fn(*args, **kwargs)
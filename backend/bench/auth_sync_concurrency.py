@@ -0,0 +1,122 @@
+"""Concurrent first logins against /auth/sync.
+
+    python -m bench.auth_sync_concurrency --threads 16 --rounds 20
+
+Needs the MariaDB configured in config.py (the upserts use ON DUPLICATE
+KEY UPDATE). Each round fires --threads simultaneous first logins for one
+fresh clerk_user_id, then checks that exactly one users row and one
+student row exist for it, and reports SQL statements per request. Rows
+created here use @bench.invalid emails and are deleted at the end.
+"""
+import argparse
+import statistics
+import threading
+import uuid
+
+from sqlalchemy import event, text
+
+from app import create_app
+from models import db
+
+EMAIL_DOMAIN = "bench.invalid"
+
+
+def count_statements(engine):
+    local = threading.local()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, params, context, executemany):
+        local.count = getattr(local, "count", 0) + 1
+
+    def take():
+        n = getattr(local, "count", 0)
+        local.count = 0
+        return n
+    return take
+
+
+def run_round(client, take, threads):
+    clerk_user_id = f"bench_{uuid.uuid4().hex}"
+    email = f"{clerk_user_id}@{EMAIL_DOMAIN}"
+    barrier = threading.Barrier(threads)
+    results, statements = [], []
+    lock = threading.Lock()
+
+    def login():
+        take()
+        barrier.wait()
+        resp = client.post("/auth/sync", json={"clerk_user_id": clerk_user_id, "email": email})
+        n = take()
+        with lock:
+            results.append((resp.status_code, resp.get_json()))
+            statements.append(n)
+
+    workers = [threading.Thread(target=login) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    # one more login now that the account exists: the returning-user path
+    take()
+    client.post("/auth/sync", json={"clerk_user_id": clerk_user_id, "email": email})
+    returning = take()
+
+    users, students = db.session.execute(
+        text("""
+            SELECT
+                (SELECT COUNT(*) FROM users WHERE clerk_user_id = :cid),
+                (SELECT COUNT(*) FROM student WHERE email = :email)
+        """),
+        {"cid": clerk_user_id, "email": email}
+    ).fetchone()
+    db.session.commit()
+
+    ids = {tuple(sorted(body.items())) for status, body in results if status == 200}
+    errors = sum(status != 200 for status, _ in results)
+    return users, students, len(ids), errors, statements, returning
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        take = count_statements(db.engine)
+        client = app.test_client()
+        first, returning_counts, failures = [], [], 0
+
+        try:
+            for _ in range(args.rounds):
+                users, students, distinct, errors, statements, returning = run_round(
+                    client, take, args.threads
+                )
+                first.extend(statements)
+                returning_counts.append(returning)
+                if users != 1 or students != 1 or distinct != 1 or errors:
+                    failures += 1
+                    print(f"FAIL users={users} students={students} "
+                          f"distinct responses={distinct} errors={errors}")
+        finally:
+            db.session.execute(
+                text("DELETE FROM student WHERE email LIKE :pat"),
+                {"pat": f"%@{EMAIL_DOMAIN}"}
+            )
+            db.session.execute(
+                text("DELETE FROM users WHERE email LIKE :pat"),
+                {"pat": f"%@{EMAIL_DOMAIN}"}
+            )
+            db.session.commit()
+
+    print(f"{args.rounds} rounds x {args.threads} concurrent first logins: "
+          f"{failures} with duplicate rows or errors")
+    print(f"statements per racing login: median {statistics.median(first)}, max {max(first)}")
+    print(f"statements per returning login: {statistics.median(returning_counts)}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Rebuild time and memory of the collaborative neighbour table.
+
+    python -m bench.cf_rebuild --rsvps 100000 --top-n 20
+    python -m bench.cf_rebuild --rsvps 100000 --sqlite    (adds the rsvps query)
+
+Generates RSVP pairs with the same skew as bench.datagen (a few events
+draw most RSVPs), then times ai.collaborative.build_neighbors, the peak
+memory it allocates (tracemalloc sees NumPy buffers), the size of the
+resulting table and the per-student scoring that /ai/recommend does.
+With --sqlite the pairs go into a temporary bench database first and the
+timing is rec_state.load_neighbors(): the SELECT plus the build, which is
+what a worker's periodic refresh costs.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from ai.collaborative import build_neighbors
+from bench.suite import percentile
+
+
+def synthetic_rsvps(rsvps, students, events, seed):
+    # -> (student_ids, event_ids), distinct pairs, Zipf-like event popularity
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, events + 1) ** 0.8
+    popularity = rng.permutation(popularity / popularity.sum())
+    per_student = rng.poisson(rsvps / students, students).clip(1, events)
+    student_ids = np.repeat(np.arange(1, students + 1), per_student)
+    event_ids = rng.choice(events, size=len(student_ids), p=popularity) + 1
+    keys = np.unique(student_ids * (events + 1) + event_ids)
+    return keys // (events + 1), keys % (events + 1)
+
+
+def mb(n):
+    return n / 2 ** 20
+
+
+def bench_build(student_ids, event_ids, top_n, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        neighbors = build_neighbors(student_ids, event_ids, top_n=top_n)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    build_neighbors(student_ids, event_ids, top_n=top_n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return neighbors, times, peak
+
+
+def bench_scoring(neighbors, student_ids, event_ids, samples, seed):
+    rng = np.random.default_rng(seed)
+    order = np.argsort(student_ids, kind="stable")
+    student_ids, event_ids = student_ids[order], event_ids[order]
+    bounds = np.searchsorted(student_ids, np.unique(student_ids))
+    bounds = np.append(bounds, len(student_ids))
+
+    latencies = []
+    for i in rng.integers(0, len(bounds) - 1, samples):
+        history = event_ids[bounds[i]:bounds[i + 1]]
+        t0 = time.perf_counter()
+        neighbors.score(history)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return sorted(latencies)
+
+
+def bench_sqlite(args):
+    from sqlalchemy import text
+    from app import create_app
+    from bench import datagen, sqlite_compat
+    from config import Config
+    import dev_jwks
+    from models import db
+    import rec_state
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'cf.sqlite')}"
+            CLERK_JWKS_FILE = Config.CLERK_JWKS_FILE or dev_jwks.JWKS_FILE
+            SQLALCHEMY_ENGINE_OPTIONS = {}
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            sqlite_compat.install(db.engine)
+            sqlite_compat.create_schema(db.engine)
+            counts = datagen.populate(
+                students=args.students, events=args.events, tags=40,
+                rsvps_per_student=max(1, args.rsvps // args.students), seed=args.seed
+            )
+            positive = db.session.execute(
+                text("SELECT COUNT(*) FROM rsvps WHERE rsvp_status <> 'NO'")
+            ).scalar()
+
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                rec_state.load_neighbors()
+                times.append(time.perf_counter() - t0)
+            db.session.remove()
+            db.engine.dispose()
+    print(f"load_neighbors on SQLite ({counts['rsvps']} RSVPs, {positive} not NO): "
+          f"median {statistics.median(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rsvps", type=int, default=100000)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=1000, help="students scored")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sqlite", action="store_true",
+                        help="also time the DB read + build through rec_state")
+    args = parser.parse_args()
+
+    student_ids, event_ids = synthetic_rsvps(args.rsvps, args.students, args.events, args.seed)
+    print(f"{len(student_ids)} RSVPs, {args.students} students, {args.events} events, "
+          f"top {args.top_n} neighbours")
+
+    neighbors, times, peak = bench_build(student_ids, event_ids, args.top_n, args.repeat)
+    input_bytes = student_ids.nbytes + event_ids.nbytes
+    print(f"build: median {statistics.median(times) * 1000:.0f} ms, "
+          f"max {max(times) * 1000:.0f} ms")
+    print(f"memory: peak {mb(peak):.1f} MB during build (input {mb(input_bytes):.1f} MB), "
+          f"table {mb(neighbors.nbytes):.2f} MB "
+          f"({len(neighbors.neighbors)} neighbour entries)")
+
+    latencies = bench_scoring(neighbors, student_ids, event_ids, args.samples, args.seed)
+    print(f"score one student: p50 {percentile(latencies, 0.5):.3f} ms   "
+          f"p95 {percentile(latencies, 0.95):.3f} ms   p99 {percentile(latencies, 0.99):.3f} ms")
+
+    if args.sqlite:
+        bench_sqlite(args)
+
+
+if __name__ == "__main__":
+    main()
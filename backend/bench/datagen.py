@@ -0,0 +1,174 @@
+"""Synthetic campus data for benchmarks.
+
+    python -m bench.datagen --scale medium --db bench.sqlite
+    python -m bench.datagen --scale small --url mysql+pymysql://...   (empty schema)
+
+Fills the db_setup.sql schema: departments, tags, users with a linked
+student each, events spread from 60 days ago to 120 days ahead, event tags,
+student interests and RSVPs. RSVPs are skewed towards a few popular
+events, like a real fest. Counter tables are rebuilt with counters.rebuild().
+Same seed, same data.
+"""
+import argparse
+import datetime
+
+import numpy as np
+from sqlalchemy import text
+
+from models import db
+import counters
+
+SCALES = {
+    "small": {"students": 1000, "events": 300, "tags": 40, "rsvps_per_student": 5},
+    "medium": {"students": 10000, "events": 2000, "tags": 80, "rsvps_per_student": 10},
+    "large": {"students": 50000, "events": 10000, "tags": 150, "rsvps_per_student": 20},
+}
+
+DEPARTMENTS = ["CSE", "ISE", "ECE", "EEE", "ME", "CV", "BT", "AE"]
+STATUSES = ["YES", "NO", "MAYBE"]
+STATUS_WEIGHTS = [0.75, 0.1, 0.15]
+
+BATCH_ROWS = 10000
+
+
+def insert(sql, rows):
+    # executemany in batches: one multi-row INSERT per batch on PyMySQL
+    for start in range(0, len(rows), BATCH_ROWS):
+        db.session.execute(text(sql), rows[start:start + BATCH_ROWS])
+
+
+def populate(students, events, tags, rsvps_per_student, tags_per_event=3,
+             interests_per_student=4, seed=42):
+    # run inside an app context; returns the row counts
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    now = datetime.datetime.now().replace(microsecond=0)
+
+    insert(
+        "INSERT INTO department (department_id, department_name) VALUES (:id, :name)",
+        [{"id": i, "name": name} for i, name in enumerate(DEPARTMENTS, 1)]
+    )
+    insert(
+        "INSERT INTO tag (tag_id, tag_name) VALUES (:id, :name)",
+        [{"id": t, "name": f"tag_{t}"} for t in range(1, tags + 1)]
+    )
+
+    departments = rng.integers(1, len(DEPARTMENTS) + 1, students)
+    insert(
+        """INSERT INTO users (user_id, email, role, clerk_user_id)
+           VALUES (:id, :email, 'STUDENT', :cid)""",
+        [
+            {"id": s, "email": f"student{s}@bench.test", "cid": f"bench_{s}"}
+            for s in range(1, students + 1)
+        ]
+    )
+    insert(
+        """INSERT INTO student (student_id, fname, lname, email, password_hash,
+                                department_id, user_id)
+           VALUES (:id, :fname, :lname, :email, 'CLERK_AUTH', :dept, :id)""",
+        [
+            {
+                "id": s, "fname": f"First{s}", "lname": f"Last{s}",
+                "email": f"student{s}@bench.test", "dept": int(departments[s - 1])
+            }
+            for s in range(1, students + 1)
+        ]
+    )
+
+    offsets = rng.integers(-60, 121, events)
+    ages = rng.integers(0, 90 * 24 * 3600, events)
+    insert(
+        """INSERT INTO event (event_id, title, location, event_date, created_at,
+                              organizer_type)
+           VALUES (:id, :title, 'Campus', :date, :created, 'ADMIN')""",
+        [
+            {
+                "id": e, "title": f"Event {e}",
+                "date": today + datetime.timedelta(days=int(offsets[e - 1])),
+                "created": now - datetime.timedelta(seconds=int(ages[e - 1]))
+            }
+            for e in range(1, events + 1)
+        ]
+    )
+
+    def tag_sets(owners, most):
+        # 1..most distinct tags per owner
+        sizes = rng.integers(1, min(most, tags) + 1, owners)
+        return [
+            rng.choice(tags, size=int(k), replace=False) + 1 for k in sizes
+        ]
+
+    insert(
+        "INSERT INTO event_tags (event_id, tag_id) VALUES (:eid, :tid)",
+        [
+            {"eid": e, "tid": int(t)}
+            for e, ts in enumerate(tag_sets(events, tags_per_event), 1)
+            for t in ts
+        ]
+    )
+    insert(
+        "INSERT INTO student_interests (student_id, tag_id) VALUES (:sid, :tid)",
+        [
+            {"sid": s, "tid": int(t)}
+            for s, ts in enumerate(tag_sets(students, interests_per_student), 1)
+            for t in ts
+        ]
+    )
+
+    # Zipf-like popularity: event rank r gets weight 1 / r^0.8
+    popularity = 1.0 / np.arange(1, events + 1) ** 0.8
+    popularity = rng.permutation(popularity / popularity.sum())
+    per_student = min(rsvps_per_student, events)
+    rsvps = []
+    for s in range(1, students + 1):
+        chosen = rng.choice(events, size=per_student, replace=False, p=popularity) + 1
+        statuses = rng.choice(STATUSES, size=per_student, p=STATUS_WEIGHTS)
+        rsvps.extend(
+            {"sid": s, "eid": int(e), "status": str(st)}
+            for e, st in zip(chosen, statuses)
+        )
+    insert(
+        "INSERT INTO rsvps (student_id, event_id, rsvp_status) VALUES (:sid, :eid, :status)",
+        rsvps
+    )
+
+    counters.rebuild()   # commits
+
+    return {
+        "students": students,
+        "events": events,
+        "tags": tags,
+        "rsvps": len(rsvps)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="SQLite file to create")
+    target.add_argument("--url", help="database URL with the schema already loaded")
+    args = parser.parse_args()
+
+    from bench import sqlite_compat
+    from app import create_app
+    from config import Config
+    import dev_jwks
+
+    class TargetConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.url or f"sqlite:///{args.db}"
+        CLERK_JWKS_FILE = Config.CLERK_JWKS_FILE or dev_jwks.JWKS_FILE
+        SQLALCHEMY_ENGINE_OPTIONS = Config.SQLALCHEMY_ENGINE_OPTIONS if args.url else {}
+
+    app = create_app(TargetConfig)
+    with app.app_context():
+        if args.db:
+            sqlite_compat.install(db.engine)
+            sqlite_compat.create_schema(db.engine)
+        counts = populate(**SCALES[args.scale], seed=args.seed)
+    print(", ".join(f"{v} {k}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Check that the hot route queries are served by an index.
+
+    python -m bench.explain_check [--strict]
+
+Runs EXPLAIN on each query against the configured MariaDB (migrated with
+`flask --app app:create_app db upgrade`) and looks at the rows of the
+tables it names. A table passes when the optimizer chose (key) one of the
+expected indexes; an index that is merely usable (possible_keys) is not
+enough. With --strict the tables served by a covering index must also be
+read from the index alone ("Using index"). On a near-empty dev database the
+optimizer may rightly prefer a full scan, so run this on realistically
+sized data (bench.datagen).
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app import create_app
+from models import db
+from routes import (
+    UPCOMING_EVENTS_QUERY, STUDENT_UPCOMING_QUERY, COLD_START_QUERY,
+    RECOMMEND_EVENTS_QUERY, AUTH_SYNC_LOOKUP, ADMIN_EVENTS_QUERY, SQL_RANK_WEIGHTS
+)
+
+# name, query, params, {table alias in EXPLAIN: acceptable indexes},
+# aliases that --strict requires to be read from the index alone
+CHECKS = [
+    (
+        "/events/upcoming", UPCOMING_EVENTS_QUERY, {},
+        {"event": {"idx_event_date"}}, {"event"}
+    ),
+    (
+        "/students/<id>/upcoming-events", STUDENT_UPCOMING_QUERY, {"sid": 1},
+        {"r": {"idx_rsvps_student_status"}, "e": {"PRIMARY", "idx_event_date"}},
+        {"r"}
+    ),
+    (
+        "cold start recommendations", COLD_START_QUERY, {"limit": 5},
+        {"e": {"idx_event_created_at"}}, {"e"}
+    ),
+    (
+        # every event is listed, so e is a full index scan: in event_id
+        # order for the GROUP BY or in created_at order. The 500-character
+        # registration_link would push a covering index past InnoDB's
+        # 3072-byte key limit.
+        "/admin/events", ADMIN_EVENTS_QUERY, {},
+        {
+            "e": {"PRIMARY", "idx_event_created_at"},
+            "et": {"PRIMARY"},
+            "t": {"PRIMARY"}
+        },
+        {"et"}
+    ),
+    (
+        "/recommendations/<id>", RECOMMEND_EVENTS_QUERY,
+        {"sid": 1, "limit": 20, **SQL_RANK_WEIGHTS},
+        {
+            "si": {"PRIMARY"},
+            "et": {"fk_eventtag_tag"},
+            "e": {"PRIMARY"},
+            "rc": {"PRIMARY"}
+        },
+        set()
+    ),
+    (
+        "/auth/sync lookup", AUTH_SYNC_LOOKUP, {"cid": "user_check"},
+        {"u": {"clerk_user_id"}, "s": {"user_id"}}, set()
+    ),
+]
+
+
+def explain(query, params):
+    rows = db.session.execute(text("EXPLAIN " + query.text), params)
+    return [dict(r._mapping) for r in rows]
+
+
+def check(plan, expected, covering, strict):
+    # -> list of (table, verdict, detail)
+    by_table = {row["table"]: row for row in plan}
+    out = []
+    for table, indexes in expected.items():
+        row = by_table.get(table)
+        if row is None:
+            # optimized away (e.g. empty table or const lookup)
+            out.append((table, "ok", "not in plan"))
+            continue
+        extra = row["Extra"] or ""
+        detail = f"type={row['type']} key={row['key']} rows={row['rows']} extra={extra}"
+        if row["key"] not in indexes:
+            out.append((table, "FAIL", detail))
+        elif strict and table in covering and "Using index" not in extra:
+            out.append((table, "FAIL", detail + " (not covering)"))
+        else:
+            out.append((table, "ok", detail))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strict", action="store_true",
+                        help="also require covering indexes to be used as such")
+    args = parser.parse_args()
+
+    failures = 0
+    app = create_app()
+    with app.app_context():
+        for name, query, params, expected, covering in CHECKS:
+            print(name)
+            plan = explain(query, params)
+            for table, verdict, detail in check(plan, expected, covering, args.strict):
+                print(f"  {table:<6} {verdict:<7} {detail}")
+                failures += verdict == "FAIL"
+
+    print(f"{failures} table access(es) without an expected index")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Throughput of the gunicorn deployment at different worker counts.
+
+    python -m bench.load_test --workers 1 2 4 --path /events --clients 32
+
+For each worker count, starts `gunicorn -c gunicorn.conf.py wsgi:app` on a
+free local port (against the MariaDB database in config.py), hammers --path
+with keep-alive client threads for --seconds, and reports req/s and
+latency percentiles. Pass --header "Authorization: Bearer ..." for routes
+behind require_role.
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, path, headers, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", path, headers=headers)
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def drive(port, path, headers, clients, seconds):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client():
+        mine, failed = [], 0
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="gthread threads per worker")
+    parser.add_argument("--path", default="/events")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--header", action="append", default=[])
+    args = parser.parse_args()
+
+    headers = dict(h.split(": ", 1) for h in args.header)
+    print(f"GET {args.path}, {args.clients} keep-alive clients, {args.seconds:g}s per run")
+
+    for n in args.workers:
+        port = free_port()
+        env = {
+            **os.environ,
+            "WEB_CONCURRENCY": str(n),
+            "GUNICORN_THREADS": str(args.threads),
+            "GUNICORN_BIND": f"127.0.0.1:{port}",
+            "GUNICORN_ACCESSLOG": "",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+            cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(port, args.path, headers):
+                print(f"workers={n}: server did not come up")
+                continue
+            # one warm-up pass so every worker has loaded its index
+            drive(port, args.path, headers, args.clients, 1)
+            latencies, errors = drive(port, args.path, headers, args.clients, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+
+        if not latencies:
+            print(f"workers={n}: no successful requests ({errors} errors)")
+            continue
+        print(f"workers={n:<3} {len(latencies) / args.seconds:8.1f} req/s   "
+              f"p50 {statistics.median(latencies) * 1000:6.1f} ms   "
+              f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms   "
+              f"p99 {percentile(latencies, 0.99) * 1000:6.1f} ms   "
+              f"errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Benchmark the /recommendations SQL before and after the join fan-out fix.
+
+    python -m bench.recommend_query --events 2000 --rsvps-per-event 200
+
+Runs both queries on a synthetic in-memory SQLite copy of the schema
+(MariaDB-only functions are registered as Python UDFs; event_rsvp_counts
+is filled the way counters.rebuild() does) and reports the rows each join
+produces before aggregation, latency, and how far the old scores drift
+from the true counts.
+"""
+import argparse
+import datetime
+import math
+import random
+import sqlite3
+import statistics
+import time
+
+from routes import RECOMMEND_EVENTS_QUERY, SQL_RANK_WEIGHTS
+
+OLD_QUERY = """
+    SELECT
+        e.event_id,
+        e.title,
+        e.location,
+        e.event_date,
+        COUNT(et.tag_id) AS tag_match_score,
+        COUNT(r.student_id) AS popularity_score,
+        DATEDIFF(e.event_date, CURDATE()) AS days_until_event
+    FROM event e
+    JOIN event_tags et ON e.event_id = et.event_id
+    JOIN student_interests si ON et.tag_id = si.tag_id
+    LEFT JOIN rsvps r ON e.event_id = r.event_id
+    WHERE si.student_id = :sid
+    GROUP BY e.event_id
+"""
+
+# rows flowing into GROUP BY for the old query
+OLD_JOIN_ROWS = """
+    SELECT COUNT(*)
+    FROM event e
+    JOIN event_tags et ON e.event_id = et.event_id
+    JOIN student_interests si ON et.tag_id = si.tag_id
+    LEFT JOIN rsvps r ON e.event_id = r.event_id
+    WHERE si.student_id = :sid
+"""
+
+# rows the new query touches: tag matches + one counter row per candidate
+NEW_JOIN_ROWS = """
+    SELECT
+        (SELECT COUNT(*)
+         FROM student_interests si
+         JOIN event_tags et ON et.tag_id = si.tag_id
+         WHERE si.student_id = :sid)
+      + (SELECT COUNT(DISTINCT et.event_id)
+         FROM student_interests si
+         JOIN event_tags et ON et.tag_id = si.tag_id
+         WHERE si.student_id = :sid)
+"""
+
+
+def connect():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.create_function("CURDATE", 0, lambda: datetime.date.today().isoformat())
+    conn.create_function(
+        "DATEDIFF", 2,
+        lambda a, b: (
+            datetime.date.fromisoformat(a) - datetime.date.fromisoformat(b)
+        ).days
+    )
+    conn.create_function("LN", 1, math.log)
+    conn.executescript("""
+        CREATE TABLE event (event_id INTEGER PRIMARY KEY, title TEXT,
+                            location TEXT, event_date TEXT);
+        CREATE TABLE event_tags (event_id INTEGER, tag_id INTEGER,
+                                 PRIMARY KEY (event_id, tag_id));
+        CREATE INDEX fk_eventtag_tag ON event_tags (tag_id);
+        CREATE TABLE student_interests (student_id INTEGER, tag_id INTEGER,
+                                        PRIMARY KEY (student_id, tag_id));
+        CREATE TABLE rsvps (student_id INTEGER, event_id INTEGER,
+                            rsvp_status TEXT DEFAULT 'YES',
+                            PRIMARY KEY (student_id, event_id));
+        CREATE INDEX fk_rsvps_event ON rsvps (event_id);
+        CREATE TABLE event_rsvp_counts (event_id INTEGER PRIMARY KEY,
+                                        yes_count INTEGER, no_count INTEGER,
+                                        maybe_count INTEGER,
+                                        waitlist_count INTEGER);
+    """)
+    return conn
+
+
+def populate(conn, n_students, n_events, n_tags, tags_per_event,
+             interests_per_student, rsvps_per_event, seed):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+
+    conn.executemany(
+        "INSERT INTO event VALUES (?, ?, ?, ?)",
+        [
+            (e, f"Event {e}", "Campus",
+             (today + datetime.timedelta(days=rng.randint(-60, 120))).isoformat())
+            for e in range(1, n_events + 1)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO event_tags VALUES (?, ?)",
+        [
+            (e, t)
+            for e in range(1, n_events + 1)
+            for t in rng.sample(range(1, n_tags + 1), tags_per_event)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO student_interests VALUES (?, ?)",
+        [
+            (s, t)
+            for s in range(1, n_students + 1)
+            for t in rng.sample(range(1, n_tags + 1), interests_per_student)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO rsvps (student_id, event_id) VALUES (?, ?)",
+        [
+            (s, e)
+            for e in range(1, n_events + 1)
+            for s in rng.sample(range(1, n_students + 1), rsvps_per_event)
+        ]
+    )
+    conn.execute("""
+        INSERT INTO event_rsvp_counts
+        SELECT event_id, SUM(rsvp_status = 'YES'), SUM(rsvp_status = 'NO'),
+               SUM(rsvp_status = 'MAYBE'), SUM(rsvp_status = 'WAITLIST')
+        FROM rsvps
+        GROUP BY event_id
+    """)
+    conn.commit()
+
+
+def timed(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return rows, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=40)
+    parser.add_argument("--tags-per-event", type=int, default=3)
+    parser.add_argument("--interests", type=int, default=4)
+    parser.add_argument("--rsvps-per-event", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = connect()
+    populate(conn, args.students, args.events, args.tags, args.tags_per_event,
+             args.interests, args.rsvps_per_event, args.seed)
+    new_sql = str(RECOMMEND_EVENTS_QUERY)
+
+    rng = random.Random(args.seed)
+    old_rows = new_rows = 0
+    old_ms, new_ms, drift = [], [], []
+    for sid in rng.sample(range(1, args.students + 1), args.queries):
+        params = {"sid": sid}
+        old_rows += conn.execute(OLD_JOIN_ROWS, params).fetchone()[0]
+        new_rows += conn.execute(NEW_JOIN_ROWS, params).fetchone()[0]
+
+        old, ms = timed(conn, OLD_QUERY, params, args.repeat)
+        old_ms.append(ms)
+        new, ms = timed(
+            conn, new_sql, {**params, "limit": 20, **SQL_RANK_WEIGHTS}, args.repeat
+        )
+        new_ms.append(ms)
+
+        truth = {r["event_id"]: r["popularity_score"] for r in new}
+        drift.extend(
+            r["popularity_score"] / truth[r["event_id"]]
+            for r in old
+            if truth.get(r["event_id"])
+        )
+
+    print(f"dataset: {args.students} students, {args.events} events, "
+          f"{args.events * args.rsvps_per_event} rsvps")
+    print(f"join rows per query  old {old_rows / args.queries:12.0f}"
+          f"   new {new_rows / args.queries:12.0f}")
+    print(f"median latency (ms)  old {statistics.median(old_ms):12.2f}"
+          f"   new {statistics.median(new_ms):12.2f}")
+    if drift:
+        print(f"old popularity_score inflation: x{statistics.mean(drift):.2f} on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Concurrent RSVPs against limited-capacity events.
+
+    python -m bench.seat_contention --threads 16 --capacity 50 --events 4
+    python -m bench.seat_contention --url mysql+pymysql://...   (empty schema)
+
+Loads students with bench.datagen (no RSVPs), gives --events events a
+capacity and has --threads threads POST /rsvp YES for every student on
+every one of them, so each event gets far more requests than seats. Then
+--cancel of the students holding a seat switch to NO through PUT /rsvp,
+concurrently, which should promote that many from the waitlist.
+
+After each phase, per event: YES rows never exceed capacity, seats_taken
+equals the YES rows, event_rsvp_counts agrees with rsvps, and nobody waits
+while a seat is free. Exits 1 on any violation. Reports seat allocations
+per second and request latency percentiles.
+
+Without --url it runs on a temporary SQLite file, where BEGIN IMMEDIATE
+stands in for InnoDB's row locks (bench.sqlite_compat); the overbooking
+check is meaningful on both, the throughput numbers mostly on MariaDB.
+"""
+import argparse
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+
+from bench import datagen, sqlite_compat
+from bench.suite import percentile
+
+CHECK_QUERY = text("""
+    SELECT
+        e.event_id,
+        e.capacity,
+        e.seats_taken,
+        SUM(r.rsvp_status = 'YES') AS yes_rows,
+        SUM(r.rsvp_status = 'WAITLIST') AS waitlist_rows,
+        MAX(rc.yes_count) AS yes_count,
+        MAX(rc.waitlist_count) AS waitlist_count
+    FROM event e
+    JOIN rsvps r ON r.event_id = e.event_id
+    LEFT JOIN event_rsvp_counts rc ON rc.event_id = e.event_id
+    WHERE e.event_id IN :eids
+    GROUP BY e.event_id, e.capacity, e.seats_taken
+""")
+
+
+def hammer(app, threads, requests):
+    # requests: list of (method, body); one test client per thread
+    work = queue.Queue()
+    for item in requests:
+        work.put(item)
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        client = app.test_client()
+        mine = []
+        barrier.wait()
+        while True:
+            try:
+                method, body = work.get_nowait()
+            except queue.Empty:
+                break
+            t0 = time.perf_counter()
+            resp = client.open("/rsvp", method=method, json=body)
+            mine.append((time.perf_counter() - t0) * 1000)
+            key = resp.status_code, (resp.get_json() or {}).get("status")
+            with lock:
+                statuses[key] = statuses.get(key, 0) + 1
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sorted(latencies), statuses, time.perf_counter() - started
+
+
+def check(db, event_ids):
+    # -> (yes holders per event, list of violations)
+    from sqlalchemy import bindparam
+
+    rows = db.session.execute(
+        CHECK_QUERY.bindparams(bindparam("eids", expanding=True)), {"eids": event_ids}
+    ).fetchall()
+    holders = {
+        eid: [r.student_id for r in db.session.execute(
+            text("SELECT student_id FROM rsvps WHERE event_id = :eid AND rsvp_status = 'YES'"),
+            {"eid": eid}
+        )]
+        for eid in event_ids
+    }
+    db.session.commit()
+
+    violations = []
+    for r in rows:
+        yes, waiting = int(r.yes_rows or 0), int(r.waitlist_rows or 0)
+        if yes > r.capacity:
+            violations.append(f"event {r.event_id}: {yes} YES for {r.capacity} seats")
+        if r.seats_taken != yes:
+            violations.append(f"event {r.event_id}: seats_taken {r.seats_taken} != {yes} YES")
+        if (r.yes_count, r.waitlist_count) != (yes, waiting):
+            violations.append(
+                f"event {r.event_id}: counters {r.yes_count}/{r.waitlist_count} "
+                f"!= rows {yes}/{waiting}"
+            )
+        if waiting and yes < r.capacity:
+            violations.append(f"event {r.event_id}: {waiting} waiting with seats free")
+    return holders, violations
+
+
+def report(phase, latencies, statuses, wall, allocations):
+    print(f"{phase}: {len(latencies)} requests in {wall:.2f}s "
+          f"({len(latencies) / wall:.0f} req/s, {allocations / wall:.0f} allocations/s)")
+    print(f"  p50 {percentile(latencies, 0.50):.2f} ms   p95 {percentile(latencies, 0.95):.2f} ms   "
+          f"p99 {percentile(latencies, 0.99):.2f} ms")
+    print("  " + ", ".join(
+        f"{code} {status or '-'}: {n}" for (code, status), n in sorted(statuses.items(), key=str)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=50)
+    parser.add_argument("--cancel", type=float, default=0.3,
+                        help="share of seat holders who switch to NO")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="database URL with an empty schema loaded")
+    args = parser.parse_args()
+
+    from app import create_app
+    from config import Config
+    import dev_jwks
+    from models import db
+
+    tmp = tempfile.TemporaryDirectory()
+    pool = {"pool_size": args.threads, "max_overflow": 0}
+
+    class ContentionConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.url or f"sqlite:///{os.path.join(tmp.name, 'seats.sqlite')}"
+        CLERK_JWKS_FILE = Config.CLERK_JWKS_FILE or dev_jwks.JWKS_FILE
+        SQLALCHEMY_ENGINE_OPTIONS = (
+            {**Config.SQLALCHEMY_ENGINE_OPTIONS, **pool} if args.url
+            else {**pool, "connect_args": {"timeout": 60}}
+        )
+
+    app = create_app(ContentionConfig)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if not args.url:
+            sqlite_compat.install(db.engine, immediate=True)
+            sqlite_compat.create_schema(db.engine)
+        datagen.populate(
+            students=args.students, events=args.events, tags=5,
+            rsvps_per_student=0, seed=args.seed
+        )
+        event_ids = list(range(1, args.events + 1))
+        db.session.execute(text("UPDATE event SET capacity = :c"), {"c": args.capacity})
+        db.session.commit()
+
+        # phase 1: everyone wants a seat everywhere, in random order
+        requests = [
+            ("POST", {"student_id": s, "event_id": e, "status": "YES"})
+            for s in range(1, args.students + 1) for e in event_ids
+        ]
+        rng.shuffle(requests)
+        latencies, statuses, wall = hammer(app, args.threads, requests)
+        holders, violations = check(db, event_ids)
+        report("allocate", latencies, statuses, wall, sum(map(len, holders.values())))
+
+        # phase 2: some seat holders back out while the waitlist is full
+        cancels = [
+            ("PUT", {"student_id": s, "event_id": e, "status": "NO"})
+            for e, students in holders.items()
+            for s in rng.sample(students, int(len(students) * args.cancel))
+        ]
+        rng.shuffle(cancels)
+        latencies, statuses, wall = hammer(app, args.threads, cancels)
+        after, more = check(db, event_ids)
+        violations += more
+        promoted = sum(len(set(after[e]) - set(holders[e])) for e in event_ids)
+        report("release", latencies, statuses, wall, promoted)
+        print(f"  {len(cancels)} seats released, {promoted} promoted from the waitlist")
+
+        db.engine.dispose()
+    tmp.cleanup()
+
+    for v in violations:
+        print("VIOLATION", v)
+    print(f"{len(violations)} violation(s)")
+    raise SystemExit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
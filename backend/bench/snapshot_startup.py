@@ -0,0 +1,160 @@
+"""Worker startup time and memory: index built from the DB vs mapped snapshot.
+
+    python -m bench.snapshot_startup --scale medium --workers 4
+
+Generates a bench.datagen database on SQLite, publishes an ai.snapshot of
+it, then starts --workers processes for each mode at once, the way
+gunicorn forks its workers:
+
+  db        rec_state.load_rec_index(): queries + matrix + neighbours
+  snapshot  rec_state.load_rec_snapshot(): np.load(mmap_mode="r")
+
+Each worker times the load, serves --requests recommendations (which
+faults in the pages it touches) and reads /proc/self/smaps_rollup while
+all workers of its mode are alive. Private memory is what a worker adds
+on its own; PSS charges shared pages to the workers mapping them, so the
+mapped snapshot shows up once per host rather than once per worker.
+Linux only for the memory columns.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from bench import datagen, sqlite_compat
+
+
+def memory():
+    # kB figures from smaps_rollup; {} where it does not exist
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.read().splitlines()[1:]
+    except OSError:
+        return {}
+    fields = dict(line.split(":", 1) for line in lines)
+    kb = {k: int(v.split()[0]) for k, v in fields.items()}
+    return {
+        "rss": kb["Rss"],
+        "pss": kb["Pss"],
+        "private": kb["Private_Clean"] + kb["Private_Dirty"]
+    }
+
+
+def _worker(mode, url, root, requests, seed, barrier, results):
+    from app import create_app
+    from config import Config
+    import dev_jwks
+    from models import db
+    import rec_state
+
+    class WorkerConfig(Config):
+        SQLALCHEMY_DATABASE_URI = url
+        CLERK_JWKS_FILE = Config.CLERK_JWKS_FILE or dev_jwks.JWKS_FILE
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    app = create_app(WorkerConfig)
+    with app.app_context():
+        sqlite_compat.install(db.engine)
+        before = memory()
+        barrier.wait()
+
+        t0 = time.perf_counter()
+        if mode == "snapshot":
+            rec_state.load_rec_snapshot(root)
+        else:
+            rec_state.load_rec_index()
+        load_ms = (time.perf_counter() - t0) * 1000
+
+        index = rec_state.rec_index
+        tags = sorted(index._tag_ids)
+        events = index._current_state().event_ids
+        rng = random.Random(seed)
+        for _ in range(requests):
+            index.recommend(
+                rng.sample(tags, min(4, len(tags))), top_k=20,
+                history=[int(e) for e in rng.sample(list(events[:5000]), 5)],
+                cf_weight=Config.REC_CF_WEIGHT
+            )
+
+        barrier.wait()   # everyone loaded: shared pages are shared now
+        after = memory()
+        results.put({
+            "load_ms": load_ms,
+            **{k: after[k] - before.get(k, 0) for k in ("rss", "private")},
+            "pss": after.get("pss", 0)
+        })
+        barrier.wait()
+
+
+def run_mode(mode, url, root, workers, requests, seed):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(mode, url, root, requests, seed + i, barrier, results))
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=datagen.SCALES, default="medium")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="recommendations per worker")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    from config import Config
+    import dev_jwks
+    from models import db
+    import rec_state
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"
+        root = os.path.join(tmp, "snapshots")
+
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = url
+            CLERK_JWKS_FILE = Config.CLERK_JWKS_FILE or dev_jwks.JWKS_FILE
+            SQLALCHEMY_ENGINE_OPTIONS = {}
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            sqlite_compat.install(db.engine)
+            sqlite_compat.create_schema(db.engine)
+            counts = datagen.populate(**datagen.SCALES[args.scale], seed=args.seed)
+            t0 = time.perf_counter()
+            version = rec_state.publish_rec_snapshot(root)
+            publish_s = time.perf_counter() - t0
+            db.engine.dispose()
+
+        size = sum(
+            os.path.getsize(os.path.join(root, version, name))
+            for name in os.listdir(os.path.join(root, version))
+        )
+        print(f"{args.scale}: {counts}")
+        print(f"snapshot {version}: {size / 2 ** 20:.1f} MB on disk, published in {publish_s:.2f}s")
+        print(f"{'mode':<10}{'load ms':>10}{'+RSS MB':>10}{'+private MB':>13}{'PSS MB':>10}")
+        for mode in ("db", "snapshot"):
+            stats = run_mode(mode, url, root, args.workers, args.requests, args.seed)
+            print(f"{mode:<10}"
+                  f"{statistics.median(s['load_ms'] for s in stats):>10.1f}"
+                  f"{statistics.fmean(s['rss'] for s in stats) / 1024:>10.1f}"
+                  f"{statistics.fmean(s['private'] for s in stats) / 1024:>13.1f}"
+                  f"{statistics.fmean(s['pss'] for s in stats) / 1024:>10.1f}")
+        print(f"(medians / means per worker over {args.workers} concurrent workers; "
+              "+ is growth during load and serving)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Run the app on SQLite for offline benchmarks.
+
+schema_script() turns db_setup.sql into SQLite DDL, so the benchmark
+database has the same tables, keys and indexes as MariaDB. install(engine)
+teaches an SQLite engine the MariaDB dialect the routes use:
+
+  CURDATE(), DATEDIFF(), LN(), NOW(fsp),            Python functions
+  LAST_INSERT_ID(x)
+  INSERT ... ON DUPLICATE KEY UPDATE ... VALUES(c)  ON CONFLICT DO UPDATE ... excluded.c
+  GROUP_CONCAT(x ORDER BY y)                        GROUP_CONCAT(x)
+  SELECT ... FOR UPDATE [SKIP LOCKED]               SELECT ...
+
+LAST_INSERT_ID(x) does not reach cursor.lastrowid on SQLite, so an upsert
+that hits an existing row reports a stale id; the benchmarks only upsert
+new rows. SQLite has no row locks; for threaded benchmarks,
+install(engine, immediate=True) starts every transaction with BEGIN
+IMMEDIATE, which serializes writers on the database lock instead of
+failing them with "database is locked" when two try to upgrade.
+SQLite leaves foreign keys unchecked unless asked; install(engine,
+foreign_keys=True) enforces them like InnoDB (the tests do).
+
+Timings are SQLite's, which is good for spotting regressions in the
+Python side and in query shape, not for absolute MariaDB numbers.
+"""
+import datetime
+import math
+import os
+import re
+
+from sqlalchemy import event
+
+DB_SETUP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db_setup.sql")
+
+_TABLE = re.compile(r"CREATE TABLE `(\w+)` \((.*?)\n\)[^;]*;", re.S)
+_KEY = re.compile(r"^KEY `(\w+)` (\(.*\))$")
+_UNIQUE = re.compile(r"^UNIQUE KEY `\w+` (\(.*\))$")
+
+
+def schema_script(path=DB_SETUP):
+    with open(path) as f:
+        dump = f.read()
+
+    statements = []
+    for table, body in _TABLE.findall(dump):
+        lines, indexes = [], []
+        for line in body.strip().splitlines():
+            line = line.strip().rstrip(",")
+            key = _KEY.match(line)
+            if key:
+                # SQLite index names are global, so prefix the table
+                indexes.append(f"CREATE INDEX `{table}_{key.group(1)}` ON `{table}` {key.group(2)};")
+                continue
+            unique = _UNIQUE.match(line)
+            if unique:
+                line = "UNIQUE " + unique.group(1)
+            line = re.sub(r"\bint\(\d+\)", "INTEGER", line)
+            line = re.sub(r"\benum\([^)]*\)", "TEXT", line)
+            line = line.replace(" AUTO_INCREMENT", "")
+            line = line.replace("current_timestamp()", "CURRENT_TIMESTAMP")
+            lines.append(line)
+        statements.append(f"CREATE TABLE `{table}` (\n  " + ",\n  ".join(lines) + "\n);")
+        statements.extend(indexes)
+    return "\n".join(statements)
+
+
+def create_schema(engine, path=DB_SETUP):
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.executescript(schema_script(path))
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _now(fsp):
+    # the text format SQLAlchemy's SQLite DateTime reads and binds
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _datediff(a, b):
+    if a is None or b is None:
+        return None
+    return (datetime.date.fromisoformat(str(a)[:10]) - datetime.date.fromisoformat(str(b)[:10])).days
+
+
+_REWRITES = [
+    (re.compile(r"\s+FOR UPDATE(\s+SKIP LOCKED)?\b"), ""),
+    (re.compile(r"(GROUP_CONCAT\([^()]*?)\s+ORDER BY[^()]*\)"), r"\1)"),
+    (re.compile(r"ON DUPLICATE KEY UPDATE"), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+]
+
+
+def translate(statement):
+    for pattern, repl in _REWRITES:
+        statement = pattern.sub(repl, statement)
+    return statement
+
+
+def install(engine, immediate=False, foreign_keys=False):
+    @event.listens_for(engine, "connect")
+    def _functions(dbapi_conn, record):
+        dbapi_conn.create_function("CURDATE", 0, lambda: datetime.date.today().isoformat())
+        dbapi_conn.create_function("DATEDIFF", 2, _datediff)
+        dbapi_conn.create_function("LN", 1, math.log)
+        dbapi_conn.create_function("LAST_INSERT_ID", 1, lambda x: x)
+        dbapi_conn.create_function("NOW", 1, _now)
+        if foreign_keys:
+            dbapi_conn.execute("PRAGMA foreign_keys = ON")
+        if immediate:
+            # pysqlite's own BEGIN off, so the one below is the only one
+            dbapi_conn.isolation_level = None
+
+    if immediate:
+        @event.listens_for(engine, "begin")
+        def _begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    translated = {}
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _translate(conn, cursor, statement, parameters, context, executemany):
+        if statement not in translated:
+            translated[statement] = translate(statement)
+        return translated[statement], parameters
+
+    # connections made before the listener was added lack the functions
+    engine.dispose()
@@ -0,0 +1,241 @@
+"""Route benchmarks over synthetic data, with JSON output.
+
+    python -m bench.suite --scales small medium --requests 200 --out bench.json
+    python -m bench.suite --scales small --baseline bench.json
+
+For each scale, generates a fresh SQLite database (bench.datagen on the
+db_setup.sql schema, via bench.sqlite_compat), warms the app the way a
+gunicorn worker does (app.init_worker) and drives the routes through the
+Flask test client one request at a time. Reports latency percentiles and
+throughput per route. With --baseline, compares p50/p95 against an
+earlier run and exits 1 when a route got slower than --tolerance.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench import datagen, sqlite_compat
+
+WARMUP = 5
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies, errors, wall):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50), 3),
+        "p90_ms": round(percentile(ordered, 0.90), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "max_ms": round(ordered[-1], 3),
+        "throughput_rps": round(len(ordered) / wall, 1)
+    }
+
+
+def run(client, requests, finish=None):
+    # requests: list of (prepare or None, method, url, json body or None);
+    # prepare() runs untimed before its request, finish() (timed, counted
+    # in throughput) after the last one
+    for prepare, method, url, body in requests[:WARMUP]:
+        if prepare:
+            prepare()
+        client.open(url, method=method, json=body)
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for prepare, method, url, body in requests[WARMUP:]:
+        if prepare:
+            prepare()
+        t0 = time.perf_counter()
+        resp = client.open(url, method=method, json=body)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        errors += resp.status_code >= 400
+    if finish:
+        finish()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def scenarios(counts, n, rng, existing_rsvps):
+    import rec_state
+
+    total = n + WARMUP
+    students = counts["students"]
+    sample = [rng.randint(1, students) for _ in range(total)]
+
+    new_pairs = []
+    while len(new_pairs) < 2 * total:
+        pair = (rng.randint(1, students), rng.randint(1, counts["events"]))
+        if pair not in existing_rsvps:
+            existing_rsvps.add(pair)
+            new_pairs.append(pair)
+
+    def clear_recs():
+        rec_state.rec_cache.clear()
+
+    return {
+        # cache cleared before each request: index scoring every time
+        "ai_recommend": [
+            (clear_recs, "GET", f"/ai/recommend/{s}?limit=20", None) for s in sample
+        ],
+        "ai_recommend_hybrid": [
+            (clear_recs, "GET", f"/ai/recommend/{s}?mode=hybrid&limit=20", None)
+            for s in sample
+        ],
+        "ai_recommend_cached": [
+            (None, "GET", f"/ai/recommend/{sample[0]}?limit=20", None)
+        ] * total,
+        "recommend_events": [
+            (None, "GET", f"/recommendations/{s}", None) for s in sample
+        ],
+        # catalog version bumped before each request: query + serialization
+        "get_events": [
+            (rec_state.catalog_cache.bump, "GET", "/events", None)
+        ] * total,
+        "get_events_cached": [(None, "GET", "/events", None)] * total,
+        "rsvp_event": [
+            (None, "POST", "/rsvp", {"student_id": s, "event_id": e, "status": "YES"})
+            for s, e in new_pairs[:total]
+        ],
+        # RSVP_ASYNC: 202 from the queue, throughput includes the final drain
+        "rsvp_event_async": [
+            (None, "POST", "/rsvp", {"student_id": s, "event_id": e, "status": "YES"})
+            for s, e in new_pairs[total:]
+        ],
+        "auth_sync_returning": [
+            (None, "POST", "/auth/sync",
+             {"clerk_user_id": f"bench_{s}", "email": f"student{s}@bench.test"})
+            for s in sample
+        ],
+        "auth_sync_first_login": [
+            (None, "POST", "/auth/sync",
+             {"clerk_user_id": f"new_{i}", "email": f"new{i}@bench.test"})
+            for i in range(total)
+        ],
+    }
+
+
+def bench_scale(scale, n, seed, only):
+    from sqlalchemy import text
+    from app import create_app, init_worker
+    from config import Config
+    import dev_jwks
+    from models import db
+    from rsvp_queue import rsvp_ingest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"
+            CLERK_JWKS_FILE = Config.CLERK_JWKS_FILE or dev_jwks.JWKS_FILE
+            SQLALCHEMY_ENGINE_OPTIONS = {}
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            sqlite_compat.install(db.engine)
+            sqlite_compat.create_schema(db.engine)
+            counts = datagen.populate(**datagen.SCALES[scale], seed=seed)
+            existing = set(map(tuple, db.session.execute(
+                text("SELECT student_id, event_id FROM rsvps")
+            )))
+            db.session.remove()
+        init_worker(app)
+
+        client = app.test_client()
+        routes = {}
+        for name, requests in scenarios(counts, n, random.Random(seed), existing).items():
+            if only and name not in only:
+                continue
+            queued = name.endswith("_async")
+            app.config["RSVP_ASYNC"] = queued
+            routes[name] = run(client, requests, rsvp_ingest.flush if queued else None)
+            print(f"  {name:<24} p50 {routes[name]['p50_ms']:8.2f} ms   "
+                  f"p95 {routes[name]['p95_ms']:8.2f} ms   "
+                  f"{routes[name]['throughput_rps']:8.1f} req/s   "
+                  f"errors {routes[name]['errors']}")
+
+        rsvp_ingest.stop()
+        with app.app_context():
+            db.engine.dispose()
+    return {"dataset": counts, "routes": routes}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    # -> number of (scale, route, metric) that got slower than tolerance
+    regressions = 0
+    for scale, current in results.items():
+        before = baseline.get("results", {}).get(scale, {}).get("routes", {})
+        for route, stats in current["routes"].items():
+            if route not in before:
+                continue
+            for metric in ("p50_ms", "p95_ms"):
+                ratio = stats[metric] / max(before[route][metric], 1e-9)
+                if ratio > tolerance:
+                    regressions += 1
+                    print(f"REGRESSION {scale}/{route} {metric}: "
+                          f"{before[route][metric]:.2f} -> {stats[metric]:.2f} ms (x{ratio:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=datagen.SCALES, default=["small", "medium"])
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per route")
+    parser.add_argument("--routes", nargs="+", help="only these scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown ratio before a route counts as regressed")
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scales:
+        print(f"{scale}: {datagen.SCALES[scale]}")
+        results[scale] = bench_scale(scale, args.requests, args.seed, args.routes)
+
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "requests_per_route": args.requests,
+        "seed": args.seed,
+        "results": results
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(f"{regressions} regression(s) beyond x{args.tolerance}")
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    # Bounded LRU with a per-entry time-to-live. Thread-safe; keeps hit/miss
+    # counters so callers can expose them.
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        # ttl overrides the cache-wide one for this entry (e.g. token expiry)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (self._clock() + ttl, value)
+
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None
+            }
+
+    def _remove(self, key):
+        # single exit point for entries, so subclasses can keep side indexes
+        del self._data[key]
+
+
+class RecommendationCache(TTLCache):
+    # Ranked results per (student_id, variant), where the variant names the
+    # ranking mode. Each entry remembers the student's interest tags and the
+    # events it ranks; inverted tag -> keys and event -> keys maps let an
+    # event change drop only the entries it can affect: students sharing a
+    # tag with the event, and rankings that list it (collaborative scores
+    # reach events outside the student's tags).
+    def __init__(self, maxsize=10000, ttl=300, clock=time.monotonic):
+        super().__init__(maxsize, ttl, clock)
+        self._tags = {}          # key -> frozenset(tag_ids)
+        self._by_tag = {}        # tag_id -> set(key)
+        self._events = {}        # key -> frozenset(event_ids)
+        self._by_event = {}      # event_id -> set(key)
+        self._by_student = {}    # student_id -> set(key)
+        self.invalidations = 0
+
+    def get_for(self, student_id, variant=None):
+        return self.get((student_id, variant))
+
+    def put(self, student_id, tag_ids, results, variant=None, event_ids=()):
+        key = (student_id, variant)
+        tag_ids = frozenset(tag_ids)
+        event_ids = frozenset(event_ids)
+        with self._lock:
+            self.set(key, results)
+            self._tags[key] = tag_ids
+            self._events[key] = event_ids
+            self._by_student.setdefault(student_id, set()).add(key)
+            for tag_id in tag_ids:
+                self._by_tag.setdefault(tag_id, set()).add(key)
+            for event_id in event_ids:
+                self._by_event.setdefault(event_id, set()).add(key)
+
+    def invalidate_student(self, student_id):
+        with self._lock:
+            self._invalidate(self._by_student.get(student_id, set()))
+
+    def invalidate_tags(self, tag_ids):
+        with self._lock:
+            affected = set()
+            for tag_id in tag_ids:
+                affected |= self._by_tag.get(tag_id, set())
+            self._invalidate(affected)
+
+    def invalidate_event(self, event_id, tag_ids):
+        # an event write: students sharing one of its tags (before or after
+        # the write) and every ranking that lists the event
+        with self._lock:
+            affected = set(self._by_event.get(event_id, set()))
+            for tag_id in tag_ids:
+                affected |= self._by_tag.get(tag_id, set())
+            self._invalidate(affected)
+
+    def _invalidate(self, keys):
+        keys = list(keys)
+        for key in keys:
+            self.pop(key)
+        self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            stats = super().stats()
+            stats["invalidations"] = self.invalidations
+            return stats
+
+    def _remove(self, key):
+        super()._remove(key)
+        for tag_id in self._tags.pop(key, ()):
+            _discard(self._by_tag, tag_id, key)
+        for event_id in self._events.pop(key, ()):
+            _discard(self._by_event, event_id, key)
+        _discard(self._by_student, key[0], key)
+
+
+class CatalogCache(TTLCache):
+    # Serialized catalog responses as (body bytes, etag), keyed by a version
+    # counter. Every event/tag write bumps the version, which makes all older
+    # entries unreachable at once. The version is read before the body is
+    # built, so a body built from pre-write rows is filed under the old
+    # version and never served after the bump.
+    def __init__(self, maxsize=256, ttl=60, clock=time.monotonic):
+        super().__init__(maxsize, ttl, clock)
+        self.version = 0
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self.clear()
+
+    def get_or_build(self, name, build, key=()):
+        # build() returns the body bytes; the strong etag is a digest of
+        # them so it agrees across workers and restarts
+        cache_key = (self.version, name, key)
+        entry = self.get(cache_key)
+        if entry is None:
+            body = build()
+            entry = (body, hashlib.sha1(body).hexdigest())
+            self.set(cache_key, entry)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            stats = super().stats()
+            stats["version"] = self.version
+            return stats
+
+
+def _discard(index, bucket, key):
+    keys = index.get(bucket)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del index[bucket]
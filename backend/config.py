@@ -1,3 +1,4 @@
+import os
 from urllib.parse import quote_plus
 
 DB_USER = "root" #change if username is diff
@@ -5,8 +6,94 @@ DB_PASSWORD = quote_plus("")  #put password for mariadb here
 DB_HOST = "localhost"
 DB_NAME = "student_event_system"
 
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = (
         f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # connection pool; every knob can be overridden from the environment.
+    # pool_recycle stays below MariaDB's wait_timeout so idle connections are
+    # replaced before the server drops them, pre_ping catches the rest.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": env_int("DB_POOL_SIZE", 10),
+        "max_overflow": env_int("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": env_int("DB_POOL_TIMEOUT", 10),      # seconds to wait for a connection
+        "pool_recycle": env_int("DB_POOL_RECYCLE", 1800),    # seconds
+        "pool_pre_ping": env_bool("DB_POOL_PRE_PING", True),
+        "connect_args": {
+            "connect_timeout": env_int("DB_CONNECT_TIMEOUT", 5),
+            "read_timeout": env_int("DB_READ_TIMEOUT", 30),
+            "write_timeout": env_int("DB_WRITE_TIMEOUT", 30)
+        }
+    }
+
+    # per-student /ai/recommend cache
+    REC_CACHE_SIZE = 10000
+    REC_CACHE_TTL = 300  # seconds
+
+    # serialized /events, /tags, /events/upcoming, /admin/events bodies.
+    # Writes in this worker invalidate at once.
+    CATALOG_CACHE_SIZE = 256
+    CATALOG_CACHE_TTL = 60  # seconds
+
+    # other workers' writes (cache_versions, see rec_state.sync_versions)
+    # reach this worker's index and caches within SYNC_CHECK_SECONDS
+    SYNC_CHECK_SECONDS = env_int("SYNC_CHECK_SECONDS", 5)
+    # RSVP counts from every worker reach this worker's popularity scores
+    REC_POPULARITY_SYNC_SECONDS = env_int("REC_POPULARITY_SYNC_SECONDS", 60)
+
+    # /ai/recommend?mode=hybrid: cosine + log popularity + date decay
+    REC_HYBRID_WEIGHTS = {"similarity": 1.0, "popularity": 0.3, "recency": 0.3}
+    REC_RECENCY_HALF_LIFE_DAYS = 14
+
+    # item-item collaborative scores from co-RSVPs, blended into
+    # /ai/recommend with this weight (0 turns them off); each worker
+    # rebuilds the top-N neighbour table in the background once it is
+    # older than REC_CF_REFRESH_SECONDS
+    REC_CF_WEIGHT = float(os.environ.get("REC_CF_WEIGHT", 0.3))
+    REC_CF_NEIGHBORS = env_int("REC_CF_NEIGHBORS", 20)
+    REC_CF_REFRESH_SECONDS = env_int("REC_CF_REFRESH_SECONDS", 900)
+
+    # workers map the recommendation index from snapshots published here
+    # (python rec_snapshot.py) instead of building it from the DB, and swap
+    # to a newer one within REC_SNAPSHOT_CHECK_SECONDS; unset: build from
+    # the DB as before
+    REC_SNAPSHOT_DIR = os.environ.get("REC_SNAPSHOT_DIR") or None
+    REC_SNAPSHOT_CHECK_SECONDS = env_int("REC_SNAPSHOT_CHECK_SECONDS", 30)
+
+    # POST /rsvp through the batching queue in rsvp_queue.py (202 PENDING)
+    RSVP_ASYNC = env_bool("RSVP_ASYNC", False)
+    RSVP_QUEUE_SIZE = env_int("RSVP_QUEUE_SIZE", 10000)
+    RSVP_BATCH_SIZE = env_int("RSVP_BATCH_SIZE", 500)
+    RSVP_FLUSH_MS = env_int("RSVP_FLUSH_MS", 50)
+    RSVP_SPILL_FILE = os.environ.get("RSVP_SPILL_FILE", "rsvp_spill.ndjson")
+
+    # opt-in request profiling: per-route histograms at /metrics/routes;
+    # PROFILE_SAMPLE_RATE of requests run under cProfile and the ones slower
+    # than PROFILE_SLOW_MS are dumped to PROFILE_DIR
+    PROFILE_REQUESTS = env_bool("PROFILE_REQUESTS", False)
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_SLOW_MS = env_int("PROFILE_SLOW_MS", 500)
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+    # require_role identity cache and local JWT verification
+    AUTH_CACHE_SIZE = 10000
+    AUTH_CACHE_TTL = 60  # seconds
+    CLERK_JWKS_URL = os.environ.get("CLERK_JWKS_URL")
+    CLERK_JWKS_FILE = os.environ.get("CLERK_JWKS_FILE")  # local key set (tests)
+    CLERK_ISSUER = os.environ.get("CLERK_ISSUER")
+    CLERK_AUDIENCE = os.environ.get("CLERK_AUDIENCE")  # checked when set
+    JWKS_TTL = 3600
@@ -0,0 +1,200 @@
+"""Materialized RSVP counters.
+
+event_rsvp_counts holds per-event RSVP counts by status and
+department_participation the per-department RSVP totals, so popularity and
+analytics read one row instead of scanning rsvps. The helpers below run
+inside the caller's transaction; rebuild from scratch with
+
+    python counters.py
+"""
+from sqlalchemy import text
+from models import db
+
+STATUS_COLUMNS = {
+    "YES": "yes_count", "NO": "no_count", "MAYBE": "maybe_count",
+    "WAITLIST": "waitlist_count"
+}
+
+
+def record_rsvp(student_id, event_id, status):
+    column = STATUS_COLUMNS[status]
+    db.session.execute(
+        text(f"""
+            INSERT INTO event_rsvp_counts (event_id, {column})
+            VALUES (:eid, 1)
+            ON DUPLICATE KEY UPDATE {column} = {column} + 1
+        """),
+        {"eid": event_id}
+    )
+    db.session.execute(
+        text("""
+            INSERT INTO department_participation (department_id, participation_count)
+            SELECT department_id, 1
+            FROM student
+            WHERE student_id = :sid AND department_id IS NOT NULL
+            ON DUPLICATE KEY UPDATE participation_count = participation_count + 1
+        """),
+        {"sid": student_id}
+    )
+
+
+def change_status(event_id, old, new):
+    # an existing RSVP moved from `old` to `new`; department totals are
+    # per row, so only the event's status columns change
+    if old == new:
+        return
+    old_column, new_column = STATUS_COLUMNS[old], STATUS_COLUMNS[new]
+    db.session.execute(
+        text(f"""
+            UPDATE event_rsvp_counts
+            SET {old_column} = {old_column} - 1, {new_column} = {new_column} + 1
+            WHERE event_id = :eid
+        """),
+        {"eid": event_id}
+    )
+
+
+def record_rsvps(rows, previous, departments):
+    # Batch form of record_rsvp for upserted rows. rows: (student_id,
+    # event_id) -> status written; previous: the same key -> status before
+    # the write, for rows that existed; departments: student_id ->
+    # department_id. New rows count in their status and department, rows
+    # whose status changed move between status columns. Returns
+    # event_id -> number of new rows.
+    event_deltas, department_deltas, new_rows = {}, {}, {}
+    for (student_id, event_id), status in rows.items():
+        old = previous.get((student_id, event_id))
+        if old == status:
+            continue
+        deltas = event_deltas.setdefault(
+            event_id, dict.fromkeys(STATUS_COLUMNS.values(), 0)
+        )
+        deltas[STATUS_COLUMNS[status]] += 1
+        if old is not None:
+            deltas[STATUS_COLUMNS[old]] -= 1
+            continue
+
+        new_rows[event_id] = new_rows.get(event_id, 0) + 1
+        department_id = departments.get(student_id)
+        if department_id is not None:
+            department_deltas[department_id] = department_deltas.get(department_id, 0) + 1
+
+    if event_deltas:
+        columns = list(STATUS_COLUMNS.values())
+        db.session.execute(
+            text(f"""
+                INSERT INTO event_rsvp_counts (event_id, {", ".join(columns)})
+                VALUES (:eid, {", ".join(":" + c for c in columns)})
+                ON DUPLICATE KEY UPDATE
+                    {", ".join(f"{c} = {c} + VALUES({c})" for c in columns)}
+            """),
+            [{"eid": eid, **deltas} for eid, deltas in event_deltas.items()]
+        )
+    if department_deltas:
+        db.session.execute(
+            text("""
+                INSERT INTO department_participation (department_id, participation_count)
+                VALUES (:did, :n)
+                ON DUPLICATE KEY UPDATE
+                    participation_count = participation_count + VALUES(participation_count)
+            """),
+            [{"did": did, "n": n} for did, n in department_deltas.items()]
+        )
+    return new_rows
+
+
+def move_student(student_id, old_department_id, new_department_id):
+    # participation follows the student's current department
+    if old_department_id == new_department_id:
+        return
+
+    params = {"sid": student_id, "old": old_department_id, "new": new_department_id}
+    if old_department_id is not None:
+        db.session.execute(
+            text("""
+                UPDATE department_participation
+                SET participation_count = participation_count - (
+                    SELECT COUNT(*) FROM rsvps WHERE student_id = :sid
+                )
+                WHERE department_id = :old
+            """),
+            params
+        )
+    if new_department_id is not None:
+        db.session.execute(
+            text("""
+                INSERT INTO department_participation (department_id, participation_count)
+                SELECT :new, COUNT(*) FROM rsvps WHERE student_id = :sid
+                ON DUPLICATE KEY UPDATE
+                    participation_count = participation_count + VALUES(participation_count)
+            """),
+            params
+        )
+
+
+def forget_event(event_id):
+    # call before deleting an event: its RSVPs go away by cascade
+    # (event_rsvp_counts cascades too)
+    db.session.execute(
+        text("""
+            UPDATE department_participation
+            SET participation_count = participation_count - (
+                SELECT COUNT(*)
+                FROM rsvps r
+                JOIN student s ON r.student_id = s.student_id
+                WHERE r.event_id = :eid
+                  AND s.department_id = department_participation.department_id
+            )
+            WHERE department_id IN (
+                SELECT s.department_id
+                FROM rsvps r
+                JOIN student s ON r.student_id = s.student_id
+                WHERE r.event_id = :eid
+            )
+        """),
+        {"eid": event_id}
+    )
+
+
+def rebuild():
+    db.session.execute(text("DELETE FROM event_rsvp_counts"))
+    db.session.execute(text("""
+        INSERT INTO event_rsvp_counts
+            (event_id, yes_count, no_count, maybe_count, waitlist_count)
+        SELECT
+            event_id,
+            SUM(rsvp_status = 'YES'),
+            SUM(rsvp_status = 'NO'),
+            SUM(rsvp_status = 'MAYBE'),
+            SUM(rsvp_status = 'WAITLIST')
+        FROM rsvps
+        GROUP BY event_id
+    """))
+    # seats.py keeps event.seats_taken equal to the YES count
+    db.session.execute(text("""
+        UPDATE event
+        SET seats_taken = (
+            SELECT COUNT(*) FROM rsvps r
+            WHERE r.event_id = event.event_id AND r.rsvp_status = 'YES'
+        )
+    """))
+
+    db.session.execute(text("DELETE FROM department_participation"))
+    db.session.execute(text("""
+        INSERT INTO department_participation (department_id, participation_count)
+        SELECT s.department_id, COUNT(*)
+        FROM rsvps r
+        JOIN student s ON r.student_id = s.student_id
+        WHERE s.department_id IS NOT NULL
+        GROUP BY s.department_id
+    """))
+    db.session.commit()
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        rebuild()
+    print("RSVP counters rebuilt")
@@ -7,6 +7,19 @@
 
 
 
+--
+-- Table structure for table `cache_versions`
+--
+
+DROP TABLE IF EXISTS `cache_versions`;
+
+CREATE TABLE `cache_versions` (
+  `name` varchar(50) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+
 --
 -- Table structure for table `clubs`
 --
@@ -36,6 +49,20 @@ CREATE TABLE `department` (
 ) ENGINE=InnoDB AUTO_INCREMENT=7 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 
+--
+-- Table structure for table `department_participation`
+--
+
+DROP TABLE IF EXISTS `department_participation`;
+
+CREATE TABLE `department_participation` (
+  `department_id` int(11) NOT NULL,
+  `participation_count` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`department_id`),
+  CONSTRAINT `fk_participation_department` FOREIGN KEY (`department_id`) REFERENCES `department` (`department_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+
 --
 -- Table structure for table `event`
 --
@@ -51,10 +78,31 @@ CREATE TABLE `event` (
   `created_at` timestamp NULL DEFAULT current_timestamp(),
   `organizer_type` varchar(50) DEFAULT NULL,
   `registration_link` varchar(500) DEFAULT NULL,
-  PRIMARY KEY (`event_id`)
+  `capacity` int(11) DEFAULT NULL,
+  `seats_taken` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`event_id`),
+  KEY `idx_event_date` (`event_date`,`event_id`,`title`,`location`),
+  KEY `idx_event_created_at` (`created_at`,`event_id`,`title`)
 ) ENGINE=InnoDB AUTO_INCREMENT=19 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 
+--
+-- Table structure for table `event_rsvp_counts`
+--
+
+DROP TABLE IF EXISTS `event_rsvp_counts`;
+
+CREATE TABLE `event_rsvp_counts` (
+  `event_id` int(11) NOT NULL,
+  `yes_count` int(11) NOT NULL DEFAULT 0,
+  `no_count` int(11) NOT NULL DEFAULT 0,
+  `maybe_count` int(11) NOT NULL DEFAULT 0,
+  `waitlist_count` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`event_id`),
+  CONSTRAINT `fk_rsvpcounts_event` FOREIGN KEY (`event_id`) REFERENCES `event` (`event_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+
 --
 -- Table structure for table `event_tags`
 --
@@ -71,6 +119,25 @@ CREATE TABLE `event_tags` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 
+--
+-- Table structure for table `precomputed_recommendations`
+--
+
+DROP TABLE IF EXISTS `precomputed_recommendations`;
+
+CREATE TABLE `precomputed_recommendations` (
+  `student_id` int(11) NOT NULL,
+  `position` smallint(6) NOT NULL,
+  `event_id` int(11) NOT NULL,
+  `score` double NOT NULL,
+  `computed_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`student_id`,`position`),
+  KEY `fk_precomputed_event` (`event_id`),
+  CONSTRAINT `fk_precomputed_student` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_precomputed_event` FOREIGN KEY (`event_id`) REFERENCES `event` (`event_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+
 --
 -- Table structure for table `rsvps`
 --
@@ -80,12 +147,12 @@ DROP TABLE IF EXISTS `rsvps`;
 CREATE TABLE `rsvps` (
   `student_id` int(11) NOT NULL,
   `event_id` int(11) NOT NULL,
-  `rsvp_status` enum('YES','NO','MAYBE') DEFAULT 'YES',
+  `rsvp_status` enum('YES','NO','MAYBE','WAITLIST') DEFAULT 'YES',
   `rsvp_time` timestamp NULL DEFAULT current_timestamp(),
   PRIMARY KEY (`student_id`,`event_id`),
   KEY `fk_rsvps_event` (`event_id`),
-  CONSTRAINT `1` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE,
-  CONSTRAINT `2` FOREIGN KEY (`event_id`) REFERENCES `event` (`event_id`) ON DELETE CASCADE,
+  KEY `idx_rsvps_event_waitlist` (`event_id`,`rsvp_status`,`rsvp_time`),
+  KEY `idx_rsvps_student_status` (`student_id`,`rsvp_status`,`event_id`),
   CONSTRAINT `fk_rsvps_event` FOREIGN KEY (`event_id`) REFERENCES `event` (`event_id`) ON DELETE CASCADE ON UPDATE CASCADE,
   CONSTRAINT `fk_rsvps_student` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -119,6 +186,21 @@ CREATE TABLE `student` (
 ) ENGINE=InnoDB AUTO_INCREMENT=36 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 
+--
+-- Table structure for table `student_cache_versions`
+--
+
+DROP TABLE IF EXISTS `student_cache_versions`;
+
+CREATE TABLE `student_cache_versions` (
+  `student_id` int(11) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 0,
+  `updated_at` timestamp(6) NOT NULL,
+  PRIMARY KEY (`student_id`),
+  KEY `idx_updated_at` (`updated_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+
 --
 -- Table structure for table `student_clubs`
 --
@@ -130,8 +212,6 @@ CREATE TABLE `student_clubs` (
   `club_id` int(11) NOT NULL,
   PRIMARY KEY (`student_id`,`club_id`),
   KEY `fk_student_clubs_club` (`club_id`),
-  CONSTRAINT `1` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE,
-  CONSTRAINT `2` FOREIGN KEY (`club_id`) REFERENCES `clubs` (`club_id`) ON DELETE CASCADE,
   CONSTRAINT `fk_student_clubs_club` FOREIGN KEY (`club_id`) REFERENCES `clubs` (`club_id`) ON DELETE CASCADE ON UPDATE CASCADE,
   CONSTRAINT `fk_student_clubs_student` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -148,8 +228,6 @@ CREATE TABLE `student_interests` (
   `tag_id` int(11) NOT NULL,
   PRIMARY KEY (`student_id`,`tag_id`),
   KEY `fk_student_interests_tag` (`tag_id`),
-  CONSTRAINT `1` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE,
-  CONSTRAINT `2` FOREIGN KEY (`tag_id`) REFERENCES `tag` (`tag_id`) ON DELETE CASCADE,
   CONSTRAINT `fk_student_interests_student` FOREIGN KEY (`student_id`) REFERENCES `student` (`student_id`) ON DELETE CASCADE ON UPDATE CASCADE,
   CONSTRAINT `fk_student_interests_tag` FOREIGN KEY (`tag_id`) REFERENCES `tag` (`tag_id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,67 @@
+"""Local stand-in for Clerk's signing keys, for tests and offline dev.
+
+    python dev_jwks.py init                # writes dev_keys/jwks.json + private.pem
+    python dev_jwks.py mint user_abc123    # prints a signed session token
+
+Point the backend at the key set with CLERK_JWKS_FILE=dev_keys/jwks.json.
+"""
+import argparse
+import json
+import os
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+KEY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dev_keys")
+JWKS_FILE = os.path.join(KEY_DIR, "jwks.json")
+KID = "dev-key-1"
+
+
+def init(key_dir=KEY_DIR):
+    os.makedirs(key_dir, exist_ok=True)
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    with open(os.path.join(key_dir, "private.pem"), "wb") as f:
+        f.write(private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": KID, "alg": "RS256", "use": "sig"})
+    with open(os.path.join(key_dir, "jwks.json"), "w") as f:
+        json.dump({"keys": [jwk]}, f, indent=2)
+
+
+def mint(sub, ttl=3600, issuer=None, audience=None, key_dir=KEY_DIR, kid=KID):
+    with open(os.path.join(key_dir, "private.pem"), "rb") as f:
+        private_key = f.read()
+
+    now = int(time.time())
+    claims = {"sub": sub, "iat": now, "exp": now + ttl}
+    if issuer:
+        claims["iss"] = issuer
+    if audience:
+        claims["aud"] = audience
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("init")
+    m = sub.add_parser("mint")
+    m.add_argument("sub")
+    m.add_argument("--ttl", type=int, default=3600)
+    m.add_argument("--issuer")
+    m.add_argument("--audience")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        init()
+        print(f"wrote {KEY_DIR}/jwks.json")
+    else:
+        print(mint(args.sub, args.ttl, args.issuer, args.audience))
@@ -0,0 +1,71 @@
+"""Streaming NDJSON / CSV exports.
+
+Rows come off a server-side cursor (stream_results, which is PyMySQL's
+unbuffered SSCursor) in yield_per batches, and each batch is written to the
+response as soon as it is read. Memory stays at one batch however many
+rows the export has.
+"""
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+from models import db
+
+EXPORT_BATCH_ROWS = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def parse_format(value):
+    fmt = (value or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("format must be one of " + ", ".join(EXPORT_FORMATS))
+    return fmt
+
+
+def ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n"
+            for row in rows
+        )
+
+
+def csv_chunks(columns, batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+    # header only, when there were no rows
+    if buf.tell():
+        yield buf.getvalue()
+
+
+FORMATTERS = {"ndjson": ndjson_chunks, "csv": csv_chunks}
+
+
+def export_response(query, params, fmt, filename, batch_rows=EXPORT_BATCH_ROWS):
+    def generate():
+        # a connection of its own: an unbuffered cursor keeps it busy until
+        # the last row is read, so it cannot be the request session's
+        with db.engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=batch_rows
+            ).execute(query, params)
+            yield from FORMATTERS[fmt](list(result.keys()), result.partitions())
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
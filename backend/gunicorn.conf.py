@@ -0,0 +1,47 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every knob can be overridden from the environment. Each worker is its own
+# process with its own DB pool (Config.SQLALCHEMY_ENGINE_OPTIONS) and its own
+# recommendation index/cache, so keep workers * (DB_POOL_SIZE +
+# DB_MAX_OVERFLOW) below MariaDB's max_connections. A write to events, event
+# tags or interests shows up in the other workers within SYNC_CHECK_SECONDS
+# (cache_versions); a student's cached ranking after an RSVP in another
+# worker can be up to REC_CACHE_TTL old.
+#
+# Graceful reload: `kill -HUP <master pid>` starts fresh workers and lets the
+# old ones finish their in-flight requests (up to graceful_timeout).
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# recycle workers now and then so slow leaks cannot pile up
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+# preload imports the app once in the master (faster spawn, shared pages);
+# without it a HUP also picks up new code
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-") or None
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    from app import init_worker
+
+    init_worker(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    # write out RSVPs still queued in this worker before it goes away
+    from rsvp_queue import rsvp_ingest
+
+    rsvp_ingest.stop()
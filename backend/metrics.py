@@ -0,0 +1,317 @@
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# bucket upper bounds in milliseconds; the last bucket is open-ended
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# SQL statements per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class Histogram:
+    # Fixed-bucket histogram, latency in ms unless told otherwise (the unit
+    # only names the snapshot keys). Cheap to record from many threads;
+    # percentiles are reported as the upper bound of their bucket.
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS, unit="ms"):
+        self.buckets = tuple(buckets)
+        self.unit = unit
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms):
+        i = bisect.bisect_left(self.buckets, value_ms)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.total += value_ms
+            if value_ms > self.max:
+                self.max = value_ms
+
+    def percentile(self, q):
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for i, n in enumerate(self._counts):
+                seen += n
+                if seen >= rank:
+                    return self.buckets[i] if i < len(self.buckets) else self.max
+            return self.max
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            count, total, peak = self.count, self.total, self.max
+        u = self.unit
+        return {
+            "count": count,
+            f"sum_{u}": round(total, 3),
+            f"mean_{u}": round(total / count, 3) if count else None,
+            f"max_{u}": round(peak, 3),
+            f"p50_{u}": self.percentile(0.50),
+            f"p95_{u}": self.percentile(0.95),
+            f"p99_{u}": self.percentile(0.99),
+            "buckets": [
+                {f"le_{u}": bound, "count": n}
+                for bound, n in zip(self.buckets + ("inf",), counts)
+            ]
+        }
+
+
+# ================= DB CONNECTION POOL =================
+
+class PoolMetrics:
+    def __init__(self):
+        self.wait = Histogram()
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+
+    def _bump(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def install(self, engine):
+        pool = engine.pool
+
+        @event.listens_for(pool, "connect")
+        def _connect(dbapi_conn, record):
+            self._bump("connects")
+
+        @event.listens_for(pool, "checkout")
+        def _checkout(dbapi_conn, record, proxy):
+            self._bump("checkouts")
+            checked_out = pool.checkedout()
+            with self._lock:
+                if checked_out > self.peak_checked_out:
+                    self.peak_checked_out = checked_out
+
+        @event.listens_for(pool, "checkin")
+        def _checkin(dbapi_conn, record):
+            self._bump("checkins")
+
+        @event.listens_for(pool, "invalidate")
+        def _invalidate(dbapi_conn, record, exc):
+            self._bump("invalidations")
+
+    def snapshot(self, pool):
+        stats = {
+            "pool_class": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "peak_checked_out": self.peak_checked_out,
+            "wait": self.wait.snapshot()
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout_s": pool.timeout()
+            })
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that times each checkout (queue wait + pre-ping) and counts
+    # pool timeouts into pool_metrics
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_metrics._bump("timeouts")
+            raise
+        finally:
+            pool_metrics.wait.record((time.perf_counter() - start) * 1000)
+
+
+# ================= REQUEST PROFILING =================
+
+class RouteStats:
+    def __init__(self):
+        self.wall = Histogram()
+        self.sql_time = Histogram()
+        self.sql_statements = Histogram(STATEMENT_BUCKETS, unit="stmts")
+        self.sections = {}   # name -> Histogram
+
+    def snapshot(self):
+        return {
+            "wall": self.wall.snapshot(),
+            "sql_time": self.sql_time.snapshot(),
+            "sql_statements": self.sql_statements.snapshot(),
+            **{name: h.snapshot() for name, h in self.sections.items()}
+        }
+
+
+class RouteProfiler:
+    # Opt-in (Config.PROFILE_REQUESTS) per-route histograms of wall time,
+    # SQL statement count and SQL time, plus named sections timed with
+    # section(). A sample_rate fraction of requests also runs under
+    # cProfile; those slower than slow_ms are dumped to profile_dir as
+    # .prof files (python -m pstats <file>). A profiled request runs alone
+    # in its process: cProfile cannot nest, and on Python 3.12+ it hooks
+    # sys.monitoring, which is interpreter-wide, so under gthread any other
+    # request in flight would land in the same profile. A request is only
+    # sampled when no other is running, and new requests wait at
+    # before_request until it finishes.
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.slow_ms = None
+        self.profile_dir = None
+        self.routes = {}        # "METHOD /rule" -> RouteStats
+        self.profiles_dumped = 0
+        self._lock = threading.Lock()
+        self._gate = threading.Condition()
+        self._in_flight = 0
+        self._exclusive = False
+        self._local = threading.local()
+
+    def install(self, app, engine, sample_rate=0.0, slow_ms=500, profile_dir="profiles"):
+        self.enabled = True
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.profile_dir = profile_dir
+
+        app.before_request(self._begin)
+        app.teardown_request(self._end)
+        event.listen(engine, "before_cursor_execute", self._before_sql)
+        event.listen(engine, "after_cursor_execute", self._after_sql)
+
+    @contextmanager
+    def section(self, name):
+        # time a block of the current request into its route's `name`
+        # histogram; a no-op when profiling is off
+        state = self._local
+        if not getattr(state, "active", False):
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            state.sections[name] = state.sections.get(name, 0.0) + elapsed
+
+    def _begin(self):
+        state = self._local
+        state.active = True
+        state.sql_count = 0
+        state.sql_ms = 0.0
+        state.sections = {}
+        state.profile = None
+        with self._gate:
+            while self._exclusive:
+                self._gate.wait()
+            self._in_flight += 1
+            if (
+                self.sample_rate
+                and self._in_flight == 1
+                and random.random() < self.sample_rate
+            ):
+                self._exclusive = True
+                state.profile = cProfile.Profile()
+        if state.profile is not None:
+            state.profile.enable()
+        state.started = time.perf_counter()
+
+    def _end(self, exc):
+        state = self._local
+        if not getattr(state, "active", False):
+            return
+        wall_ms = (time.perf_counter() - state.started) * 1000
+        state.active = False
+
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        route = f"{request.method} {rule}"
+
+        profiled = state.profile is not None
+        try:
+            if profiled:
+                state.profile.disable()
+                if wall_ms >= self.slow_ms:
+                    self._dump(state.profile, route, wall_ms)
+        finally:
+            state.profile = None
+            with self._gate:
+                self._in_flight -= 1
+                if profiled:
+                    self._exclusive = False
+                    self._gate.notify_all()
+
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            for name in state.sections:
+                if name not in stats.sections:
+                    stats.sections[name] = Histogram()
+        stats.wall.record(wall_ms)
+        stats.sql_time.record(state.sql_ms)
+        stats.sql_statements.record(state.sql_count)
+        for name, ms in state.sections.items():
+            stats.sections[name].record(ms)
+
+    def _dump(self, profile, route, wall_ms):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = "".join(c if c.isalnum() else "_" for c in route).strip("_")
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(
+            self.profile_dir, f"{stamp}-{os.getpid()}-{slug}-{wall_ms:.0f}ms.prof"
+        )
+        profile.dump_stats(path)
+        with self._lock:
+            self.profiles_dumped += 1
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._local, "active", False):
+            self._local.sql_started = time.perf_counter()
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        state = self._local
+        if getattr(state, "active", False) and hasattr(state, "sql_started"):
+            state.sql_ms += (time.perf_counter() - state.sql_started) * 1000
+            state.sql_count += 1
+
+    def snapshot(self):
+        with self._lock:
+            routes = dict(self.routes)
+            dumped = self.profiles_dumped
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "profile_dir": self.profile_dir,
+            "profiles_dumped": dumped,
+            "routes": {route: stats.snapshot() for route, stats in sorted(routes.items())}
+        }
+
+
+route_profiler = RouteProfiler()
@@ -0,0 +1,125 @@
+"""counter and precomputed recommendation tables
+
+Revision ID: 0000
+Revises: 
+Create Date: 2026-10-18 17:05:31.220914
+
+Baseline is the original db_setup.sql. Three tables were added to the
+schema before migrations existed:
+
+  precomputed_recommendations   precompute.py's top-N per student
+  event_rsvp_counts             RSVPs per event by status (counters.py)
+  department_participation      RSVPs per department (counters.py)
+
+Each is created only where it is missing, so a database set up from a
+later db_setup.sql passes through unchanged. Counter tables created here
+are filled from rsvps, as `python counters.py` would; the columns 0002
+adds (waitlist_count) are left to 0002. Tables created here carry
+CREATED_COMMENT, and downgrade drops only those: tables that were there
+before the upgrade stay.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLE_OPTIONS = {
+    "mysql_engine": "InnoDB",
+    "mysql_charset": "utf8mb4",
+    "mysql_collate": "utf8mb4_unicode_ci",
+}
+CREATED_COMMENT = "created by migration 0000"
+TABLES = (
+    "precomputed_recommendations", "event_rsvp_counts", "department_participation"
+)
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "precomputed_recommendations" not in existing:
+        op.create_table(
+            "precomputed_recommendations",
+            sa.Column("student_id", sa.Integer(), nullable=False),
+            sa.Column("position", sa.SmallInteger(), nullable=False),
+            sa.Column("event_id", sa.Integer(), nullable=False),
+            sa.Column("score", sa.Float(precision=53), nullable=False),
+            sa.Column(
+                "computed_at", sa.TIMESTAMP(), nullable=True,
+                server_default=sa.func.current_timestamp()
+            ),
+            sa.PrimaryKeyConstraint("student_id", "position"),
+            sa.ForeignKeyConstraint(
+                ["student_id"], ["student.student_id"],
+                name="fk_precomputed_student", ondelete="CASCADE"
+            ),
+            sa.ForeignKeyConstraint(
+                ["event_id"], ["event.event_id"],
+                name="fk_precomputed_event", ondelete="CASCADE"
+            ),
+            comment=CREATED_COMMENT,
+            **TABLE_OPTIONS
+        )
+        op.create_index("fk_precomputed_event", "precomputed_recommendations", ["event_id"])
+
+    if "event_rsvp_counts" not in existing:
+        op.create_table(
+            "event_rsvp_counts",
+            sa.Column("event_id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("yes_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("no_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("maybe_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.ForeignKeyConstraint(
+                ["event_id"], ["event.event_id"],
+                name="fk_rsvpcounts_event", ondelete="CASCADE"
+            ),
+            comment=CREATED_COMMENT,
+            **TABLE_OPTIONS
+        )
+        op.execute("""
+            INSERT INTO event_rsvp_counts (event_id, yes_count, no_count, maybe_count)
+            SELECT
+                event_id,
+                SUM(rsvp_status = 'YES'),
+                SUM(rsvp_status = 'NO'),
+                SUM(rsvp_status = 'MAYBE')
+            FROM rsvps
+            GROUP BY event_id
+        """)
+
+    if "department_participation" not in existing:
+        op.create_table(
+            "department_participation",
+            sa.Column("department_id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column(
+                "participation_count", sa.Integer(), nullable=False, server_default="0"
+            ),
+            sa.ForeignKeyConstraint(
+                ["department_id"], ["department.department_id"],
+                name="fk_participation_department", ondelete="CASCADE"
+            ),
+            comment=CREATED_COMMENT,
+            **TABLE_OPTIONS
+        )
+        op.execute("""
+            INSERT INTO department_participation (department_id, participation_count)
+            SELECT s.department_id, COUNT(*)
+            FROM rsvps r
+            JOIN student s ON r.student_id = s.student_id
+            WHERE s.department_id IS NOT NULL
+            GROUP BY s.department_id
+        """)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    for table in reversed(TABLES):
+        if table in existing and \
+                inspector.get_table_comment(table).get("text") == CREATED_COMMENT:
+            op.drop_table(table)
@@ -0,0 +1,60 @@
+"""hot query indexes, drop duplicate foreign keys
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18 08:53:46.696206
+
+Baseline is revision 0000. Indexes for the routes that filter or sort on
+columns nothing indexed:
+
+  idx_event_date           /events/upcoming, /students/<id>/upcoming-events,
+                           keyset pages on (event_date, event_id)
+  idx_event_created_at     cold start recommendations, /admin/events
+  idx_rsvps_student_status /students/<id>/upcoming-events (covers the
+                           rsvps side: student_id, rsvp_status, event_id)
+
+rsvps, student_clubs and student_interests each carried two unnamed
+foreign keys (`1`, `2`) duplicating the named fk_* ones, so every write
+checked each parent twice. The named constraints stay.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = '0000'
+branch_labels = None
+depends_on = None
+
+# table -> (column of `1`, parent), (column of `2`, parent)
+DUPLICATE_FKS = {
+    "rsvps": (("student_id", "student"), ("event_id", "event")),
+    "student_clubs": (("student_id", "student"), ("club_id", "clubs")),
+    "student_interests": (("student_id", "student"), ("tag_id", "tag")),
+}
+
+
+def upgrade():
+    op.create_index("idx_event_date", "event", ["event_date"])
+    op.create_index("idx_event_created_at", "event", ["created_at"])
+    op.create_index(
+        "idx_rsvps_student_status", "rsvps",
+        ["student_id", "rsvp_status", "event_id"]
+    )
+
+    for table in DUPLICATE_FKS:
+        op.drop_constraint("1", table, type_="foreignkey")
+        op.drop_constraint("2", table, type_="foreignkey")
+
+
+def downgrade():
+    for table, fks in DUPLICATE_FKS.items():
+        for name, (column, parent) in zip(("1", "2"), fks):
+            op.create_foreign_key(
+                name, table, parent, [column], [column], ondelete="CASCADE"
+            )
+
+    op.drop_index("idx_rsvps_student_status", table_name="rsvps")
+    op.drop_index("idx_event_created_at", table_name="event")
+    op.drop_index("idx_event_date", table_name="event")
@@ -0,0 +1,72 @@
+"""event capacity and RSVP waitlist
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 14:12:05.318402
+
+event.capacity caps YES RSVPs (NULL: no limit) and event.seats_taken
+counts them, so seats.py can take a seat with one conditional UPDATE.
+A YES past capacity is stored as WAITLIST and counted in
+event_rsvp_counts.waitlist_count. idx_rsvps_event_waitlist finds the
+next student in line: (event_id, rsvp_status, rsvp_time).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+OLD_STATUS = sa.Enum("YES", "NO", "MAYBE")
+NEW_STATUS = sa.Enum("YES", "NO", "MAYBE", "WAITLIST")
+
+
+def upgrade():
+    op.add_column("event", sa.Column("capacity", sa.Integer(), nullable=True))
+    op.add_column(
+        "event",
+        sa.Column("seats_taken", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "event_rsvp_counts",
+        sa.Column("waitlist_count", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.alter_column(
+        "rsvps", "rsvp_status",
+        existing_type=OLD_STATUS, type_=NEW_STATUS,
+        existing_nullable=True, existing_server_default=sa.text("'YES'")
+    )
+    op.create_index(
+        "idx_rsvps_event_waitlist", "rsvps",
+        ["event_id", "rsvp_status", "rsvp_time"]
+    )
+
+    op.execute("""
+        UPDATE event e
+        SET seats_taken = (
+            SELECT COUNT(*) FROM rsvps r
+            WHERE r.event_id = e.event_id AND r.rsvp_status = 'YES'
+        )
+    """)
+
+
+def downgrade():
+    # without capacity a waitlisted student simply has a YES
+    op.execute("""
+        UPDATE event_rsvp_counts
+        SET yes_count = yes_count + waitlist_count
+    """)
+    op.execute("UPDATE rsvps SET rsvp_status = 'YES' WHERE rsvp_status = 'WAITLIST'")
+
+    op.drop_index("idx_rsvps_event_waitlist", table_name="rsvps")
+    op.alter_column(
+        "rsvps", "rsvp_status",
+        existing_type=NEW_STATUS, type_=OLD_STATUS,
+        existing_nullable=True, existing_server_default=sa.text("'YES'")
+    )
+    op.drop_column("event_rsvp_counts", "waitlist_count")
+    op.drop_column("event", "seats_taken")
+    op.drop_column("event", "capacity")
@@ -0,0 +1,52 @@
+"""cache versions shared by the workers
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 16:40:12.904117
+
+Every worker keeps its own recommendation index, catalog cache and
+recommendation cache. Routes that write events or event tags bump the
+"catalog" row of cache_versions in the same transaction, interest writes
+bump the student's row of student_cache_versions; each worker polls both
+every SYNC_CHECK_SECONDS and drops or reloads what the other workers'
+writes made stale (rec_state.sync_versions). idx_updated_at finds the
+students changed since the last poll.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+TABLE_OPTIONS = {
+    "mysql_engine": "InnoDB",
+    "mysql_charset": "utf8mb4",
+    "mysql_collate": "utf8mb4_unicode_ci",
+}
+
+
+def upgrade():
+    op.create_table(
+        "cache_versions",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        **TABLE_OPTIONS
+    )
+    op.create_table(
+        "student_cache_versions",
+        sa.Column("student_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", mysql.TIMESTAMP(fsp=6), nullable=False),
+        **TABLE_OPTIONS
+    )
+    op.create_index("idx_updated_at", "student_cache_versions", ["updated_at"])
+
+
+def downgrade():
+    op.drop_table("student_cache_versions")
+    op.drop_table("cache_versions")
@@ -0,0 +1,47 @@
+"""covering event indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 18:02:44.517390
+
+The event indexes from 0001 only held the filter / sort column, so every
+row they found cost a primary key lookup for the selected columns. They
+now carry those columns too:
+
+  idx_event_date        (event_date, event_id, title, location)
+                        /events/upcoming and keyset pages on
+                        (event_date, event_id), served from the index alone
+  idx_event_created_at  (created_at, event_id, title)
+                        cold start recommendations
+
+/admin/events lists every event with registration_link (varchar(500)),
+which would push a covering index past InnoDB's 3072-byte key limit; it
+keeps its full scan.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("idx_event_date", table_name="event")
+    op.create_index(
+        "idx_event_date", "event", ["event_date", "event_id", "title", "location"]
+    )
+    op.drop_index("idx_event_created_at", table_name="event")
+    op.create_index(
+        "idx_event_created_at", "event", ["created_at", "event_id", "title"]
+    )
+
+
+def downgrade():
+    op.drop_index("idx_event_created_at", table_name="event")
+    op.create_index("idx_event_created_at", "event", ["created_at"])
+    op.drop_index("idx_event_date", table_name="event")
+    op.create_index("idx_event_date", "event", ["event_date"])
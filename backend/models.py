@@ -58,6 +58,8 @@ class Event(db.Model):
     event_date = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     organizer_type = db.Column(db.String(50))
+    capacity = db.Column(db.Integer)        # NULL: no limit
+    seats_taken = db.Column(db.Integer, nullable=False, default=0)
 
 
 # ================= STUDENT_INTERESTS =================
@@ -123,7 +125,70 @@ class RSVP(db.Model):
         primary_key=True
     )
     rsvp_status = db.Column(
-        db.Enum("YES", "NO", "MAYBE"),
+        db.Enum("YES", "NO", "MAYBE", "WAITLIST"),
         default="YES"
     )
     rsvp_time = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ================= PRECOMPUTED_RECOMMENDATIONS =================
+class PrecomputedRecommendation(db.Model):
+    __tablename__ = "precomputed_recommendations"
+
+    student_id = db.Column(
+        db.Integer,
+        db.ForeignKey("student.student_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    position = db.Column(db.SmallInteger, primary_key=True)
+    event_id = db.Column(
+        db.Integer,
+        db.ForeignKey("event.event_id", ondelete="CASCADE"),
+        nullable=False
+    )
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ================= EVENT_RSVP_COUNTS =================
+class EventRSVPCount(db.Model):
+    __tablename__ = "event_rsvp_counts"
+
+    event_id = db.Column(
+        db.Integer,
+        db.ForeignKey("event.event_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    yes_count = db.Column(db.Integer, nullable=False, default=0)
+    no_count = db.Column(db.Integer, nullable=False, default=0)
+    maybe_count = db.Column(db.Integer, nullable=False, default=0)
+    waitlist_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ================= DEPARTMENT_PARTICIPATION =================
+class DepartmentParticipation(db.Model):
+    __tablename__ = "department_participation"
+
+    department_id = db.Column(
+        db.Integer,
+        db.ForeignKey("department.department_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    participation_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ================= CACHE_VERSIONS =================
+class CacheVersion(db.Model):
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# ================= STUDENT_CACHE_VERSIONS =================
+class StudentCacheVersion(db.Model):
+    __tablename__ = "student_cache_versions"
+
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,120 @@
+"""Keyset paging and ?fields= projection for the list endpoints.
+
+A page is requested with ?limit=N and continued with ?after=<cursor>, where
+the cursor is the X-Next-Cursor header of the previous page (absent on the
+last page). Without ?limit a list is cut at PAGE_DEFAULT_LIMIT; a cut list
+also carries a Link rel="next" header with the URL of the next page, so
+clients that know nothing of the cursor still see there is more. Pages seek past the last key instead of using OFFSET, so every
+page costs the same however deep it is. ?fields=a,b picks the keys of each
+item and only the columns behind them are selected.
+"""
+import datetime
+
+PAGE_DEFAULT_LIMIT = 100
+PAGE_MAX_LIMIT = 1000
+
+
+class ListSpec:
+    # columns: field -> SQL expressions it needs (a plain field's expression
+    # must come back under the field's name); derived: field -> formatter
+    # over the row mapping for the others; keys: the keyset columns, always
+    # selected so the cursor can be built.
+    def __init__(self, columns, default, keys, derived=None):
+        self.columns = columns
+        self.default = default
+        self.keys = keys
+        self.derived = derived or {}
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.default)
+        fields = [f.strip() for f in value.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in self.columns]
+        if unknown or not fields:
+            raise ValueError(
+                "fields must be a comma-separated subset of "
+                + ",".join(self.columns)
+            )
+        return fields
+
+    def select_list(self, fields):
+        exprs = list(self.keys)
+        for field in fields:
+            for expr in self.columns[field]:
+                if expr not in exprs:
+                    exprs.append(expr)
+        return ", ".join(exprs)
+
+    def item(self, row, fields):
+        m = row._mapping
+        return {
+            f: self.derived[f](m) if f in self.derived else m[f]
+            for f in fields
+        }
+
+
+def parse_limit(value, default=PAGE_DEFAULT_LIMIT, maximum=PAGE_MAX_LIMIT):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    if not 1 <= limit <= maximum:
+        raise ValueError(f"limit must be between 1 and {maximum}")
+    return limit
+
+
+def parse_page_args(args, spec, parse_cursor):
+    # (limit, fields, cursor or None); ValueError carries the 400 message
+    after = args.get("after")
+    return (
+        parse_limit(args.get("limit")),
+        spec.parse_fields(args.get("fields")),
+        parse_cursor(after) if after else None
+    )
+
+
+# -------- cursors --------
+# id keyset: "<id>"; (date, id) keyset: "<YYYY-MM-DD>_<id>", with an empty
+# date for rows without one (MariaDB sorts NULL dates first).
+
+def parse_id_cursor(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("invalid cursor") from None
+
+
+def parse_date_cursor(value):
+    day, sep, key = value.rpartition("_")
+    try:
+        if not sep:
+            raise ValueError
+        return (datetime.date.fromisoformat(day) if day else None), int(key)
+    except ValueError:
+        raise ValueError("invalid cursor") from None
+
+
+def date_cursor(day, key):
+    return f"{day if day is not None else ''}_{key}"
+
+
+def after_date(date_col, id_col, cursor):
+    # WHERE fragment for rows after (day, key) in ORDER BY date_col, id_col
+    day, key = cursor
+    if day is None:
+        sql = f"(({date_col} IS NULL AND {id_col} > :after_id) OR {date_col} IS NOT NULL)"
+        return sql, {"after_id": key}
+    sql = f"({date_col} > :after_day OR ({date_col} = :after_day AND {id_col} > :after_id))"
+    return sql, {"after_day": day, "after_id": key}
+
+
+def page(rows, limit, spec, fields, cursor_of):
+    # rows were fetched with LIMIT limit + 1; the extra row only says
+    # whether another page exists
+    more = len(rows) > limit
+    rows = rows[:limit]
+    items = [spec.item(r, fields) for r in rows]
+    next_cursor = cursor_of(rows[-1]._mapping) if more else None
+    return items, next_cursor
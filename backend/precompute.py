@@ -0,0 +1,171 @@
+"""Offline job: score every student against every event and store each
+student's top-N in precomputed_recommendations.
+
+    python precompute.py --workers 4 --chunk-size 1000 --top-n 20
+
+student_interests and event_tags are read once; students are scored in
+chunks spread over a process pool. At most two chunks per worker are in
+flight (submitted or finished but not yet written), so memory stays bounded
+however many students there are, and each chunk is written and committed
+as soon as it comes back: its students' old rows are replaced in one short
+transaction, so readers see every student's list either old or new and the
+table is never locked for the whole run.
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import groupby
+
+import numpy as np
+from sqlalchemy import text
+
+from ai.batch import score_all
+from ai.vectorizer import TagVectorizer
+
+# set in each worker by _init_worker, so the event matrix is shipped once per
+# process rather than once per chunk
+_events = None
+
+
+def load_tag_sets(rows):
+    # (owner_id, tag_id) rows sorted by owner -> ([owner_id], [[tag_id]])
+    ids, tag_sets = [], []
+    for owner_id, group in groupby(rows, key=lambda r: r[0]):
+        ids.append(owner_id)
+        tag_sets.append([r[1] for r in group])
+    return ids, tag_sets
+
+
+def _init_worker(event_matrix, event_norms):
+    global _events
+    _events = (event_matrix, event_norms)
+
+
+def _score_chunk(args):
+    start, student_matrix, top_n = args
+    event_matrix, event_norms = _events
+    students, events, scores = score_all(
+        student_matrix, event_matrix, event_norms, top_n
+    )
+    positions = np.arange(len(students)) - np.searchsorted(students, students) + 1
+    return start + students, events, scores, positions
+
+
+def _chunk_bounds(student_ids, start, chunk_size):
+    # student_id range owned by the chunk at start: from just after the
+    # previous chunk's last student up to its own last one, open-ended for
+    # the first / last chunk, so rows of students who no longer have any
+    # interests are dropped too
+    end = min(start + chunk_size, len(student_ids))
+    after = student_ids[start - 1] if start > 0 else None
+    upto = student_ids[end - 1] if end < len(student_ids) else None
+    return after, upto
+
+
+def _write_chunk(db, result, student_ids, event_ids, bounds):
+    students, events, scores, positions = result
+    after, upto = bounds
+    where = ["1 = 1"]
+    if after is not None:
+        where.append("student_id > :after")
+    if upto is not None:
+        where.append("student_id <= :upto")
+    db.session.execute(
+        text(f"DELETE FROM precomputed_recommendations WHERE {' AND '.join(where)}"),
+        {"after": after, "upto": upto}
+    )
+    if len(students) == 0:
+        db.session.commit()
+        return 0
+
+    # executemany: PyMySQL folds this into multi-row INSERTs
+    db.session.execute(
+        text("""
+            INSERT INTO precomputed_recommendations
+                (student_id, position, event_id, score)
+            VALUES (:sid, :pos, :eid, :score)
+        """),
+        [
+            {"sid": student_ids[s], "pos": p, "eid": event_ids[e], "score": score}
+            for s, e, score, p in zip(
+                students.tolist(), events.tolist(), scores.tolist(), positions.tolist()
+            )
+        ]
+    )
+    db.session.commit()
+    return len(students)
+
+
+def precompute(workers, chunk_size, top_n):
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        tag_ids = [r.tag_id for r in db.session.execute(text("SELECT tag_id FROM tag"))]
+        event_ids, event_tags = load_tag_sets(db.session.execute(text(
+            "SELECT event_id, tag_id FROM event_tags ORDER BY event_id"
+        )))
+        student_ids, student_tags = load_tag_sets(db.session.execute(text(
+            "SELECT student_id, tag_id FROM student_interests ORDER BY student_id"
+        )))
+
+        vectorizer = TagVectorizer(tag_ids, sparse=True)
+        event_matrix = vectorizer.vectorize_many(event_tags)
+        event_norms = event_matrix.row_norms()
+        student_matrix = vectorizer.vectorize_many(student_tags)
+        print(f"loaded {len(student_ids)} students, {len(event_ids)} events "
+              f"in {time.perf_counter() - t0:.2f}s")
+
+        def chunk(start):
+            end = min(start + chunk_size, len(student_ids))
+            return start, student_matrix.slice_rows(start, end), top_n
+
+        def write(result, start):
+            return _write_chunk(
+                db, result, student_ids, event_ids,
+                _chunk_bounds(student_ids, start, chunk_size)
+            )
+
+        t0 = time.perf_counter()
+        written = 0
+        starts = range(0, len(student_ids), chunk_size)
+        if not student_ids:
+            db.session.execute(text("DELETE FROM precomputed_recommendations"))
+            db.session.commit()
+        elif workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(event_matrix, event_norms)
+            ) as pool:
+                # pool.map would submit every chunk up front and hold all of
+                # the results that finish ahead of the one it yields next
+                pending = {}    # future -> chunk start
+                for start in itertools.chain(starts, [None]):
+                    limit = 2 * workers if start is not None else 1
+                    while len(pending) >= limit:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            written += write(future.result(), pending.pop(future))
+                    if start is not None:
+                        pending[pool.submit(_score_chunk, chunk(start))] = start
+        else:
+            _init_worker(event_matrix, event_norms)
+            for start in starts:
+                written += write(_score_chunk(chunk(start)), start)
+
+    print(f"wrote {written} rows in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--top-n", type=int, default=20)
+    args = parser.parse_args()
+
+    precompute(args.workers, args.chunk_size, args.top_n)
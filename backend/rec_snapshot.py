@@ -0,0 +1,39 @@
+"""Publish a snapshot of the recommendation index for the workers to map.
+
+    python rec_snapshot.py --dir /srv/event-recom/snapshots --keep 3
+
+Reads events, tags and RSVPs from the DB once, builds the event-tag matrix,
+its postings and the collaborative neighbours, and publishes them as a new
+ai.snapshot version. Workers started with REC_SNAPSHOT_DIR pointing at the
+same directory map it on startup and swap to newer versions as they are
+published, so run this from cron (or after bulk event imports) instead of
+having every worker rebuild from MariaDB. Workers also publish one
+themselves when there is none, or when the live one records an older
+catalog version than the DB (an event or tag was written since).
+"""
+import argparse
+import time
+
+from config import Config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=Config.REC_SNAPSHOT_DIR,
+                        required=Config.REC_SNAPSHOT_DIR is None,
+                        help="snapshot root (default: REC_SNAPSHOT_DIR)")
+    parser.add_argument("--keep", type=int, default=3, help="versions to keep")
+    args = parser.parse_args()
+
+    from app import create_app
+    import rec_state
+
+    app = create_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        version = rec_state.publish_rec_snapshot(args.dir, args.keep)
+    print(f"published {version} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
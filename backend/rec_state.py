@@ -0,0 +1,404 @@
+import datetime
+import itertools
+import logging
+import threading
+import time
+import numpy as np
+from flask import current_app
+from sqlalchemy import DateTime, bindparam, event, text
+from sqlalchemy.orm import Session
+from models import db
+from config import Config
+from cache import RecommendationCache, CatalogCache
+from ai.index import RecommendationIndex
+from ai.ranker import HybridRanker
+from ai.collaborative import build_neighbors
+from ai import snapshot
+
+log = logging.getLogger(__name__)
+
+# One index per worker process, loaded lazily from the DB on first use and
+# kept current by the routes that write events / event tags; writes made by
+# other workers arrive through sync_versions().
+rec_index = RecommendationIndex()
+
+# Ranked results per (student_id, ranking mode). A write to an event changes
+# the content scores of students sharing one of its tags (before or after
+# the write) and any ranking the event reached through collaborative
+# scores, so event routes invalidate by event (rec_cache.invalidate_event)
+# and interest routes by student.
+rec_cache = RecommendationCache(
+    maxsize=Config.REC_CACHE_SIZE, ttl=Config.REC_CACHE_TTL
+)
+
+# Serialized catalog listings; bumped by every route that writes events or
+# event tags.
+catalog_cache = CatalogCache(
+    maxsize=Config.CATALOG_CACHE_SIZE, ttl=Config.CATALOG_CACHE_TTL
+)
+
+hybrid_ranker = HybridRanker(
+    w_similarity=Config.REC_HYBRID_WEIGHTS["similarity"],
+    w_popularity=Config.REC_HYBRID_WEIGHTS["popularity"],
+    w_recency=Config.REC_HYBRID_WEIGHTS["recency"],
+    half_life_days=Config.REC_RECENCY_HALF_LIFE_DAYS
+)
+
+
+def load_rec_index(neighbors=True, index=rec_index):
+    tag_ids = [
+        r.tag_id for r in db.session.execute(text("SELECT tag_id FROM tag"))
+    ]
+
+    rows = db.session.execute(text("""
+        SELECT
+            e.event_id,
+            e.title,
+            e.event_date,
+            COALESCE(
+                rc.yes_count + rc.no_count + rc.maybe_count + rc.waitlist_count, 0
+            ) AS popularity,
+            GROUP_CONCAT(et.tag_id) AS tag_ids
+        FROM event e
+        LEFT JOIN event_tags et ON e.event_id = et.event_id
+        LEFT JOIN event_rsvp_counts rc ON e.event_id = rc.event_id
+        GROUP BY e.event_id
+    """)).fetchall()
+
+    index.load(tag_ids, [
+        {
+            "event_id": r.event_id,
+            "title": r.title,
+            "event_date": r.event_date,
+            "popularity": r.popularity,
+            "tag_ids": list(map(int, r.tag_ids.split(","))) if r.tag_ids else []
+        }
+        for r in rows
+    ])
+    if neighbors and Config.REC_CF_WEIGHT > 0:
+        load_neighbors(index)
+    return index
+
+
+def load_neighbors(index=rec_index):
+    # item-item neighbours from every RSVP that is not a NO
+    result = db.session.execute(
+        text("SELECT student_id, event_id FROM rsvps WHERE rsvp_status <> 'NO'")
+    )
+    # flat int stream: np.array over Row objects is an order of magnitude slower
+    pairs = np.fromiter(
+        itertools.chain.from_iterable(result), dtype=np.int64
+    ).reshape(-1, 2)
+    index.set_neighbors(
+        build_neighbors(pairs[:, 0], pairs[:, 1], top_n=Config.REC_CF_NEIGHBORS)
+    )
+    return index.neighbors
+
+
+def catalog_version():
+    # the "catalog" cache_versions row: bumped by every event / tag write
+    return db.session.execute(
+        text("SELECT version FROM cache_versions WHERE name = 'catalog'")
+    ).scalar() or 0
+
+
+def publish_rec_snapshot(root, keep=3, only_if_behind=False):
+    # Fresh index from the DB, built in its own RecommendationIndex (this
+    # worker's mapped one is left alone) and written as a new ai.snapshot
+    # version. The manifest records the catalog version read before the
+    # build, so a worker can tell a snapshot misses later event writes. One
+    # publisher per snapshot root at a time; with only_if_behind, the one
+    # that waited for the lock returns the version just published instead
+    # of building it again.
+    with snapshot.publishing(root):
+        version = catalog_version()
+        current = snapshot.current_version(root)
+        if only_if_behind and current is not None:
+            manifest, _ = snapshot.load(root, current)
+            if manifest.get("catalog_version", 0) >= version:
+                return current
+
+        arrays = load_rec_index(index=RecommendationIndex()).snapshot_arrays()
+        return snapshot.publish(root, arrays, meta={
+            "tags": len(arrays["tag_ids"]),
+            "events": len(arrays["event_ids"]),
+            "neighbors": "cf_indptr" in arrays,
+            "catalog_version": version
+        }, keep=keep)
+
+
+_snapshot_catalog = 0   # catalog version of the mapped snapshot
+
+
+def load_rec_snapshot(root, version=None):
+    # map a published snapshot into rec_index; False when none exists
+    global _snapshot_catalog
+    version = version or snapshot.current_version(root)
+    if version is None:
+        return False
+    manifest, arrays = snapshot.load(root, version)
+    rec_index.load_snapshot(manifest["version"], arrays)
+    _snapshot_catalog = manifest.get("catalog_version", 0)
+    # rankings cached from the previous index
+    rec_cache.clear()
+    log.info("recommendation index mapped from snapshot %s", version)
+    return True
+
+
+_snapshot_lock = threading.Lock()
+_snapshot_checked = 0.0
+
+
+def _follow_snapshot():
+    # swap to a newer published snapshot; CURRENT is read at most every
+    # REC_SNAPSHOT_CHECK_SECONDS, or at once while nothing is loaded
+    global _snapshot_checked
+    now = time.monotonic()
+    if rec_index.loaded and now - _snapshot_checked < Config.REC_SNAPSHOT_CHECK_SECONDS:
+        return
+    if not _snapshot_lock.acquire(blocking=False):
+        return
+    try:
+        _snapshot_checked = now
+        version = snapshot.current_version(Config.REC_SNAPSHOT_DIR)
+        if version is not None and version != rec_index.snapshot_version:
+            load_rec_snapshot(Config.REC_SNAPSHOT_DIR, version)
+    except Exception:
+        # keep serving what is loaded
+        log.exception("loading recommendation snapshot failed")
+    finally:
+        _snapshot_lock.release()
+
+
+_republishing = threading.Lock()
+_republish_after = 0.0
+_republisher = None     # the thread, for tests to join
+
+
+def _snapshot_behind():
+    # the mapped snapshot predates event / tag writes this worker knows of
+    return (rec_index.snapshot_version is not None
+            and _snapshot_catalog < _versions.get("catalog", 0))
+
+
+def _republish(app):
+    global _snapshot_checked, _republish_after
+    try:
+        with app.app_context():
+            publish_rec_snapshot(Config.REC_SNAPSHOT_DIR, only_if_behind=True)
+            db.session.remove()
+        _snapshot_checked = 0.0     # map it on the next request
+    except Exception:
+        log.exception("republishing the recommendation snapshot failed")
+    finally:
+        _republish_after = time.monotonic() + Config.REC_SNAPSHOT_CHECK_SECONDS
+        _republishing.release()
+
+
+def _publish_first():
+    # Nothing published yet: the first worker of the host builds and
+    # publishes, the others wait for its lock and map the result. Only when
+    # that fails does this worker build a private index from the DB.
+    try:
+        publish_rec_snapshot(Config.REC_SNAPSHOT_DIR, only_if_behind=True)
+        load_rec_snapshot(Config.REC_SNAPSHOT_DIR)
+    except Exception:
+        log.exception("publishing the first recommendation snapshot failed; "
+                      "this worker builds its own index from the DB")
+
+
+# Cross-worker invalidation. Writers record what they changed in the
+# transaction of the write:
+#   cache_versions "catalog"   events / event tags (rare, admin writes):
+#                              catalog bodies, every ranking, the index
+#   student_cache_versions     student interests, one row per student so
+#                              interest writes never share a row lock:
+#                              that student's rankings
+# Every worker reads both at most every SYNC_CHECK_SECONDS, so another
+# worker's write is visible here within that bound (plus the time to reload
+# the index). RSVP counts reach the index's popularity every
+# REC_POPULARITY_SYNC_SECONDS; a cached ranking after another worker's RSVP
+# can be up to REC_CACHE_TTL old.
+BUMP_VERSION = text("""
+    INSERT INTO cache_versions (name, version) VALUES (:name, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+""")
+BUMP_STUDENT = text("""
+    INSERT INTO student_cache_versions (student_id, version, updated_at)
+    VALUES (:sid, 1, NOW(6))
+    ON DUPLICATE KEY UPDATE version = version + 1, updated_at = NOW(6)
+""")
+DB_NOW = text("SELECT NOW(6) AS now").columns(now=DateTime)
+CHANGED_STUDENTS = text("""
+    SELECT student_id, version
+    FROM student_cache_versions
+    WHERE updated_at >= :since
+""").bindparams(bindparam("since", type_=DateTime))
+POPULARITY = text("""
+    SELECT event_id, yes_count + no_count + maybe_count + waitlist_count AS popularity
+    FROM event_rsvp_counts
+""")
+
+# updated_at is taken when the write runs, not when it commits: re-read
+# this much before the last check so slow transactions are not skipped
+STUDENT_SYNC_OVERLAP = datetime.timedelta(seconds=30)
+
+_versions = {}           # name -> version this worker is up to date with
+_student_versions = {}   # student_id -> version, rows seen in the last window
+_students_since = None   # DB time of the last check
+_versions_lock = threading.Lock()
+_versions_checked = 0.0
+_popularity_synced = 0.0
+
+
+def bump_version(name):
+    # call before the caller's commit. The caller updates this worker's own
+    # caches itself, so once committed (_committed below) its bump is not a
+    # change to catch up on; a rolled back bump is forgotten.
+    db.session.execute(BUMP_VERSION, {"name": name})
+    version = db.session.execute(
+        text("SELECT version FROM cache_versions WHERE name = :name"), {"name": name}
+    ).scalar()
+    db.session.info.setdefault("cache_versions", {})[name] = version
+
+
+def bump_student(student_id):
+    # bump_version for one student's rankings
+    db.session.execute(BUMP_STUDENT, {"sid": student_id})
+    version = db.session.execute(
+        text("SELECT version FROM student_cache_versions WHERE student_id = :sid"),
+        {"sid": student_id}
+    ).scalar()
+    db.session.info.setdefault("student_versions", {})[student_id] = version
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    versions = session.info.pop("cache_versions", {})
+    students = session.info.pop("student_versions", {})
+    if not versions and not students:
+        return
+    with _versions_lock:
+        for name, version in versions.items():
+            # only when no other worker's bump came in between
+            if _versions.get(name, 0) == version - 1:
+                _versions[name] = version
+        _student_versions.update(students)
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("cache_versions", None)
+    session.info.pop("student_versions", None)
+
+
+def sync_versions():
+    # catch up with writes made by other workers since the last check
+    global _versions_checked, _students_since
+    now = time.monotonic()
+    if now - _versions_checked < Config.SYNC_CHECK_SECONDS:
+        return
+    if not _versions_lock.acquire(blocking=False):
+        return
+    try:
+        _versions_checked = now
+        rows = dict(db.session.execute(
+            text("SELECT name, version FROM cache_versions")
+        ).fetchall())
+        changed = {name for name, version in rows.items() if _versions.get(name, 0) != version}
+        _versions.update(rows)
+
+        db_now = db.session.execute(DB_NOW).scalar()
+        students = []
+        if _students_since is not None:
+            window = dict(db.session.execute(
+                CHANGED_STUDENTS, {"since": _students_since - STUDENT_SYNC_OVERLAP}
+            ).fetchall())
+            students = [
+                sid for sid, version in window.items()
+                if _student_versions.get(sid) != version
+            ]
+            _student_versions.clear()
+            _student_versions.update(window)
+        _students_since = db_now
+    except Exception:
+        log.exception("reading cache versions failed")
+        return
+    finally:
+        _versions_lock.release()
+
+    if "catalog" in changed:
+        catalog_cache.bump()
+        rec_cache.clear()
+        # with snapshots, get_rec_index republishes one for every worker
+        if rec_index.loaded and not Config.REC_SNAPSHOT_DIR:
+            # events and tags from the DB; neighbours only change with RSVPs
+            # and keep their own refresh
+            load_rec_index(neighbors=False)
+    else:
+        for student_id in students:
+            rec_cache.invalidate_student(student_id)
+        sync_popularity()
+
+
+def sync_popularity():
+    # RSVP counts from event_rsvp_counts, which every worker's RSVPs update;
+    # add_rsvp only patches this worker's copy
+    global _popularity_synced
+    now = time.monotonic()
+    if not rec_index.loaded or now - _popularity_synced < Config.REC_POPULARITY_SYNC_SECONDS:
+        return
+    _popularity_synced = now
+    rows = db.session.execute(POPULARITY).fetchall()
+    rec_index.set_popularity(
+        [r.event_id for r in rows], [int(r.popularity) for r in rows]
+    )
+
+
+_refreshing = threading.Lock()
+
+
+def _refresh_neighbors(app):
+    try:
+        with app.app_context():
+            load_neighbors()
+            db.session.remove()
+    except Exception:
+        log.exception("collaborative neighbour rebuild failed")
+        # keep the old table and try again after another interval
+        rec_index.set_neighbors(rec_index.neighbors)
+    finally:
+        _refreshing.release()
+
+
+def get_rec_index():
+    global _republisher
+    sync_versions()
+    if Config.REC_SNAPSHOT_DIR:
+        _follow_snapshot()
+        if not rec_index.loaded:
+            _publish_first()
+        elif (_snapshot_behind() and time.monotonic() >= _republish_after
+                and _republishing.acquire(blocking=False)):
+            # serve the older snapshot while one worker per host publishes
+            # a current one; every worker maps it within
+            # REC_SNAPSHOT_CHECK_SECONDS
+            _republisher = threading.Thread(
+                target=_republish, args=(current_app._get_current_object(),),
+                name="rec-snapshot", daemon=True
+            )
+            _republisher.start()
+    if not rec_index.loaded:
+        load_rec_index()
+
+    # stale neighbours keep serving while one thread per worker rebuilds;
+    # with snapshots the publisher rebuilds them
+    age = rec_index.neighbors_age()
+    if (Config.REC_CF_WEIGHT > 0 and not Config.REC_SNAPSHOT_DIR and age is not None
+            and age > Config.REC_CF_REFRESH_SECONDS
+            and _refreshing.acquire(blocking=False)):
+        threading.Thread(
+            target=_refresh_neighbors, args=(current_app._get_current_object(),),
+            name="rec-neighbors", daemon=True
+        ).start()
+    return rec_index
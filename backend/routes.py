@@ -1,13 +1,27 @@
-from flask import Blueprint, request, jsonify
+import datetime
+from urllib.parse import urlencode
+from flask import Blueprint, Response, current_app, request, jsonify
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from functools import wraps
 from models import (
     db, Student, Event, Tag, Club,
     StudentInterest, StudentClub, EventTag, RSVP
 )
-from ai.vectorizer import TagVectorizer
-from ai.recommender import EventRecommender
+from rec_state import (
+    rec_index, rec_cache, catalog_cache, hybrid_ranker, get_rec_index,
+    bump_version, bump_student, sync_versions
+)
+import counters
+import seats
+from auth_utils import require_role, invalidate_identity
+from metrics import pool_metrics, route_profiler
+from rsvp_queue import rsvp_ingest
+from pagination import (
+    ListSpec, parse_page_args, parse_id_cursor, parse_date_cursor,
+    date_cursor, after_date, page
+)
+from export import parse_format, export_response
 
 api = Blueprint("api", __name__)
 
@@ -17,6 +31,30 @@ api = Blueprint("api", __name__)
 def home():
     return {"status": "Backend running"}
 
+
+@api.route("/metrics/db-pool")
+@require_role("ADMIN")
+def db_pool_metrics():
+    return jsonify(pool_metrics.snapshot(db.engine.pool))
+
+
+@api.route("/metrics/routes")
+@require_role("ADMIN")
+def route_metrics():
+    return jsonify(route_profiler.snapshot())
+
+
+@api.route("/metrics/rsvp-queue")
+@require_role("ADMIN")
+def rsvp_queue_metrics():
+    return jsonify(rsvp_ingest.stats())
+
+
+@api.route("/metrics/catalog-cache")
+@require_role("ADMIN")
+def catalog_cache_metrics():
+    return jsonify(catalog_cache.stats())
+
 #==========================================
 # ADMIN BLOCKING
 #==========================================
@@ -32,49 +70,57 @@ def admin_only(f):
 
 
 
-#==========================================
-# role check
-#==========================================
-def require_role(required_role):
-    def decorator(f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            user_id = request.headers.get("X-User-Id")
-
-            if not user_id:
-                return jsonify({"error": "Unauthorized"}), 401
-
-            user = db.session.execute(
-                text("SELECT role FROM users WHERE user_id = :uid"),
-                {"uid": user_id}
-            ).fetchone()
-
-            if not user or user.role != required_role:
-                return jsonify({"error": "Forbidden"}), 403
-
-            return f(*args, **kwargs)
-        return wrapper
-    return decorator
-
-
-
 # =====================================================
 # STUDENTS
 # =====================================================
 
-# GET all students
+STUDENT_LIST = ListSpec(
+    columns={
+        "student_id": ["s.student_id"],
+        "name": ["s.fname", "s.lname"],
+        "email": ["s.email"],
+        "department_id": ["s.department_id"]
+    },
+    default=["student_id", "name", "email", "department_id"],
+    keys=["s.student_id"],
+    derived={"name": lambda r: f"{r['fname']} {r['lname']}"}
+)
+
+
+# GET students, one keyset page at a time (?limit, ?after, ?fields)
 @api.route("/students", methods=["GET"])
 def get_students():
-    students = Student.query.all()
-    return jsonify([
-        {
-            "student_id": s.student_id,
-            "name": f"{s.fname} {s.lname}",
-            "email": s.email,
-            "department_id": s.department_id
-        }
-        for s in students
-    ])
+    try:
+        limit, fields, after = parse_page_args(
+            request.args, STUDENT_LIST, parse_id_cursor
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    where = "WHERE s.student_id > :after_id" if after is not None else ""
+    rows = db.session.execute(text(f"""
+        SELECT {STUDENT_LIST.select_list(fields)}
+        FROM student s
+        {where}
+        ORDER BY s.student_id
+        LIMIT :limit
+    """), {"after_id": after, "limit": limit + 1}).fetchall()
+
+    return paged_response(*page(
+        rows, limit, STUDENT_LIST, fields, lambda r: str(r["student_id"])
+    ))
+
+
+def paged_response(items, next_cursor):
+    # A list past the page size (PAGE_DEFAULT_LIMIT without ?limit) is cut
+    # short; say so where any HTTP client looks, a Link rel="next" to the
+    # same query continued after the cursor
+    resp = jsonify(items)
+    if next_cursor is not None:
+        resp.headers["X-Next-Cursor"] = next_cursor
+        args = {**request.args.to_dict(), "after": next_cursor}
+        resp.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return resp
 
 
 # CREATE student
@@ -95,7 +141,10 @@ def create_or_update_student():
             student.mname = data.get("mname", student.mname)
             student.lname = data.get("lname", student.lname)
             student.password_hash = data.get("password_hash", student.password_hash)
-            student.department_id = data.get("department_id", student.department_id)
+
+            department_id = data.get("department_id", student.department_id)
+            counters.move_student(student.student_id, student.department_id, department_id)
+            student.department_id = department_id
 
             db.session.commit()
             return {"message": "Student updated"}, 200
@@ -128,8 +177,71 @@ def create_or_update_student():
 # =====================================================
 
 # GET all events
+EVENT_LIST = ListSpec(
+    columns={
+        "event_id": ["e.event_id"],
+        "title": ["e.title"],
+        "location": ["e.location"],
+        "event_date": ["e.event_date"],
+        "capacity": ["e.capacity"],
+        "seats_taken": ["e.seats_taken"],
+        "tags": ["GROUP_CONCAT(t.tag_name ORDER BY t.tag_name) AS tags"]
+    },
+    default=["event_id", "title", "location", "event_date", "tags"],
+    keys=["e.event_id", "e.event_date"],
+    derived={
+        "event_date": lambda r: str(r["event_date"]),
+        "tags": lambda r: r["tags"].split(",") if r["tags"] else []
+    }
+)
+
+
 @api.route("/events", methods=["GET"])
 def get_events():
+    # the plain request is the whole (cached) catalog the dashboard loads;
+    # ?limit, ?after or ?fields switch to keyset pages
+    if not any(k in request.args for k in ("limit", "after", "fields")):
+        return catalog_response("events", list_events)
+
+    try:
+        limit, fields, after = parse_page_args(
+            request.args, EVENT_LIST, parse_date_cursor
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    where, params = "", {"limit": limit + 1}
+    if after is not None:
+        where, cursor_params = after_date("e.event_date", "e.event_id", after)
+        where = "WHERE " + where
+        params.update(cursor_params)
+
+    # the tag join only runs when tags are asked for
+    joins = group = ""
+    if "tags" in fields:
+        joins = """
+            LEFT JOIN event_tags et ON e.event_id = et.event_id
+            LEFT JOIN tag t ON et.tag_id = t.tag_id
+        """
+        group = "GROUP BY e.event_id"
+
+    rows = db.session.execute(text(f"""
+        SELECT {EVENT_LIST.select_list(fields)}
+        FROM event e
+        {joins}
+        {where}
+        {group}
+        ORDER BY e.event_date, e.event_id
+        LIMIT :limit
+    """), params).fetchall()
+
+    return paged_response(*page(
+        rows, limit, EVENT_LIST, fields,
+        lambda r: date_cursor(r["event_date"], r["event_id"])
+    ))
+
+
+def list_events():
     result = db.session.execute(text("""
         SELECT
             e.event_id,
@@ -154,7 +266,23 @@ def get_events():
             "tags": row.tags.split(",") if row.tags else []
         })
 
-    return jsonify(events)
+    return events
+
+
+# -------- catalog response cache --------
+
+def catalog_response(name, build, key=(), private=False):
+    # Serve a catalog listing from catalog_cache with a strong ETag;
+    # If-None-Match with the current ETag gets an empty 304.
+    sync_versions()
+    body, etag = catalog_cache.get_or_build(
+        name, lambda: jsonify(build()).get_data(), key
+    )
+    resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    # clients may keep the body but must revalidate before reusing it
+    resp.headers["Cache-Control"] = "private, no-cache" if private else "no-cache"
+    return resp.make_conditional(request)
 
 
 
@@ -162,15 +290,27 @@ def get_events():
 @api.route("/events", methods=["POST"])
 def create_event():
     data = request.json
+    event_date, error = parse_event_date(data)
+    if error:
+        return error
+    capacity, error = parse_capacity(data)
+    if error:
+        return error
+
     event = Event(
         title=data["title"],
         description=data.get("description"),
         location=data.get("location"),
-        event_date=data.get("event_date"),
-        organizer_type=data.get("organizer_type")
+        event_date=event_date,
+        organizer_type=data.get("organizer_type"),
+        capacity=capacity
     )
     db.session.add(event)
+    bump_version("catalog")
     db.session.commit()
+
+    catalog_cache.bump()
+    rec_index.upsert_event(event.event_id, event.title, event_date=event.event_date)
     return {"message": "Event created"}, 201
 
 
@@ -181,17 +321,21 @@ def create_event():
 # GET tags
 @api.route("/tags", methods=["GET"])
 def get_tags():
+    return catalog_response("tags", list_tags)
+
+
+def list_tags():
     rows = db.session.execute(
         text("SELECT tag_id, tag_name FROM tag ORDER BY tag_name")
     ).fetchall()
 
-    return jsonify([
+    return [
         {
             "tag_id": r.tag_id,
             "tag_name": r.tag_name
         }
         for r in rows
-    ])
+    ]
 
 
 # Add interest to student
@@ -204,7 +348,10 @@ def add_student_interest(student_id):
             tag_id=data["tag_id"]
         )
         db.session.add(si)
+        bump_student(student_id)
         db.session.commit()
+
+        rec_cache.invalidate_student(student_id)
         return {"message": "Interest added"}, 201
     except IntegrityError:
         db.session.rollback()
@@ -221,13 +368,124 @@ def add_event_tag(event_id):
             tag_id=data["tag_id"]
         )
         db.session.add(et)
+        bump_version("catalog")
         db.session.commit()
+
+        catalog_cache.bump()
+        rec_index.add_event_tag(event_id, int(et.tag_id))
+        rec_cache.invalidate_event(event_id, rec_index.event_tag_ids(event_id))
         return {"message": "Tag added to event"}, 201
     except IntegrityError:
         db.session.rollback()
         return {"error": "Duplicate or invalid mapping"}, 400
 
 
+# -------- bulk replace (one request, one transaction) --------
+
+def parse_tag_ids(data):
+    tag_ids = (data or {}).get("tag_ids")
+    if not isinstance(tag_ids, list):
+        return None
+    try:
+        return {int(t) for t in tag_ids}
+    except (TypeError, ValueError):
+        return None
+
+
+def replace_tag_set(table, owner_column, owner_id, tag_ids):
+    # Diff the stored set against tag_ids: one DELETE for the removed tags and
+    # one multi-row INSERT for the added ones (PyMySQL folds executemany into
+    # a single INSERT ... VALUES (...), (...)). Caller commits.
+    current = {
+        r.tag_id
+        for r in db.session.execute(
+            text(f"SELECT tag_id FROM {table} WHERE {owner_column} = :oid FOR UPDATE"),
+            {"oid": owner_id}
+        )
+    }
+    added = tag_ids - current
+    removed = current - tag_ids
+
+    if removed:
+        db.session.execute(
+            text(f"""
+                DELETE FROM {table}
+                WHERE {owner_column} = :oid AND tag_id IN :tids
+            """).bindparams(bindparam("tids", expanding=True)),
+            {"oid": owner_id, "tids": sorted(removed)}
+        )
+    if added:
+        db.session.execute(
+            text(f"INSERT INTO {table} ({owner_column}, tag_id) VALUES (:oid, :tid)"),
+            [{"oid": owner_id, "tid": t} for t in sorted(added)]
+        )
+    return current, added, removed
+
+
+@api.route("/student/interests/<int:student_id>", methods=["GET"])
+def get_student_interests(student_id):
+    rows = db.session.execute(
+        text("""
+            SELECT t.tag_id, t.tag_name
+            FROM student_interests si
+            JOIN tag t ON si.tag_id = t.tag_id
+            WHERE si.student_id = :sid
+            ORDER BY t.tag_name
+        """),
+        {"sid": student_id}
+    ).fetchall()
+
+    return jsonify([
+        {"tag_id": r.tag_id, "tag_name": r.tag_name}
+        for r in rows
+    ])
+
+
+# Replace a student's whole interest set
+@api.route("/student/interests/<int:student_id>", methods=["POST"])
+@api.route("/students/<int:student_id>/interests", methods=["PUT"])
+def replace_student_interests(student_id):
+    tag_ids = parse_tag_ids(request.json)
+    if tag_ids is None:
+        return {"error": "tag_ids must be a list of tag ids"}, 400
+
+    try:
+        _, added, removed = replace_tag_set(
+            "student_interests", "student_id", student_id, tag_ids
+        )
+        bump_student(student_id)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return {"error": "Invalid student or tag"}, 400
+
+    rec_cache.invalidate_student(student_id)
+    return {"message": "Interests saved", "added": len(added), "removed": len(removed)}
+
+
+# Replace an event's whole tag set
+@api.route("/events/<int:event_id>/tags", methods=["PUT"])
+def replace_event_tags(event_id):
+    tag_ids = parse_tag_ids(request.json)
+    if tag_ids is None:
+        return {"error": "tag_ids must be a list of tag ids"}, 400
+
+    try:
+        previous, added, removed = replace_tag_set(
+            "event_tags", "event_id", event_id, tag_ids
+        )
+        bump_version("catalog")
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return {"error": "Invalid event or tag"}, 400
+
+    catalog_cache.bump()
+    rec_index.set_event_tags(event_id, tag_ids)
+    rec_cache.invalidate_event(event_id, previous | tag_ids)
+    return {"message": "Event tags saved", "added": len(added), "removed": len(removed)}
+
+
 # =====================================================
 # RSVP
 # =====================================================
@@ -236,54 +494,190 @@ def add_event_tag(event_id):
 def rsvp_event():
     data = request.json
 
+    if current_app.config["RSVP_ASYNC"]:
+        return enqueue_rsvp(data)
+
     student = Student.query.get(data["student_id"])
     event = Event.query.get(data["event_id"])
 
     if not student or not event:
         return {"error": "Invalid student or event"}, 400
 
+    status = data.get("status", "YES")
+    if status not in seats.RSVP_STATUSES:
+        return {"error": "Invalid status"}, 400
+
     try:
+        # a YES takes a seat or joins the waitlist; the seat goes back on
+        # rollback
+        status = seats.resolve(event.event_id, None, status)
         rsvp = RSVP(
             student_id=data["student_id"],
             event_id=data["event_id"],
-            rsvp_status=data.get("status", "YES")
+            rsvp_status=status
         )
         db.session.add(rsvp)
+        db.session.flush()
+
+        # counters move in the same transaction as the RSVP row
+        counters.record_rsvp(rsvp.student_id, rsvp.event_id, status)
         db.session.commit()
-        return {"message": "RSVP successful"}, 201
+
+        rec_index.add_rsvp(rsvp.event_id)
+        # RSVPs feed the student's collaborative scores
+        rec_cache.invalidate_student(rsvp.student_id)
+        if status == "WAITLIST":
+            return {"message": "Event is full, added to the waitlist", "status": status}, 201
+        return {"message": "RSVP successful", "status": status}, 201
     except IntegrityError:
         db.session.rollback()
         return {"error": "Duplicate RSVP"}, 400
 
+
+@api.route("/rsvp", methods=["PUT"])
+def change_rsvp():
+    # change the status of an existing RSVP; leaving YES hands the seat to
+    # the first waitlisted student
+    data = request.json
+    status = data.get("status")
+    if status not in seats.RSVP_STATUSES:
+        return {"error": "Invalid status"}, 400
+
+    row = db.session.execute(
+        text("""
+            SELECT rsvp_status
+            FROM rsvps
+            WHERE student_id = :sid AND event_id = :eid
+            FOR UPDATE
+        """),
+        {"sid": data.get("student_id"), "eid": data.get("event_id")}
+    ).fetchone()
+    if row is None:
+        db.session.rollback()
+        return {"error": "RSVP not found"}, 404
+
+    event_id = data["event_id"]
+    old = row.rsvp_status
+    status = seats.resolve(event_id, old, status)
+    promoted = []
+    if status != old:
+        db.session.execute(
+            text("""
+                UPDATE rsvps SET rsvp_status = :status
+                WHERE student_id = :sid AND event_id = :eid
+            """),
+            {"status": status, "sid": data["student_id"], "eid": event_id}
+        )
+        counters.change_status(event_id, old, status)
+        if old == "YES":
+            promoted = seats.release_seat(event_id)
+    db.session.commit()
+
+    # a promotion is an RSVP change for that student too
+    for student_id in [data["student_id"], *promoted]:
+        rec_cache.invalidate_student(student_id)
+
+    return {"message": "RSVP updated", "status": status, "promoted": promoted}
+
+
+def enqueue_rsvp(data):
+    # queued mode: no DB work here; the batch writer drops unknown
+    # students/events and a repeat RSVP updates the status
+    try:
+        student_id = int(data["student_id"])
+        event_id = int(data["event_id"])
+    except (KeyError, TypeError, ValueError):
+        return {"error": "Invalid student or event"}, 400
+
+    status = data.get("status", "YES")
+    if status not in seats.RSVP_STATUSES:
+        return {"error": "Invalid status"}, 400
+
+    if not rsvp_ingest.submit(student_id, event_id, status):
+        return {"error": "Too many RSVPs right now, retry shortly"}, 503, {"Retry-After": "1"}
+    return {"message": "RSVP accepted", "status": "PENDING"}, 202
+
+EVENT_RSVP_LIST = ListSpec(
+    columns={
+        "student_id": ["r.student_id"],
+        "fname": ["s.fname"],
+        "lname": ["s.lname"],
+        "rsvp_status": ["r.rsvp_status"],
+        "rsvp_time": ["r.rsvp_time"]
+    },
+    default=["student_id", "fname", "lname", "rsvp_status", "rsvp_time"],
+    keys=["r.student_id"]
+)
+
+
 @api.route("/events/<int:event_id>/rsvps")
 def get_event_rsvps(event_id):    #EVENT RSVPS
-    rsvps = db.session.execute(text("""
-        SELECT s.student_id, s.fname, s.lname, r.rsvp_status, r.rsvp_time
+    try:
+        limit, fields, after = parse_page_args(
+            request.args, EVENT_RSVP_LIST, parse_id_cursor
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    # (event_id, student_id) is the order of the event_id index, so a page
+    # is one range scan
+    seek = "AND r.student_id > :after_id" if after is not None else ""
+    rows = db.session.execute(text(f"""
+        SELECT {EVENT_RSVP_LIST.select_list(fields)}
         FROM rsvps r
         JOIN student s ON r.student_id = s.student_id
-        WHERE r.event_id = :eid
-    """), {"eid": event_id})
+        WHERE r.event_id = :eid {seek}
+        ORDER BY r.student_id
+        LIMIT :limit
+    """), {"eid": event_id, "after_id": after, "limit": limit + 1}).fetchall()
+
+    return paged_response(*page(
+        rows, limit, EVENT_RSVP_LIST, fields, lambda r: str(r["student_id"])
+    ))
+
+
+STUDENT_RSVP_LIST = ListSpec(
+    columns={
+        "event_id": ["e.event_id"],
+        "title": ["e.title"],
+        "location": ["e.location"],
+        "event_date": ["e.event_date"],
+        "rsvp_status": ["r.rsvp_status"],
+        "rsvp_time": ["r.rsvp_time"]
+    },
+    default=["event_id", "title", "location", "event_date", "rsvp_status", "rsvp_time"],
+    keys=["e.event_id", "e.event_date"]
+)
 
-    return jsonify([dict(row._mapping) for row in rsvps])
 
 @api.route("/students/<int:student_id>/rsvps")
 def get_student_rsvps(student_id):
-    query = text("""
-        SELECT
-            e.event_id,
-            e.title,
-            e.location,
-            e.event_date,
-            r.rsvp_status,
-            r.rsvp_time
+    try:
+        limit, fields, after = parse_page_args(
+            request.args, STUDENT_RSVP_LIST, parse_date_cursor
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    seek, params = "", {"sid": student_id, "limit": limit + 1}
+    if after is not None:
+        seek, cursor_params = after_date("e.event_date", "e.event_id", after)
+        seek = "AND " + seek
+        params.update(cursor_params)
+
+    rows = db.session.execute(text(f"""
+        SELECT {STUDENT_RSVP_LIST.select_list(fields)}
         FROM rsvps r
         JOIN event e ON r.event_id = e.event_id
-        WHERE r.student_id = :sid
-        ORDER BY e.event_date ASC
-    """)
+        WHERE r.student_id = :sid {seek}
+        ORDER BY e.event_date ASC, e.event_id ASC
+        LIMIT :limit
+    """), params).fetchall()
 
-    result = db.session.execute(query, {"sid": student_id})
-    return jsonify([dict(row._mapping) for row in result])
+    return paged_response(*page(
+        rows, limit, STUDENT_RSVP_LIST, fields,
+        lambda r: date_cursor(r["event_date"], r["event_id"])
+    ))
 
 
 
@@ -292,26 +686,57 @@ def get_student_rsvps(student_id):
 # RECOMMENDATION ENGINE (SQL-BASED)
 # =====================================================
 
-@api.route("/recommendations/<int:student_id>")
-def recommend_events(student_id):
-    query = text("""
+# Tag matches are aggregated in the candidate subquery and popularity comes
+# from the materialized event_rsvp_counts row, so neither count is
+# multiplied by the other; only future events are ranked.
+RECOMMEND_EVENTS_QUERY = text("""
+    SELECT
+        c.*,
+        c.tag_match_score * :w_tag
+            + LN(1 + c.popularity_score) * :w_pop
+            + :w_soon / (1 + c.days_until_event) AS score
+    FROM (
         SELECT
             e.event_id,
             e.title,
             e.location,
             e.event_date,
-            COUNT(et.tag_id) AS tag_match_score,
-            COUNT(r.student_id) AS popularity_score,
+            m.tag_match_score,
+            COALESCE(
+                rc.yes_count + rc.no_count + rc.maybe_count + rc.waitlist_count, 0
+            ) AS popularity_score,
             DATEDIFF(e.event_date, CURDATE()) AS days_until_event
-        FROM event e
-        JOIN event_tags et ON e.event_id = et.event_id
-        JOIN student_interests si ON et.tag_id = si.tag_id
-        LEFT JOIN rsvps r ON e.event_id = r.event_id
-        WHERE si.student_id = :sid
-        GROUP BY e.event_id
-    """)
-    
-    result = db.session.execute(query, {"sid": student_id})
+        FROM (
+            -- candidate set: walk event_tags(tag_id) for the student's
+            -- tags only instead of joining every event
+            SELECT et.event_id, COUNT(*) AS tag_match_score
+            FROM student_interests si
+            JOIN event_tags et ON et.tag_id = si.tag_id
+            WHERE si.student_id = :sid
+            GROUP BY et.event_id
+        ) m
+        JOIN event e ON e.event_id = m.event_id
+        LEFT JOIN event_rsvp_counts rc ON rc.event_id = e.event_id
+        WHERE e.event_date >= CURDATE()
+    ) c
+    ORDER BY score DESC, c.event_date ASC, c.event_id ASC
+    LIMIT :limit
+""")
+
+SQL_RANK_WEIGHTS = {"w_tag": 1.0, "w_pop": 0.5, "w_soon": 1.0}
+RECOMMEND_EVENTS_MAX_LIMIT = 100
+
+
+@api.route("/recommendations/<int:student_id>")
+def recommend_events(student_id):
+    limit = request.args.get("limit", 20, type=int)
+    if not 0 < limit <= RECOMMEND_EVENTS_MAX_LIMIT:
+        return {"error": f"limit must be 1-{RECOMMEND_EVENTS_MAX_LIMIT}"}, 400
+
+    result = db.session.execute(
+        RECOMMEND_EVENTS_QUERY,
+        {"sid": student_id, "limit": limit, **SQL_RANK_WEIGHTS}
+    )
     return jsonify([dict(row._mapping) for row in result])
 
 
@@ -320,36 +745,49 @@ def recommend_events(student_id):
 # UPCOMING EVENTS
 # =====================================================
 
+# hot queries are module-level so bench/explain_check.py can EXPLAIN them
+
+# rsvps side is covered by idx_rsvps_student_status
+STUDENT_UPCOMING_QUERY = text("""
+    SELECT
+        e.event_id,
+        e.title,
+        e.location,
+        e.event_date
+    FROM rsvps r
+    JOIN event e ON r.event_id = e.event_id
+    WHERE r.student_id = :sid
+      AND r.rsvp_status = 'YES'
+      AND e.event_date >= CURDATE()
+    ORDER BY e.event_date ASC
+""")
+
+# range scan on idx_event_date, already in order and covering
+UPCOMING_EVENTS_QUERY = text("""
+    SELECT event_id, title, event_date, location
+    FROM event
+    WHERE event_date >= CURDATE()
+    ORDER BY event_date ASC
+""")
+
+
 @api.route("/students/<int:student_id>/upcoming-events")
 def upcoming_events(student_id):
-    query = text("""
-        SELECT
-            e.event_id,
-            e.title,
-            e.location,
-            e.event_date
-        FROM rsvps r
-        JOIN event e ON r.event_id = e.event_id
-        WHERE r.student_id = :sid
-          AND r.rsvp_status = 'YES'
-          AND e.event_date >= CURDATE()
-        ORDER BY e.event_date ASC
-    """)
-
-    result = db.session.execute(query, {"sid": student_id})
+    result = db.session.execute(STUDENT_UPCOMING_QUERY, {"sid": student_id})
     return jsonify([dict(row._mapping) for row in result])
 
 
 @api.route("/events/upcoming")
 def all_upcoming_events():
-    query = text("""
-        SELECT event_id, title, event_date, location
-        FROM event
-        WHERE event_date >= CURDATE()
-        ORDER BY event_date ASC
-    """)
-    result = db.session.execute(query)
-    return jsonify([dict(row._mapping) for row in result])
+    # the list moves with CURDATE(), so the day is part of the key
+    return catalog_response(
+        "upcoming", list_upcoming_events, key=str(datetime.date.today())
+    )
+
+
+def list_upcoming_events():
+    result = db.session.execute(UPCOMING_EVENTS_QUERY)
+    return [dict(row._mapping) for row in result]
 
 
 
@@ -362,12 +800,11 @@ def most_active_department():
     query = text("""
         SELECT
             d.department_name,
-            COUNT(r.student_id) AS participation_count
-        FROM rsvps r
-        JOIN student s ON r.student_id = s.student_id
-        JOIN department d ON s.department_id = d.department_id
-        GROUP BY d.department_id
-        ORDER BY participation_count DESC
+            dp.participation_count
+        FROM department_participation dp
+        JOIN department d ON dp.department_id = d.department_id
+        WHERE dp.participation_count > 0
+        ORDER BY dp.participation_count DESC
     """)
 
     result = db.session.execute(query)
@@ -380,16 +817,86 @@ def most_active_department():
     ])
 
 
+# =====================================================
+# EXPORTS (?format=ndjson|csv, streamed)
+# =====================================================
+
+@api.route("/admin/events/<int:event_id>/rsvps/export")
+@require_role("ADMIN")
+def export_event_rsvps(event_id):
+    try:
+        fmt = parse_format(request.args.get("format"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    query = text("""
+        SELECT
+            r.student_id,
+            s.fname,
+            s.lname,
+            s.email,
+            r.rsvp_status,
+            r.rsvp_time
+        FROM rsvps r
+        JOIN student s ON r.student_id = s.student_id
+        WHERE r.event_id = :eid
+        ORDER BY r.student_id
+    """)
+    return export_response(query, {"eid": event_id}, fmt, f"event-{event_id}-rsvps")
+
+
+@api.route("/admin/analytics/department-participation/export")
+@require_role("ADMIN")
+def export_department_participation():
+    try:
+        fmt = parse_format(request.args.get("format"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    query = text("""
+        SELECT
+            d.department_id,
+            d.department_name AS department,
+            COALESCE(dp.participation_count, 0) AS participation_count
+        FROM department d
+        LEFT JOIN department_participation dp ON dp.department_id = d.department_id
+        ORDER BY participation_count DESC, d.department_id
+    """)
+    return export_response(query, {}, fmt, "department-participation")
+
+
 # =====================================================
 # Ai Recommendation
 # =====================================================
 
+AI_RECOMMEND_MAX_LIMIT = 100
+
+
 @api.route("/ai/recommend/<int:student_id>", methods=["GET"])
 def ai_recommend(student_id):
-    # 1️⃣ All tag IDs (global vector space)
-    all_tag_ids = [t.tag_id for t in Tag.query.all()]
-
-    # 2️⃣ Student interest tags
+    # mode=similarity (default): tag cosine only
+    # mode=hybrid: cosine + popularity + date decay, upcoming events only
+    mode = request.args.get("mode", "similarity")
+    if mode not in ("similarity", "hybrid"):
+        return {"error": "Invalid mode"}, 400
+
+    # limit/offset page through the ranking; without limit the whole
+    # ranking is returned as before
+    limit = request.args.get("limit", type=int)
+    offset = request.args.get("offset", 0, type=int)
+    if (limit is not None and not 0 < limit <= AI_RECOMMEND_MAX_LIMIT) or offset < 0:
+        return {"error": f"limit must be 1-{AI_RECOMMEND_MAX_LIMIT}, offset >= 0"}, 400
+    depth = None if limit is None else offset + limit
+
+    sync_versions()
+    cached = rec_cache.get_for(student_id, mode)
+    # a partial (limit-capped) entry only serves pages inside it
+    if cached is not None and (
+        cached["complete"] or (depth is not None and len(cached["results"]) >= depth)
+    ):
+        return recommendation_response(cached, offset, limit)
+
+    # 1️⃣ Student interest tags (event/tag data lives in the in-memory index)
     student_tag_rows = db.session.execute(
         text("""
             SELECT tag_id
@@ -401,61 +908,99 @@ def ai_recommend(student_id):
 
     student_tag_ids = [row.tag_id for row in student_tag_rows]
 
-    # 🔥 COLD START (NO INTERESTS)
-    if not student_tag_ids:
-        rows = db.session.execute(
-            text("""
-                SELECT e.event_id, e.title
-                FROM event e
-                ORDER BY e.created_at DESC
-                LIMIT 5
-            """)
-        ).fetchall()
-
-        return jsonify([
-            {
-                "event_id": r.event_id,
-                "title": r.title,
-                "score": None   # 👈 IMPORTANT FLAG
-            }
-            for r in rows
-        ])
-
-    # 3️⃣ Events with their tag IDs
-    event_rows = db.session.execute(text("""
-        SELECT
-            e.event_id,
-            e.title,
-            GROUP_CONCAT(et.tag_id) AS tag_ids
-        FROM event e
-        JOIN event_tags et ON e.event_id = et.event_id
-        GROUP BY e.event_id
-    """)).fetchall()
+    # 2️⃣ AI pipeline over the cached event-tag matrix; only events sharing
+    # a tag with the student or co-RSVPed with their history (the candidate
+    # set) are scored, so every result already has score > 0. Only the top
+    # offset + limit are selected (partial sort), never the whole ranking.
+    index = get_rec_index()
+    index.add_tags(student_tag_ids)  # tags created since the index was loaded
+
+    # events the student said YES / MAYBE to (or waits for); only read when
+    # there are collaborative neighbours to score them with
+    cf_weight = current_app.config["REC_CF_WEIGHT"]
+    history = []
+    if cf_weight > 0 and index.neighbors is not None:
+        history = [
+            r.event_id for r in db.session.execute(
+                text("""
+                    SELECT event_id
+                    FROM rsvps
+                    WHERE student_id = :sid AND rsvp_status <> 'NO'
+                """),
+                {"sid": student_id}
+            )
+        ]
+
+    # 🔥 COLD START (NO INTERESTS, NO RSVPS)
+    if not student_tag_ids and not history:
+        return cold_start_recommendations()
+
+    stats = {}
+    with route_profiler.section("recommender"):
+        recommendations = index.recommend(
+            student_tag_ids,
+            top_k=depth,
+            stats=stats,
+            ranker=hybrid_ranker if mode == "hybrid" else None,
+            history=history,
+            cf_weight=cf_weight
+        )
+    # ... or none that lead anywhere: RSVPs only to events nobody else
+    # went to, interest tags on no event
+    if stats["candidates"] == 0:
+        return cold_start_recommendations()
 
-    events = []
-    for row in event_rows:
-        events.append({
-            "event_id": row.event_id,
-            "title": row.title,
-            "tag_ids": list(map(int, row.tag_ids.split(",")))
-        })
+    entry = {
+        "results": recommendations,
+        "candidates": stats["candidates"],
+        "total": stats["total"],
+        "complete": len(recommendations) == stats["total"]
+    }
+    rec_cache.put(student_id, student_tag_ids, entry, variant=mode,
+                  event_ids=[r["event_id"] for r in recommendations])
+    return recommendation_response(entry, offset, limit)
 
-    # 4️⃣ AI pipeline
-    vectorizer = TagVectorizer(all_tag_ids)
-    recommender = EventRecommender(vectorizer)
 
-    recommendations = recommender.recommend(student_tag_ids, events)
+def recommendation_response(entry, offset=0, limit=None):
+    end = None if limit is None else offset + limit
+    response = jsonify(entry["results"][offset:end])
+    response.headers["X-Candidate-Count"] = str(entry["candidates"])
+    response.headers["X-Total-Count"] = str(entry["total"])
+    if end is not None and end < entry["total"]:
+        response.headers["X-Next-Offset"] = str(end)
+    return response
 
-    # 5️⃣ Remove zero-score events
-    recommendations = [r for r in recommendations if r["score"] > 0]
 
-    return jsonify(recommendations)
+@api.route("/ai/cache/stats", methods=["GET"])
+def ai_cache_stats():
+    return jsonify(rec_cache.stats())
 
 
 # =====================================================
 # Auth Syncing
 # =====================================================
-@api.route("/auth/sync", methods=["POST"])
+ADMIN_EMAIL = "admin@rvce.edu.in"
+
+# returning users: one round trip, no writes
+AUTH_SYNC_LOOKUP = text("""
+    SELECT u.user_id, u.role, s.student_id
+    FROM users u
+    LEFT JOIN student s ON s.user_id = u.user_id
+    WHERE u.clerk_user_id = :cid
+""")
+
+# the same row read again inside sync_first_login's transaction: a locking
+# read sees the latest committed rows, not the REPEATABLE READ snapshot the
+# lookup above opened before a concurrent first login committed
+AUTH_SYNC_RELOOKUP = text("""
+    SELECT u.user_id, u.role, s.student_id
+    FROM users u
+    LEFT JOIN student s ON s.user_id = u.user_id
+    WHERE u.clerk_user_id = :cid
+    FOR UPDATE
+""")
+
+
 @api.route("/auth/sync", methods=["POST"])
 def auth_sync():
     try:
@@ -466,84 +1011,20 @@ def auth_sync():
         if not clerk_user_id or not email:
             return jsonify({"error": "Missing clerk_user_id or email"}), 400
 
-        # 1️⃣ Find or create USER
-        user = db.session.execute(
-            text("SELECT * FROM users WHERE clerk_user_id = :cid"),
-            {"cid": clerk_user_id}
-        ).fetchone()
-
-        if not user:
-            role = "ADMIN" if email == "admin@rvce.edu.in" else "STUDENT"
+        user = db.session.execute(AUTH_SYNC_LOOKUP, {"cid": clerk_user_id}).fetchone()
 
-            db.session.execute(
-                text("""
-                    INSERT INTO users (email, role, clerk_user_id)
-                    VALUES (:email, :role, :cid)
-                """),
-                {"email": email, "role": role, "cid": clerk_user_id}
-            )
-            db.session.commit()
+        if user and (user.role != "STUDENT" or user.student_id is not None):
+            user_id, role, student_id = user.user_id, user.role, user.student_id
+        else:
+            synced = sync_first_login(clerk_user_id, email)
+            if synced is None:
+                return jsonify({"error": "Email is linked to another account"}), 409
+            user_id, role, student_id = synced
 
-            user = db.session.execute(
-                text("SELECT * FROM users WHERE clerk_user_id = :cid"),
-                {"cid": clerk_user_id}
-            ).fetchone()
-
-        # 2️⃣ STUDENT HANDLING (only if role = STUDENT)
-        student_id = None
-
-        if user.role == "STUDENT":
-            # Check if student already linked
-            student = db.session.execute(
-                text("SELECT student_id FROM student WHERE user_id = :uid"),
-                {"uid": user.user_id}
-            ).fetchone()
-
-            if not student:
-                # Try linking by email (existing student data)
-                existing = db.session.execute(
-                    text("SELECT student_id FROM student WHERE email = :email"),
-                    {"email": email}
-                ).fetchone()
-
-                if existing:
-                    db.session.execute(
-                        text("""
-                            UPDATE student
-                            SET user_id = :uid
-                            WHERE student_id = :sid
-                        """),
-                        {"uid": user.user_id, "sid": existing.student_id}
-                    )
-                    student_id = existing.student_id
-                else:
-                    # Create new student profile
-                    db.session.execute(
-                        text("""
-                            INSERT INTO student (email, password_hash, user_id)
-                            VALUES (:email, 'CLERK_AUTH', :uid)
-                        """),
-                        {"email": email, "uid": user.user_id}
-                    )
-
-                    student = db.session.execute(
-                        text("""
-                            SELECT student_id FROM student
-                            WHERE user_id = :uid
-                        """),
-                        {"uid": user.user_id}
-                    ).fetchone()
-
-                    student_id = student.student_id
-
-                db.session.commit()
-            else:
-                student_id = student.student_id
-
-        # 3️⃣ Return EVERYTHING frontend needs
+        # Return EVERYTHING frontend needs
         return jsonify({
-            "user_id": user.user_id,
-            "role": user.role,
+            "user_id": user_id,
+            "role": role,
             "student_id": student_id
         }), 200
 
@@ -552,6 +1033,60 @@ def auth_sync():
         print("🔥 AUTH SYNC ERROR:", e)
         return jsonify({"error": "Internal Server Error"}), 500
 
+
+def sync_first_login(clerk_user_id, email):
+    # Idempotent upserts in one transaction, safe when several first logins
+    # for the same account race: the unique keys pick a single row, which
+    # is then read back by clerk_user_id with a locking read (the plain
+    # read would see the snapshot from before the other login). An email already held by another
+    # account also hits a unique key; that row is left alone and the login
+    # is refused (None) instead of being handed someone else's user.
+    role = "ADMIN" if email == ADMIN_EMAIL else "STUDENT"
+
+    # 1️⃣ USER
+    db.session.execute(
+        text("""
+            INSERT INTO users (email, role, clerk_user_id)
+            VALUES (:email, :role, :cid)
+            ON DUPLICATE KEY UPDATE clerk_user_id = clerk_user_id
+        """),
+        {"email": email, "role": role, "cid": clerk_user_id}
+    )
+
+    # the row may predate this login (role set by hand, student linked)
+    user = db.session.execute(AUTH_SYNC_RELOOKUP, {"cid": clerk_user_id}).fetchone()
+    if user is None:
+        db.session.rollback()
+        return None
+    user_id, student_id = user.user_id, user.student_id
+
+    # 2️⃣ STUDENT (only if role = STUDENT): link the unclaimed profile with
+    # this email, or create one
+    if user.role == "STUDENT" and student_id is None:
+        db.session.execute(
+            text("""
+                INSERT INTO student (email, password_hash, user_id)
+                VALUES (:email, 'CLERK_AUTH', :uid)
+                ON DUPLICATE KEY UPDATE user_id = COALESCE(user_id, VALUES(user_id))
+            """),
+            {"email": email, "uid": user_id}
+        )
+        student_id = db.session.execute(
+            text("SELECT student_id FROM student WHERE user_id = :uid FOR UPDATE"),
+            {"uid": user_id}
+        ).scalar()
+        if student_id is None:
+            # the profile with this email belongs to another user
+            db.session.rollback()
+            return None
+
+    db.session.commit()
+
+    # drop any cached "no such user" for this identity
+    invalidate_identity(clerk_user_id)
+
+    return user_id, user.role, student_id
+
 @api.route("/admin/events", methods=["POST"])
 @require_role("ADMIN")
 def admin_create_event():
@@ -560,81 +1095,146 @@ def admin_create_event():
     title = data.get("title")
     description = data.get("description")
     location = data.get("location")
-    event_date = data.get("event_date")
-    tag_ids = data.get("tag_ids", [])
     registration_link = data.get("registration_link")
 
     if not title:
         return {"error": "Title is required"}, 400
 
+    event_date, error = parse_event_date(data)
+    if error:
+        return error
+
+    capacity, error = parse_capacity(data)
+    if error:
+        return error
+
+    # checked before any write, so a bad list never leaves a tagless event
+    tag_ids = set()
+    if "tag_ids" in data:
+        tag_ids = parse_tag_ids(data)
+        if tag_ids is None:
+            return {"error": "tag_ids must be a list of tag ids"}, 400
+
     # 1️⃣ Insert event
     result = db.session.execute(
         text("""
-            INSERT INTO event (title, description, location, event_date, organizer_type, registration_link)
-            VALUES (:title, :desc, :loc, :date, 'ADMIN', :link)
+            INSERT INTO event (title, description, location, event_date, organizer_type,
+                               registration_link, capacity)
+            VALUES (:title, :desc, :loc, :date, 'ADMIN', :link, :capacity)
         """),
         {
             "title": title,
             "desc": description,
             "loc": location,
             "date": event_date,
-            "link": registration_link
+            "link": registration_link,
+            "capacity": capacity
         }
     )
 
     event_id = result.lastrowid
 
-    # 2️⃣ Insert tags
-    for tag_id in tag_ids:
-        db.session.execute(
-            text("""
-                INSERT INTO event_tags (event_id, tag_id)
-                VALUES (:eid, :tid)
-            """),
-            {"eid": event_id, "tid": tag_id}
-        )
+    # 2️⃣ Insert tags (executemany -> one multi-row INSERT)
+    try:
+        if tag_ids:
+            db.session.execute(
+                text("""
+                    INSERT INTO event_tags (event_id, tag_id)
+                    VALUES (:eid, :tid)
+                """),
+                [{"eid": event_id, "tid": tag_id} for tag_id in tag_ids]
+            )
 
-    db.session.commit()
+        bump_version("catalog")
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return {"error": "Invalid tag"}, 400
+
+    catalog_cache.bump()
+    rec_index.upsert_event(event_id, title, tag_ids, event_date)
+    rec_cache.invalidate_tags(rec_index.event_tag_ids(event_id))
     return {"message": "Event created"}, 201
 
 
+def parse_event_date(data):
+    # -> (date or None, None) or (None, error response); the index ranks on
+    # the parsed date, so a bad string must never get past the route
+    value = data.get("event_date")
+    if value is None or value == "":
+        return None, None
+    try:
+        return datetime.date.fromisoformat(value), None
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.datetime.fromisoformat(value).date(), None
+    except (TypeError, ValueError):
+        return None, ({"error": "event_date must be an ISO date (YYYY-MM-DD)"}, 400)
+
+
+def parse_capacity(data):
+    # -> (capacity, None) or (None, error response); missing/null is no limit
+    capacity = data.get("capacity")
+    if capacity is None:
+        return None, None
+    try:
+        capacity = int(capacity)
+    except (TypeError, ValueError):
+        capacity = -1
+    if capacity < 0:
+        return None, ({"error": "capacity must be a non-negative integer"}, 400)
+    return capacity, None
+
+
 @api.route("/admin/events", methods=["GET"])
 @require_role("ADMIN")
 def admin_get_events():
-    rows = db.session.execute(
-        text("""
-            SELECT 
-                e.event_id,
-                e.title,
-                e.event_date,
-                e.location,
-                e.registration_link,
-                GROUP_CONCAT(t.tag_name) AS tags
-            FROM event e
-            LEFT JOIN event_tags et ON e.event_id = et.event_id
-            LEFT JOIN tag t ON et.tag_id = t.tag_id
-            GROUP BY e.event_id
-            ORDER BY e.created_at DESC
-        """)
-    ).fetchall()
-
-    return jsonify([
+    return catalog_response("admin_events", list_admin_events, private=True)
+
+
+ADMIN_EVENTS_QUERY = text("""
+    SELECT 
+        e.event_id,
+        e.title,
+        e.event_date,
+        e.location,
+        e.registration_link,
+        e.capacity,
+        GROUP_CONCAT(t.tag_name) AS tags
+    FROM event e
+    LEFT JOIN event_tags et ON e.event_id = et.event_id
+    LEFT JOIN tag t ON et.tag_id = t.tag_id
+    GROUP BY e.event_id
+    ORDER BY e.created_at DESC
+""")
+
+
+def list_admin_events():
+    rows = db.session.execute(ADMIN_EVENTS_QUERY).fetchall()
+
+    return [
         {
             "event_id": r.event_id,
             "title": r.title,
             "event_date": r.event_date,
             "location": r.location,
             "registration_link": r.registration_link,
+            "capacity": r.capacity,
             "tags": r.tags.split(",") if r.tags else []
         }
         for r in rows
-    ])
+    ]
 
 @api.route("/admin/events/<int:event_id>", methods=["PUT"])
 @require_role("ADMIN")
 def admin_update_event(event_id):
     data = request.json
 
+    event_date, error = parse_event_date(data)
+    if error:
+        return error
+
     db.session.execute(text("""
         UPDATE event
         SET title=:title,
@@ -647,21 +1247,50 @@ def admin_update_event(event_id):
         "title": data["title"],
         "desc": data.get("description"),
         "loc": data.get("location"),
-        "date": data.get("event_date")
+        "date": event_date
     })
 
+    # capacity only changes when sent, so older clients keep the limit;
+    # a raise promotes from the waitlist, a cut keeps existing seats
+    promoted = []
+    if "capacity" in data:
+        capacity, error = parse_capacity(data)
+        if error:
+            db.session.rollback()
+            return error
+        db.session.execute(
+            text("UPDATE event SET capacity = :capacity WHERE event_id = :eid"),
+            {"eid": event_id, "capacity": capacity}
+        )
+        promoted = seats.fill_waitlist(event_id)
+
+    bump_version("catalog")
     db.session.commit()
+
+    catalog_cache.bump()
+    rec_index.update_event(event_id, data["title"], event_date)
+    rec_cache.invalidate_event(event_id, rec_index.event_tag_ids(event_id))
+    for student_id in promoted:
+        rec_cache.invalidate_student(student_id)
     return {"message": "Event updated"}
 
 
 @api.route("/admin/events/<int:event_id>", methods=["DELETE"])
 @require_role("ADMIN")
 def admin_delete_event(event_id):
+    tag_ids = rec_index.event_tag_ids(event_id)
+
+    counters.forget_event(event_id)
     db.session.execute(
         text("DELETE FROM event WHERE event_id = :eid"),
         {"eid": event_id}
     )
+    bump_version("catalog")
     db.session.commit()
+
+    catalog_cache.bump()
+    rec_index.remove_event(event_id)
+    rec_cache.invalidate_event(event_id, tag_ids)
     return {"message": "Event deleted"}
 
 
@@ -673,16 +1302,17 @@ def get_student_id_for_user(user_id):
     return row.student_id if row else None
 
 
+# newest first: reads the tail of idx_event_created_at (covering), no sort
+COLD_START_QUERY = text("""
+    SELECT e.event_id, e.title
+    FROM event e
+    ORDER BY e.created_at DESC
+    LIMIT :limit
+""")
+
+
 def cold_start_recommendations(limit=5):
-    rows = db.session.execute(
-        text("""
-            SELECT e.event_id, e.title
-            FROM event e
-            ORDER BY e.created_at DESC
-            LIMIT :limit
-        """),
-        {"limit": limit}
-    ).fetchall()
+    rows = db.session.execute(COLD_START_QUERY, {"limit": limit}).fetchall()
 
     return jsonify([
         {
@@ -0,0 +1,345 @@
+"""Asynchronous RSVP ingestion for registration spikes.
+
+With Config.RSVP_ASYNC, POST /rsvp checks the request shape, puts the RSVP
+on a bounded in-process queue and answers 202 PENDING straight away. A
+background thread drains the queue in batches (RSVP_BATCH_SIZE rows or
+RSVP_FLUSH_MS, whichever comes first) and writes each batch in one
+transaction with write_rsvps():
+
+  - one IN query each for the students and events named in the batch,
+    instead of two Query.get per click; unknown ids are dropped
+  - one multi-row INSERT ... ON DUPLICATE KEY UPDATE, the last status in
+    the batch winning for a repeated (student, event)
+  - counter deltas applied with one upsert per counter table
+  - seats taken and released through seats.py, so capacity and the
+    waitlist hold the same as for the synchronous route
+
+A full queue is the backpressure signal: submit() returns False and the
+route answers 503 with Retry-After. stop() (atexit, gunicorn worker_exit)
+drains and writes what is left. A batch that still cannot be written is
+appended to this process's own spill file, RSVP_SPILL_FILE.<pid>, so
+workers never share one. When a writer starts it claims the spill files
+no live process appends to (its own and those of exited workers) by
+renaming them, which only one worker can win, and writes them first.
+
+The writer is injected, so the queue runs against any stand-in: a plain
+function in tests, or the SQLite shim in bench.sqlite_compat.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import text, bindparam
+
+from metrics import Histogram
+
+log = logging.getLogger(__name__)
+
+WRITE_ATTEMPTS = 3
+
+
+class RSVPQueue:
+    def __init__(self, writer=None, app=None, maxsize=10000, batch_size=500,
+                 flush_ms=50, spill_file=None):
+        self.configure(writer, app, maxsize, batch_size, flush_ms, spill_file)
+        self.batch_time = Histogram()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._atexit = False
+        self.accepted = 0
+        self.rejected = 0       # queue full
+        self.written = 0
+        self.invalid = 0        # unknown student or event
+        self.batches = 0
+        self.failures = 0       # failed write attempts
+        self.spilled = 0
+        self._claims = itertools.count(1)
+
+    def configure(self, writer, app=None, maxsize=10000, batch_size=500,
+                  flush_ms=50, spill_file=None):
+        # call before the first submit; writer(batch) -> {"written", "invalid"}
+        # runs inside app's context when an app is given
+        self.writer = writer
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        # absolute, so every worker resolves it to the same directory
+        self.spill_file = spill_file and os.path.abspath(spill_file)
+        self._queue = queue.Queue(maxsize)
+
+    def _bump(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # -------- producer side --------
+
+    def submit(self, student_id, event_id, status):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((student_id, event_id, status))
+        except queue.Full:
+            self._bump("rejected")
+            return False
+        self._bump("accepted")
+        return True
+
+    def flush(self, timeout=None):
+        # wait until everything submitted so far has been written (or spilled)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stop(self, timeout=10):
+        # drain and write what is queued, then stop the writer thread
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+        # writer gone or too slow: keep the rest on disk
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        if leftover:
+            self._spill(leftover)
+        self._thread = None
+
+    # -------- writer side --------
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            # started lazily, so each forked worker gets its own thread
+            self._thread = threading.Thread(
+                target=self._run, name="rsvp-writer", daemon=True
+            )
+            self._thread.start()
+            if not self._atexit:
+                atexit.register(self.stop)
+                self._atexit = True
+
+    def _run(self):
+        self._replay_spill()
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._take()
+            if batch:
+                try:
+                    self._write(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def _take(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        for attempt in range(WRITE_ATTEMPTS):
+            start = time.perf_counter()
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        result = self.writer(batch)
+                else:
+                    result = self.writer(batch)
+            except Exception:
+                self._bump("failures")
+                log.exception("RSVP batch of %d failed (attempt %d)", len(batch), attempt + 1)
+                time.sleep(0.1 * 2 ** attempt)
+                continue
+
+            self.batch_time.record((time.perf_counter() - start) * 1000)
+            with self._lock:
+                self.batches += 1
+                self.written += result["written"]
+                self.invalid += result["invalid"]
+            return True
+
+        self._spill(batch)
+        return False
+
+    # -------- spill file --------
+
+    def _spill(self, batch):
+        if not self.spill_file:
+            log.error("dropping %d RSVPs: no spill file configured", len(batch))
+            return
+        path = f"{self.spill_file}.{os.getpid()}"
+        with self._lock, open(path, "a") as f:
+            for student_id, event_id, status in batch:
+                f.write(json.dumps({
+                    "student_id": student_id, "event_id": event_id, "status": status
+                }) + "\n")
+            self.spilled += len(batch)
+        log.warning("spilled %d RSVPs to %s", len(batch), path)
+
+    def _orphans(self):
+        # spill files nobody appends to any more: <spill>.<pid> and
+        # <spill>.<pid>.replay-<n> of this process or of a process that is
+        # gone, and a bare <spill> left by older versions
+        directory, base = os.path.split(self.spill_file)
+        found = []
+        for name in sorted(os.listdir(directory)):
+            if name == base:
+                found.append(name)
+            elif name.startswith(base + "."):
+                pid = name[len(base) + 1:].split(".")[0]
+                if pid.isdigit() and (int(pid) == os.getpid() or not _alive(int(pid))):
+                    found.append(name)
+        return [os.path.join(directory, name) for name in found]
+
+    def _replay_spill(self):
+        if not self.spill_file or not os.path.isdir(os.path.dirname(self.spill_file)):
+            return
+        for path in self._orphans():
+            # rename is atomic: of two workers starting at once, one claims
+            # the file and the other gets FileNotFoundError
+            replaying = f"{self.spill_file}.{os.getpid()}.replay-{next(self._claims)}"
+            try:
+                with self._lock:
+                    os.rename(path, replaying)
+            except FileNotFoundError:
+                continue
+            with open(replaying) as f:
+                items = [
+                    (r["student_id"], r["event_id"], r["status"])
+                    for r in map(json.loads, f)
+                ]
+            for start in range(0, len(items), self.batch_size):
+                # a batch that fails again is spilled again
+                self._write(items[start:start + self.batch_size])
+            os.remove(replaying)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "queued": self._queue.qsize(),
+                "maxsize": self._queue.maxsize,
+                "batch_size": self.batch_size,
+                "flush_ms": self.flush_ms,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "written": self.written,
+                "invalid": self.invalid,
+                "batches": self.batches,
+                "failures": self.failures,
+                "spilled": self.spilled,
+                "batch_time": self.batch_time.snapshot()
+            }
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+rsvp_ingest = RSVPQueue()
+
+
+def write_rsvps(batch):
+    # the DB writer for RSVPQueue; batch is a list of
+    # (student_id, event_id, status)
+    from models import db
+    from rec_state import rec_index, rec_cache
+    import counters
+    import seats
+
+    latest = {}
+    for student_id, event_id, status in batch:
+        latest[(student_id, event_id)] = status
+
+    departments = dict(db.session.execute(
+        text("SELECT student_id, department_id FROM student WHERE student_id IN :ids")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": sorted({s for s, _ in latest})}
+    ).all())
+    events = {
+        r.event_id for r in db.session.execute(
+            text("SELECT event_id FROM event WHERE event_id IN :ids")
+            .bindparams(bindparam("ids", expanding=True)),
+            {"ids": sorted({e for _, e in latest})}
+        )
+    }
+    rows = {
+        key: status for key, status in latest.items()
+        if key[0] in departments and key[1] in events
+    }
+
+    new_rows = {}
+    if rows:
+        # lock the rows being changed so the counter deltas stay exact
+        previous = {
+            (r.student_id, r.event_id): r.rsvp_status
+            for r in db.session.execute(
+                text("""
+                    SELECT student_id, event_id, rsvp_status
+                    FROM rsvps
+                    WHERE student_id IN :sids AND event_id IN :eids
+                    FOR UPDATE
+                """).bindparams(
+                    bindparam("sids", expanding=True), bindparam("eids", expanding=True)
+                ),
+                {"sids": sorted({s for s, _ in rows}), "eids": sorted({e for _, e in rows})}
+            )
+        }
+        # event order, so concurrent writers take event row locks in the
+        # same order
+        rows = {
+            key: seats.resolve(key[1], previous.get(key), rows[key])
+            for key in sorted(rows, key=lambda k: (k[1], k[0]))
+        }
+        db.session.execute(
+            text("""
+                INSERT INTO rsvps (student_id, event_id, rsvp_status)
+                VALUES (:sid, :eid, :status)
+                ON DUPLICATE KEY UPDATE rsvp_status = VALUES(rsvp_status)
+            """),
+            [{"sid": s, "eid": e, "status": status} for (s, e), status in rows.items()]
+        )
+        new_rows = counters.record_rsvps(rows, previous, departments)
+        for (student_id, event_id), status in rows.items():
+            if previous.get((student_id, event_id)) == "YES" and status != "YES":
+                seats.release_seat(event_id)
+    db.session.commit()
+
+    for event_id, n in new_rows.items():
+        rec_index.add_rsvp(event_id, n)
+    for student_id, _ in rows:
+        rec_cache.invalidate_student(student_id)
+    return {"written": len(rows), "invalid": len(latest) - len(rows)}
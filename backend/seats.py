@@ -0,0 +1,82 @@
+"""Event capacity: seat allocation and the waitlist.
+
+event.seats_taken counts YES RSVPs and event.capacity caps it (NULL means
+no limit). A seat is taken with one conditional UPDATE, so the check and
+the increment are a single atomic step on the event row. Concurrent
+requests for one event queue on that row lock instead of each reading a
+count and then inserting, which is how events get overbooked. A YES that
+does not get a seat is stored as WAITLIST. When a seat comes back
+(YES -> NO/MAYBE, or a capacity raise) the longest-waiting student is
+promoted in the same transaction.
+
+Everything here runs inside the caller's transaction.
+"""
+from sqlalchemy import text
+from models import db
+import counters
+
+# what clients may ask for; WAITLIST is only ever assigned
+RSVP_STATUSES = ("YES", "NO", "MAYBE")
+
+TAKE_SEAT = text("""
+    UPDATE event
+    SET seats_taken = seats_taken + 1
+    WHERE event_id = :eid
+      AND (capacity IS NULL OR seats_taken < capacity)
+""")
+
+RETURN_SEAT = text("""
+    UPDATE event
+    SET seats_taken = seats_taken - 1
+    WHERE event_id = :eid AND seats_taken > 0
+""")
+
+# first in line; SKIP LOCKED lets concurrent releases promote different
+# students instead of queueing on the same row
+NEXT_WAITLISTED = text("""
+    SELECT student_id
+    FROM rsvps
+    WHERE event_id = :eid AND rsvp_status = 'WAITLIST'
+    ORDER BY rsvp_time, student_id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+""")
+
+PROMOTE = text("""
+    UPDATE rsvps
+    SET rsvp_status = 'YES'
+    WHERE event_id = :eid AND student_id = :sid AND rsvp_status = 'WAITLIST'
+""")
+
+
+def take_seat(event_id):
+    return db.session.execute(TAKE_SEAT, {"eid": event_id}).rowcount == 1
+
+
+def resolve(event_id, old, requested):
+    # status to store when `requested` replaces `old` (None for a new RSVP);
+    # a YES takes a seat or joins the waitlist, repeating it keeps either
+    if requested != "YES":
+        return requested
+    if old in ("YES", "WAITLIST"):
+        return old
+    return "YES" if take_seat(event_id) else "WAITLIST"
+
+
+def release_seat(event_id):
+    # after a YES row moved away from YES: hand the seat on, or give it back
+    db.session.execute(RETURN_SEAT, {"eid": event_id})
+    return fill_waitlist(event_id, limit=1)
+
+
+def fill_waitlist(event_id, limit=None):
+    # promote waitlisted students while seats are free; returns their ids
+    promoted = []
+    while limit is None or len(promoted) < limit:
+        row = db.session.execute(NEXT_WAITLISTED, {"eid": event_id}).fetchone()
+        if row is None or not take_seat(event_id):
+            break
+        db.session.execute(PROMOTE, {"eid": event_id, "sid": row.student_id})
+        counters.change_status(event_id, "WAITLIST", "YES")
+        promoted.append(row.student_id)
+    return promoted
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def jwks_dir(tmp_path_factory):
+    # dev_jwks key set the app verifies tokens against; mint() signs them
+    import dev_jwks
+
+    key_dir = str(tmp_path_factory.mktemp("dev_keys"))
+    dev_jwks.init(key_dir)
+    return key_dir
+
+
+@pytest.fixture
+def app(tmp_path, jwks_dir):
+    # the app on a small synthetic SQLite database (bench.sqlite_compat),
+    # warmed like a gunicorn worker
+    import auth_utils
+    from app import create_app, init_worker
+    from bench import datagen, sqlite_compat
+    from config import Config
+    from models import db
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.sqlite'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        CLERK_JWKS_URL = None
+        CLERK_JWKS_FILE = os.path.join(jwks_dir, "jwks.json")
+
+    auth_utils.identity_cache.clear()
+    auth_utils.token_cache.clear()
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        sqlite_compat.install(db.engine, foreign_keys=True)
+        sqlite_compat.create_schema(db.engine)
+        datagen.populate(students=50, events=40, tags=8, rsvps_per_student=3)
+        db.session.remove()
+    init_worker(app)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(app, jwks_dir):
+    # headers of an ADMIN user for the require_role routes
+    import dev_jwks
+    from sqlalchemy import text
+    from models import db
+
+    with app.app_context():
+        db.session.execute(text(
+            "INSERT INTO users (email, role, clerk_user_id) "
+            "VALUES ('admin@bench.test', 'ADMIN', 'bench_admin')"
+        ))
+        db.session.commit()
+    token = dev_jwks.mint("bench_admin", key_dir=jwks_dir)
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,73 @@
+def test_paged_then_unpaged_request(client):
+    first = client.get("/ai/recommend/3?limit=2")
+    assert first.status_code == 200
+    assert len(first.get_json()) <= 2
+
+    # the cached entry above is partial; the full ranking must be recomputed
+    full = client.get("/ai/recommend/3")
+    assert full.status_code == 200
+    results = full.get_json()
+    assert len(results) == int(full.headers["X-Total-Count"])
+    assert results[:2] == first.get_json()
+
+
+def test_unpaged_then_paged_request_is_served_from_the_cache(client):
+    full = client.get("/ai/recommend/3").get_json()
+    page = client.get("/ai/recommend/3?limit=2&offset=1")
+    assert page.status_code == 200
+    assert page.get_json() == full[1:3]
+
+
+def test_rsvp_nobody_shares_falls_back_to_cold_start(app, client):
+    from sqlalchemy import text
+    from models import db
+
+    # no interests, one RSVP to an event nobody else attended
+    with app.app_context():
+        event_id = db.session.execute(text(
+            "INSERT INTO event (title, event_date) VALUES ('Niche', '2099-01-01')"
+        )).lastrowid
+        student_id = db.session.execute(text(
+            "INSERT INTO student (email, password_hash) VALUES ('loner@bench.test', 'x')"
+        )).lastrowid
+        db.session.execute(text(
+            "INSERT INTO rsvps (student_id, event_id, rsvp_status) VALUES (:sid, :eid, 'YES')"
+        ), {"sid": student_id, "eid": event_id})
+        db.session.commit()
+        latest = [
+            r.event_id for r in db.session.execute(text(
+                "SELECT event_id FROM event ORDER BY created_at DESC LIMIT 5"
+            ))
+        ]
+
+    resp = client.get(f"/ai/recommend/{student_id}")
+    assert resp.status_code == 200
+    results = resp.get_json()
+    assert [r["event_id"] for r in results] == latest
+    assert all(r["score"] is None for r in results)
+
+
+def test_event_write_drops_rankings_that_reached_it_through_cf(app, client, admin):
+    from sqlalchemy import text
+    from models import db
+
+    # no interests: everything this student gets comes from co-RSVPs
+    with app.app_context():
+        popular = db.session.execute(text(
+            "SELECT event_id FROM rsvps GROUP BY event_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+        student_id = db.session.execute(text(
+            "INSERT INTO student (email, password_hash) VALUES ('cf@bench.test', 'x')"
+        )).lastrowid
+        db.session.execute(text(
+            "INSERT INTO rsvps (student_id, event_id, rsvp_status) VALUES (:sid, :eid, 'YES')"
+        ), {"sid": student_id, "eid": popular})
+        db.session.commit()
+
+    before = client.get(f"/ai/recommend/{student_id}").get_json()
+    assert before and before[0]["score"] is not None
+    gone = before[0]["event_id"]
+
+    assert client.delete(f"/admin/events/{gone}", headers=admin).status_code == 200
+    after = client.get(f"/ai/recommend/{student_id}").get_json()
+    assert gone not in [r["event_id"] for r in after]
@@ -0,0 +1,102 @@
+import jwt
+import pytest
+
+import auth_utils
+import dev_jwks
+from auth_utils import JWKSCache
+from config import Config
+
+
+class FlakyJWKS(JWKSCache):
+    # _fetch replays `results`: a dict of keys, or an exception to raise
+    def __init__(self, results):
+        super().__init__(ttl=3600)
+        self.results = list(results)
+        self.fetches = 0
+
+    def _fetch(self):
+        self.fetches += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth_utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_failed_refresh_keeps_serving_cached_keys(clock):
+    jwks = FlakyJWKS([{"a": "key-a"}, OSError("clerk down"), {"a": "key-a2"}])
+    assert jwks.get_key("a") == "key-a"
+
+    clock[0] += jwks.ttl + 1
+    assert jwks.get_key("a") == "key-a"
+    assert jwks.fetches == 2
+
+    # backing off: neither a stale key nor an unknown kid refetches yet
+    assert jwks.get_key("a") == "key-a"
+    assert jwks.get_key("b") is None
+    assert jwks.fetches == 2
+
+    clock[0] += jwks.MIN_REFRESH
+    assert jwks.get_key("a") == "key-a2"
+    assert jwks.fetches == 3
+
+
+def test_first_fetch_failure_rejects_until_retry(clock):
+    jwks = FlakyJWKS([OSError("clerk down"), {"a": "key-a"}])
+    assert jwks.get_key("a") is None
+    assert jwks.get_key("a") is None
+    assert jwks.fetches == 1
+
+    clock[0] += jwks.MIN_REFRESH
+    assert jwks.get_key("a") == "key-a"
+
+
+@pytest.fixture
+def dev_keys(app, jwks_dir, monkeypatch):
+    # verify_token against the dev_jwks key set create_app pointed jwks at
+    monkeypatch.setattr(auth_utils.Config, "CLERK_AUDIENCE", "event-recom")
+    return lambda sub, **kw: dev_jwks.mint(
+        sub, key_dir=jwks_dir, **{"audience": "event-recom", **kw}
+    )
+
+
+def test_verify_token_accepts_a_valid_token(dev_keys):
+    assert auth_utils.verify_token(dev_keys("user_abc")) == "user_abc"
+
+
+@pytest.mark.parametrize("claims, error", [
+    ({"ttl": -60}, jwt.ExpiredSignatureError),
+    ({"kid": "retired-key"}, jwt.InvalidTokenError),
+    ({"audience": "another-app"}, jwt.InvalidAudienceError),
+])
+def test_verify_token_rejects(dev_keys, claims, error):
+    with pytest.raises(error):
+        auth_utils.verify_token(dev_keys("user_abc", **claims))
+    assert len(auth_utils.token_cache) == 0
+
+
+def test_admin_routes_need_an_admin_token(client, admin, jwks_dir):
+    assert client.get("/admin/events").status_code == 401
+    assert client.get("/admin/events", headers={"X-User-Id": "1"}).status_code == 401
+    student = dev_jwks.mint("bench_1", key_dir=jwks_dir)
+    assert client.get(
+        "/admin/events", headers={"Authorization": f"Bearer {student}"}
+    ).status_code == 403
+    assert client.get("/admin/events", headers=admin).status_code == 200
+
+
+def test_create_app_needs_a_key_set():
+    from app import create_app
+
+    class NoKeys(Config):
+        CLERK_JWKS_URL = None
+        CLERK_JWKS_FILE = None
+
+    with pytest.raises(RuntimeError, match="CLERK_JWKS_URL"):
+        create_app(NoKeys)
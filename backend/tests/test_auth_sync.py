@@ -0,0 +1,65 @@
+from sqlalchemy import text
+
+from models import db
+
+
+def sync(client, cid, email):
+    return client.post("/auth/sync", json={"clerk_user_id": cid, "email": email})
+
+
+def test_first_login_creates_user_and_student(client):
+    resp = sync(client, "clerk_new", "new@rvce.edu.in")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["role"] == "STUDENT" and body["student_id"] is not None
+    assert sync(client, "clerk_new", "new@rvce.edu.in").get_json() == body
+
+
+def test_email_of_another_account_is_refused(app, client):
+    # student1@bench.test belongs to clerk id bench_1
+    resp = sync(client, "clerk_intruder", "student1@bench.test")
+    assert resp.status_code == 409
+    with app.app_context():
+        owner = db.session.execute(
+            text("SELECT clerk_user_id FROM users WHERE email = 'student1@bench.test'")
+        ).scalar()
+        intruder = db.session.execute(
+            text("SELECT COUNT(*) FROM users WHERE clerk_user_id = 'clerk_intruder'")
+        ).scalar()
+    assert owner == "bench_1" and intruder == 0
+
+
+def test_student_profile_of_another_user_is_not_relinked(app, client):
+    # a user whose email matches a student profile linked to someone else
+    with app.app_context():
+        db.session.execute(text(
+            "INSERT INTO users (email, role, clerk_user_id) "
+            "VALUES ('alias@bench.test', 'STUDENT', 'clerk_alias')"
+        ))
+        db.session.execute(text(
+            "UPDATE student SET email = 'alias@bench.test' WHERE student_id = 2"
+        ))
+        db.session.commit()
+
+    assert sync(client, "clerk_alias", "alias@bench.test").status_code == 409
+    with app.app_context():
+        linked = db.session.execute(
+            text("SELECT user_id FROM student WHERE student_id = 2")
+        ).scalar()
+    assert linked == 2
+
+
+def test_unclaimed_student_profile_is_linked(app, client):
+    with app.app_context():
+        db.session.execute(text(
+            "INSERT INTO student (email, password_hash) "
+            "VALUES ('imported@rvce.edu.in', 'x')"
+        ))
+        sid = db.session.execute(
+            text("SELECT student_id FROM student WHERE email = 'imported@rvce.edu.in'")
+        ).scalar()
+        db.session.commit()
+
+    resp = sync(client, "clerk_imported", "imported@rvce.edu.in")
+    assert resp.status_code == 200
+    assert resp.get_json()["student_id"] == sid
@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import text
+
+import rec_state
+from models import db
+
+
+def tag_set(app, table, owner_column, owner_id):
+    with app.app_context():
+        return {r.tag_id for r in db.session.execute(
+            text(f"SELECT tag_id FROM {table} WHERE {owner_column} = :oid"),
+            {"oid": owner_id}
+        )}
+
+
+def version(app, query, **params):
+    with app.app_context():
+        return db.session.execute(text(query), params).scalar() or 0
+
+
+def catalog_version(app):
+    return version(app, "SELECT version FROM cache_versions WHERE name = 'catalog'")
+
+
+def student_version(app, student_id):
+    return version(
+        app, "SELECT version FROM student_cache_versions WHERE student_id = :sid",
+        sid=student_id
+    )
+
+
+def cache(student_id, tag_ids=(), event_ids=()):
+    rec_state.rec_cache.put(student_id, tag_ids, ["ranked"], event_ids=event_ids)
+
+
+def cached():
+    return set(rec_state.rec_cache._by_student)
+
+
+@pytest.mark.parametrize("path", ["/students/1/interests", "/student/interests/1"])
+def test_interests_replaced_in_one_request(app, client, path):
+    method = client.put if path.startswith("/students") else client.post
+    before = student_version(app, 1)
+    cache(1)
+    cache(2)
+
+    # duplicates in the batch are one row each
+    resp = method(path, json={"tag_ids": [3, 3, "5", 5]})
+    assert resp.status_code == 200
+    assert tag_set(app, "student_interests", "student_id", 1) == {3, 5}
+    assert student_version(app, 1) == before + 1
+    assert cached() == {2}
+
+    # the diff: nothing to add or remove the second time
+    body = method(path, json={"tag_ids": [5, 3]}).get_json()
+    assert (body["added"], body["removed"]) == (0, 0)
+
+
+@pytest.mark.parametrize("tag_ids", [[1, 2, 999], [1, "x"], "1,2", None])
+def test_invalid_interest_batch_writes_nothing(app, client, tag_ids):
+    before = tag_set(app, "student_interests", "student_id", 1)
+    version_before = student_version(app, 1)
+    cache(1)
+
+    resp = client.put("/students/1/interests", json={"tag_ids": tag_ids})
+    assert resp.status_code == 400
+    assert tag_set(app, "student_interests", "student_id", 1) == before
+    assert student_version(app, 1) == version_before
+    assert cached() == {1}
+
+
+def test_event_tags_replaced_in_one_request(app, client):
+    old = tag_set(app, "event_tags", "event_id", 1)
+    new = set(range(1, 9)) - old
+    other = new.pop()
+    before = catalog_version(app)
+
+    cache(101, tag_ids=old)                     # shared an old tag
+    cache(102, tag_ids=new)                     # shares a new tag
+    cache(103, tag_ids={other}, event_ids=[1])  # reached the event otherwise
+    cache(104, tag_ids={other}, event_ids=[2])
+
+    resp = client.put("/events/1/tags", json={"tag_ids": sorted(new) + sorted(new)})
+    assert resp.status_code == 200
+    assert resp.get_json()["added"] == len(new)
+    assert resp.get_json()["removed"] == len(old)
+    assert tag_set(app, "event_tags", "event_id", 1) == new
+    assert rec_state.rec_index.event_tag_ids(1) == new
+    assert catalog_version(app) == before + 1
+    assert cached() == {104}
+
+
+def test_invalid_event_tag_batch_writes_nothing(app, client):
+    old = tag_set(app, "event_tags", "event_id", 1)
+    before = catalog_version(app)
+    cache(101, tag_ids=old)
+
+    resp = client.put("/events/1/tags", json={"tag_ids": [1, 2, 999]})
+    assert resp.status_code == 400
+    assert tag_set(app, "event_tags", "event_id", 1) == old
+    assert rec_state.rec_index.event_tag_ids(1) == old
+    assert catalog_version(app) == before
+    assert cached() == {101}
+
+
+def event_count(app):
+    return version(app, "SELECT COUNT(*) FROM event")
+
+
+def test_admin_created_event_gets_its_tags(app, client, admin):
+    resp = client.post("/admin/events", headers=admin, json={
+        "title": "Tagged", "event_date": "2099-04-01", "tag_ids": [2, "3", 2]
+    })
+    assert resp.status_code == 201
+    with app.app_context():
+        event_id = db.session.execute(
+            text("SELECT event_id FROM event WHERE title = 'Tagged'")
+        ).scalar()
+    assert tag_set(app, "event_tags", "event_id", event_id) == {2, 3}
+    assert rec_state.rec_index.event_tag_ids(event_id) == {2, 3}
+
+
+@pytest.mark.parametrize("tag_ids", [[1, 999], [1, "x"], "1,2", None])
+def test_invalid_admin_event_tags_write_nothing(app, client, admin, tag_ids):
+    events = event_count(app)
+    before = catalog_version(app)
+
+    resp = client.post("/admin/events", headers=admin, json={
+        "title": "Tagged", "event_date": "2099-04-01", "tag_ids": tag_ids
+    })
+    assert resp.status_code == 400
+    assert event_count(app) == events
+    assert catalog_version(app) == before
@@ -0,0 +1,89 @@
+from cache import RecommendationCache
+
+
+def filled(**kwargs):
+    cache = RecommendationCache(**kwargs)
+    cache.put(1, {10, 11}, ["a"])
+    cache.put(1, {10, 11}, ["a-hybrid"], variant="hybrid")
+    cache.put(2, {11}, ["b"], event_ids=[500])
+    cache.put(3, {12}, ["c"])
+    return cache
+
+
+def keys(cache):
+    return set(cache._data)
+
+
+def test_invalidate_student_drops_every_variant_of_that_student():
+    cache = filled()
+    cache.invalidate_student(1)
+    assert keys(cache) == {(2, None), (3, None)}
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_invalidate_tags_drops_students_holding_them():
+    cache = filled()
+    cache.invalidate_tags([11])
+    assert keys(cache) == {(3, None)}
+    cache.invalidate_tags([99])
+    assert keys(cache) == {(3, None)}
+
+
+def test_invalidate_event_drops_tag_holders_and_rankings_listing_it():
+    cache = filled()
+    cache.invalidate_event(500, [12])
+    assert keys(cache) == {(1, None), (1, "hybrid")}
+
+
+def test_hits_misses_and_expiry():
+    now = [0.0]
+    cache = filled(ttl=10, clock=lambda: now[0])
+    assert cache.get_for(1) == ["a"]
+    assert cache.get_for(1, "hybrid") == ["a-hybrid"]
+    assert cache.get_for(4) is None
+    now[0] = 11
+    assert cache.get_for(2) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_evicted_entries_leave_no_index_behind():
+    cache = filled(maxsize=2)
+    assert keys(cache) == {(2, None), (3, None)}
+    assert set(cache._by_student) == {2, 3}
+    assert set(cache._by_tag) == {11, 12}
+    assert set(cache._by_event) == {500}
+    cache.invalidate_event(500, [])
+    assert set(cache._by_event) == set() and keys(cache) == {(3, None)}
+
+
+def test_interest_and_event_tag_routes_invalidate_precisely(app, client):
+    import rec_state
+    from sqlalchemy import text
+    from models import db
+
+    with app.app_context():
+        held = {r.tag_id for r in db.session.execute(
+            text("SELECT tag_id FROM student_interests WHERE student_id = 1")
+        )}
+        on_event = {r.tag_id for r in db.session.execute(
+            text("SELECT tag_id FROM event_tags WHERE event_id = 5")
+        )}
+    new_interest = min(set(range(1, 9)) - held)
+    new_event_tag = min(set(range(1, 9)) - on_event)
+    other_tag = min(set(range(1, 9)) - on_event - {new_event_tag})
+
+    for student_id in (1, 2, 3):
+        assert client.get(f"/ai/recommend/{student_id}").status_code == 200
+    cached = rec_state.rec_cache._by_student
+    assert set(cached) == {1, 2, 3}
+
+    resp = client.post("/students/1/interests", json={"tag_id": new_interest})
+    assert resp.status_code == 201
+    assert set(cached) == {2, 3}
+
+    rec_state.rec_cache.put(201, {new_event_tag}, ["x"])
+    rec_state.rec_cache.put(202, {other_tag}, ["y"])
+    resp = client.post("/events/5/tags", json={"tag_id": new_event_tag})
+    assert resp.status_code == 201
+    assert 201 not in cached and 202 in cached
@@ -0,0 +1,54 @@
+import pytest
+
+from cache import CatalogCache
+
+
+@pytest.mark.parametrize("path", ["/events", "/tags", "/events/upcoming"])
+def test_unchanged_catalog_revalidates_with_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    stale = client.get(path, headers={"If-None-Match": '"something-else"'})
+    assert stale.status_code == 200
+    assert stale.data == first.data
+
+
+def test_event_write_changes_the_etag(client, admin):
+    first = client.get("/admin/events", headers=admin)
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+    events_etag = client.get("/events").headers["ETag"]
+
+    assert client.post("/events", json={
+        "title": "Fresh", "event_date": "2099-03-01"
+    }).status_code == 201
+
+    changed = client.get("/admin/events", headers={**admin, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert "Fresh" in {e["title"] for e in changed.get_json()}
+    resp = client.get("/events", headers={"If-None-Match": events_etag})
+    assert resp.status_code == 200
+
+
+def test_bump_makes_older_bodies_unreachable():
+    cache = CatalogCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"[%d]" % len(builds)
+
+    body, etag = cache.get_or_build("events", build)
+    assert cache.get_or_build("events", build) == (body, etag)
+    cache.bump()
+    new_body, new_etag = cache.get_or_build("events", build)
+    assert (new_body, len(builds)) == (b"[2]", 2)
+    assert new_etag != etag
@@ -0,0 +1,103 @@
+from sqlalchemy import text
+
+import counters
+from models import db
+
+
+def maintained():
+    events = {
+        r.event_id: (r.yes_count, r.no_count, r.maybe_count, r.waitlist_count)
+        for r in db.session.execute(text("SELECT * FROM event_rsvp_counts"))
+        if (r.yes_count, r.no_count, r.maybe_count, r.waitlist_count) != (0, 0, 0, 0)
+    }
+    departments = {
+        r.department_id: r.participation_count
+        for r in db.session.execute(text("SELECT * FROM department_participation"))
+        if r.participation_count
+    }
+    return events, departments
+
+
+def recounted():
+    # what counters.rebuild() would write, without writing it
+    events = {
+        r.event_id: (r.yes, r.no, r.maybe, r.waitlist)
+        for r in db.session.execute(text("""
+            SELECT event_id,
+                   SUM(rsvp_status = 'YES') AS yes,
+                   SUM(rsvp_status = 'NO') AS no,
+                   SUM(rsvp_status = 'MAYBE') AS maybe,
+                   SUM(rsvp_status = 'WAITLIST') AS waitlist
+            FROM rsvps GROUP BY event_id
+        """))
+    }
+    departments = dict(db.session.execute(text("""
+        SELECT s.department_id, COUNT(*)
+        FROM rsvps r JOIN student s ON r.student_id = s.student_id
+        WHERE s.department_id IS NOT NULL
+        GROUP BY s.department_id
+    """)).fetchall())
+    return events, departments
+
+
+def unrsvped_event(student_id):
+    return db.session.execute(text("""
+        SELECT MIN(event_id) FROM event
+        WHERE event_id NOT IN (SELECT event_id FROM rsvps WHERE student_id = :sid)
+    """), {"sid": student_id}).scalar()
+
+
+def test_routes_keep_counters_equal_to_a_rebuild(app, client, admin):
+    with app.app_context():
+        assert maintained() == recounted()
+        event_id = unrsvped_event(1)
+        student = db.session.execute(
+            text("SELECT email, department_id FROM student WHERE student_id = 1")
+        ).fetchone()
+        other_department = db.session.execute(
+            text("SELECT MIN(department_id) FROM department WHERE department_id != :d"),
+            {"d": student.department_id}
+        ).scalar()
+        doomed = db.session.execute(
+            text("SELECT event_id FROM rsvps WHERE student_id = 2 LIMIT 1")
+        ).scalar()
+
+    assert client.post("/rsvp", json={
+        "student_id": 1, "event_id": event_id, "status": "MAYBE"
+    }).status_code == 201
+    assert client.put("/rsvp", json={
+        "student_id": 1, "event_id": event_id, "status": "NO"
+    }).status_code == 200
+    assert client.post("/students", json={
+        "email": student.email, "department_id": other_department
+    }).status_code == 200
+    assert client.delete(f"/admin/events/{doomed}", headers=admin).status_code == 200
+
+    with app.app_context():
+        assert maintained() == recounted()
+
+
+def test_record_rsvps_deltas(app):
+    with app.app_context():
+        event_id = unrsvped_event(1)
+        before, _ = maintained()
+        before = before.get(event_id, (0, 0, 0, 0))
+
+        # a new YES and a MAYBE, then the MAYBE becomes a NO and the YES
+        # is written again unchanged
+        new_rows = counters.record_rsvps(
+            {(1, event_id): "YES", (2, event_id): "MAYBE"}, {},
+            {1: None, 2: None}
+        )
+        assert new_rows == {event_id: 2}
+        new_rows = counters.record_rsvps(
+            {(1, event_id): "YES", (2, event_id): "NO"},
+            {(1, event_id): "YES", (2, event_id): "MAYBE"},
+            {1: None, 2: None}
+        )
+        assert new_rows == {}
+
+        after, _ = maintained()
+        yes, no, maybe, waitlist = before
+        assert after[event_id] == (yes + 1, no + 1, maybe, waitlist)
+        db.session.rollback()
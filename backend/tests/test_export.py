@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import text
+
+import export
+from models import db
+
+
+def event_rsvps(app, event_id):
+    with app.app_context():
+        return [
+            dict(r._mapping) for r in db.session.execute(text("""
+                SELECT r.student_id, s.email, r.rsvp_status
+                FROM rsvps r JOIN student s ON r.student_id = s.student_id
+                WHERE r.event_id = :eid ORDER BY r.student_id
+            """), {"eid": event_id})
+        ]
+
+
+def busiest_event(app):
+    with app.app_context():
+        return db.session.execute(text(
+            "SELECT event_id FROM rsvps GROUP BY event_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    # several batches even on the test data
+    monkeypatch.setattr(export.export_response, "__defaults__", (2,))
+
+
+def test_ndjson_export_streams_every_rsvp(app, client, admin, small_batches):
+    event_id = busiest_event(app)
+    resp = client.get(f"/admin/events/{event_id}/rsvps/export", headers=admin)
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    assert resp.headers["Content-Disposition"] == \
+        f'attachment; filename="event-{event_id}-rsvps.ndjson"'
+
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    expected = event_rsvps(app, event_id)
+    assert len(expected) > 2
+    assert [
+        {k: line[k] for k in ("student_id", "email", "rsvp_status")} for line in lines
+    ] == expected
+
+
+def test_csv_export_has_a_header_and_every_row(app, client, admin, small_batches):
+    event_id = busiest_event(app)
+    resp = client.get(
+        f"/admin/events/{event_id}/rsvps/export?format=csv", headers=admin
+    )
+    assert resp.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(resp.data.decode())))
+    assert [
+        {"student_id": int(r["student_id"]), "email": r["email"], "rsvp_status": r["rsvp_status"]}
+        for r in rows
+    ] == event_rsvps(app, event_id)
+
+
+def test_empty_csv_export_is_the_header(app, client, admin):
+    with app.app_context():
+        event_id = db.session.execute(text(
+            "INSERT INTO event (title, event_date) VALUES ('Empty', '2099-01-01')"
+        )).lastrowid
+        db.session.commit()
+    resp = client.get(f"/admin/events/{event_id}/rsvps/export?format=csv", headers=admin)
+    assert resp.data.decode().splitlines() == [
+        "student_id,fname,lname,email,rsvp_status,rsvp_time"
+    ]
+
+
+def test_department_export_and_bad_format(app, client, admin):
+    resp = client.get("/admin/analytics/department-participation/export", headers=admin)
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    with app.app_context():
+        departments = db.session.execute(text("SELECT COUNT(*) FROM department")).scalar()
+        total = db.session.execute(text("SELECT COUNT(*) FROM rsvps")).scalar()
+    assert len(lines) == departments
+    assert sum(line["participation_count"] for line in lines) == total
+
+    resp = client.get(
+        "/admin/analytics/department-participation/export?format=xml", headers=admin
+    )
+    assert resp.status_code == 400
+
+
+def test_chunks_are_emitted_per_batch():
+    batches = [[(1, "a")], [(2, "b"), (3, "c")]]
+    assert list(export.ndjson_chunks(["id", "name"], iter(batches))) == [
+        '{"id": 1, "name": "a"}\n',
+        '{"id": 2, "name": "b"}\n{"id": 3, "name": "c"}\n'
+    ]
+    assert list(export.csv_chunks(["id", "name"], iter(batches))) == [
+        "id,name\r\n1,a\r\n", "2,b\r\n3,c\r\n"
+    ]
@@ -0,0 +1,81 @@
+from ai.index import RecommendationIndex
+
+
+def loaded_index():
+    index = RecommendationIndex()
+    index.load([1, 2, 3, 4], [
+        {"event_id": 10, "title": "Robotics", "tag_ids": [1, 2]},
+        {"event_id": 11, "title": "Drama", "tag_ids": [3]},
+        {"event_id": 12, "title": "Hackathon", "tag_ids": [1]},
+        {"event_id": 13, "title": "Untagged", "tag_ids": []},
+    ])
+    return index
+
+
+def ranked(index, tags):
+    return [r["event_id"] for r in index.recommend(tags)]
+
+
+def test_writes_reach_the_next_recommendation():
+    index = loaded_index()
+    assert ranked(index, [1]) == [12, 10]
+
+    index.upsert_event(14, "Robot Wars", tag_ids=[1], event_date=None)
+    assert ranked(index, [1]) == [12, 14, 10]
+
+    index.add_event_tag(11, 1)
+    assert index.event_tag_ids(11) == {1, 3}
+    assert 11 in ranked(index, [1])
+
+    index.set_event_tags(10, [4])
+    assert ranked(index, [4]) == [10]
+    assert 10 not in ranked(index, [1])
+
+    index.update_event(12, "Hackathon 2.0")
+    assert index.recommend([1], top_k=1)[0]["title"] == "Hackathon 2.0"
+
+    index.remove_event(12)
+    assert index.event_tag_ids(12) == set()
+    assert 12 not in ranked(index, [1])
+
+
+def test_writes_to_unknown_events_are_ignored():
+    index = loaded_index()
+    index.add_event_tag(99, 1)
+    index.set_event_tags(99, [1])
+    index.update_event(99, "Nowhere")
+    index.remove_event(99)
+    assert ranked(index, [1]) == [12, 10]
+
+
+def test_writes_after_a_snapshot_load_patch_a_private_copy():
+    source = loaded_index()
+    index = RecommendationIndex()
+    index.load_snapshot("v1", source.snapshot_arrays())
+    assert ranked(index, [1]) == ranked(source, [1])
+    assert index.event_tag_ids(10) == {1, 2}
+
+    index.upsert_event(14, "Robot Wars", tag_ids=[1])
+    assert ranked(index, [1]) == [12, 14, 10]
+    assert index.event_tag_ids(11) == {3}
+    # the snapshot it was mapped from stays as published
+    assert ranked(source, [1]) == [12, 10]
+
+
+def test_only_events_sharing_a_tag_are_scored():
+    index = loaded_index()
+    stats = {}
+    results = index.recommend([1, 4], stats=stats)
+    # postings of tags 1 and 4: Robotics and Hackathon; Drama and the
+    # untagged event are never candidates
+    assert stats == {"candidates": 2, "total": 2}
+    assert [r["event_id"] for r in results] == [12, 10]
+    assert all(r["score"] > 0 for r in results)
+
+    stats = {}
+    assert index.recommend([1], top_k=1, stats=stats)[0]["event_id"] == 12
+    assert stats == {"candidates": 2, "total": 2}
+
+    stats = {}
+    assert index.recommend([99], stats=stats) == []
+    assert stats == {"candidates": 0, "total": 0}
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+
+from metrics import RouteProfiler
+
+
+@pytest.mark.parametrize("path", [
+    "/metrics/db-pool", "/metrics/routes", "/metrics/rsvp-queue", "/metrics/catalog-cache"
+])
+def test_metrics_are_admin_only(client, admin, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=admin).status_code == 200
+
+
+def test_profiled_request_runs_alone(tmp_path):
+    profiler = RouteProfiler()
+    app = Flask(__name__)
+    profiler.install(
+        app, create_engine("sqlite://"), sample_rate=1.0, slow_ms=0,
+        profile_dir=str(tmp_path)
+    )
+    started, release = threading.Event(), threading.Event()
+    order = []
+
+    @app.route("/slow")
+    def slow():
+        started.set()
+        release.wait(5)
+        order.append("slow")
+        return "ok"
+
+    @app.route("/fast")
+    def fast():
+        order.append("fast")
+        return "ok"
+
+    def get(path):
+        app.test_client().get(path)
+
+    slow_thread = threading.Thread(target=get, args=("/slow",))
+    slow_thread.start()
+    assert started.wait(5)
+    fast_thread = threading.Thread(target=get, args=("/fast",))
+    fast_thread.start()
+    # /slow is being profiled, so /fast waits at before_request
+    time.sleep(0.2)
+    assert order == []
+
+    release.set()
+    slow_thread.join(5)
+    fast_thread.join(5)
+    assert order == ["slow", "fast"]
+    assert profiler.profiles_dumped == 2
+    assert len(list(tmp_path.glob("*.prof"))) == 2
+
+
+def test_requests_in_flight_are_not_sampled(tmp_path):
+    profiler = RouteProfiler()
+    app = Flask(__name__)
+    profiler.install(
+        app, create_engine("sqlite://"), sample_rate=1.0, slow_ms=0,
+        profile_dir=str(tmp_path)
+    )
+    with app.test_request_context("/"):
+        # another request already in flight: this one runs unprofiled
+        profiler._in_flight = 1
+        profiler._begin()
+        assert profiler._local.profile is None
+        profiler._end(None)
+    assert (profiler._in_flight, profiler.profiles_dumped) == (1, 0)
@@ -0,0 +1,80 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import pagination
+
+
+def next_link(resp):
+    link = resp.headers.get("Link")
+    if link is None:
+        return None
+    url, rel = link.split(";")
+    assert rel.strip() == 'rel="next"'
+    parts = urlsplit(url.strip("<>"))
+    return f"{parts.path}?{parts.query}", parse_qs(parts.query)
+
+
+def walk(client, url):
+    # follow Link rel="next" to the end; -> (items, pages)
+    items, pages = [], 0
+    while url:
+        resp = client.get(url)
+        assert resp.status_code == 200
+        items += resp.get_json()
+        pages += 1
+        link = next_link(resp)
+        if link is not None:
+            assert link[1]["after"] == [resp.headers["X-Next-Cursor"]]
+        url = link and link[0]
+    return items, pages
+
+
+def test_default_page_is_cut_and_says_so(app, client):
+    from sqlalchemy import text
+    from models import db
+
+    # 50 students from datagen, 70 more: past PAGE_DEFAULT_LIMIT
+    with app.app_context():
+        db.session.execute(
+            text("INSERT INTO student (email, password_hash) VALUES (:email, 'x')"),
+            [{"email": f"extra{i}@bench.test"} for i in range(70)]
+        )
+        db.session.commit()
+
+    first = client.get("/students")
+    assert len(first.get_json()) == pagination.PAGE_DEFAULT_LIMIT
+    assert next_link(first) is not None
+
+    items, pages = walk(client, "/students")
+    assert [s["student_id"] for s in items] == list(range(1, 121))
+    assert pages == 2
+
+
+@pytest.mark.parametrize("url, key", [
+    ("/students?limit=7&fields=email", "email"),
+    ("/events?limit=6", "event_id"),
+    ("/students/1/rsvps?limit=1", "event_id"),
+])
+def test_pages_cover_the_list_exactly_once(client, url, key):
+    items, pages = walk(client, url)
+    ids = [item[key] for item in items]
+    assert len(ids) == len(set(ids))
+    assert pages > 1
+
+    limit = int(parse_qs(urlsplit(url).query)["limit"][0])
+    everything = client.get(url.replace(f"limit={limit}", "limit=1000")).get_json()
+    assert items == everything
+    assert next_link(client.get(url.replace(f"limit={limit}", "limit=1000"))) is None
+
+
+@pytest.mark.parametrize("query", [
+    "limit=0", "limit=1001", "limit=ten", "after=nope", "fields=password_hash"
+])
+def test_out_of_bounds_arguments_are_rejected(client, query):
+    assert client.get(f"/students?{query}").status_code == 400
+
+
+def test_fields_project_the_items(client):
+    items = client.get("/students?limit=3&fields=email").get_json()
+    assert [set(item) for item in items] == [{"email"}] * 3
@@ -0,0 +1,54 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from ai.ranker import HybridRanker, day_number
+
+
+def test_day_number():
+    assert day_number("2026-10-18") == datetime.date(2026, 10, 18).toordinal()
+    assert day_number(datetime.datetime(2026, 10, 18, 9, 30)) == day_number("2026-10-18")
+    assert np.isnan(day_number(None))
+
+
+def test_blend_weights_each_signal():
+    ranker = HybridRanker(w_similarity=1.0, w_popularity=0.5, w_recency=0.25,
+                          half_life_days=10)
+    similarity = np.array([0.5, 1.0, 0.0])
+    popularity = np.array([0, np.e - 1, 0])         # log1p -> 0, 1, 0
+    days_until = np.array([0.0, 10.0, np.nan])      # recency 1, 0.5, none
+
+    scores = ranker.score(similarity, popularity, days_until)
+
+    np.testing.assert_allclose(scores, [
+        0.5 + 0.0 + 0.25,
+        1.0 + 0.5 + 0.125,
+        0.0
+    ])
+
+
+def test_rank_drops_past_events_and_orders_best_first():
+    ranker = HybridRanker(w_similarity=1.0, w_popularity=0.0, w_recency=0.0)
+    similarity = np.array([0.9, 0.2, 0.7, 0.4])
+    popularity = np.zeros(4)
+    days_until = np.array([-1.0, 3.0, np.nan, 5.0])
+
+    order, scores = ranker.rank(similarity, popularity, days_until, top_k=2)
+
+    assert order.tolist() == [2, 3]
+    np.testing.assert_allclose(scores, [0.7, 0.4])
+
+
+@pytest.mark.parametrize("bad", ["18/10/2026", "tomorrow", 20261018])
+def test_bad_event_date_is_rejected_and_recommend_keeps_working(client, bad):
+    resp = client.post("/events", json={"title": "Fest", "event_date": bad})
+    assert resp.status_code == 400
+
+    assert client.get("/ai/recommend/1").status_code == 200
+
+
+def test_event_date_is_stored_parsed(client):
+    resp = client.post("/events", json={"title": "Fest", "event_date": "2026-10-18"})
+    assert resp.status_code == 201
+    assert client.get("/ai/recommend/1?mode=hybrid").status_code == 200
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import text
+
+import rec_state
+from ai import snapshot
+from config import Config
+from models import db
+
+
+@pytest.fixture
+def snapshots(app, tmp_path, monkeypatch):
+    # snapshot mode with CURRENT and cache_versions checked on every request
+    root = str(tmp_path / "snapshots")
+    monkeypatch.setattr(Config, "REC_SNAPSHOT_DIR", root)
+    monkeypatch.setattr(Config, "REC_SNAPSHOT_CHECK_SECONDS", 0)
+    monkeypatch.setattr(Config, "SYNC_CHECK_SECONDS", 0)
+    monkeypatch.setattr(rec_state, "_versions", {})
+    monkeypatch.setattr(rec_state, "_student_versions", {})
+    monkeypatch.setattr(rec_state, "_students_since", None)
+    monkeypatch.setattr(rec_state, "_snapshot_checked", 0.0)
+    monkeypatch.setattr(rec_state, "_republish_after", 0.0)
+    monkeypatch.setattr(rec_state, "_republisher", None)
+    rec_state.rec_index.reset()
+    return root
+
+
+def write_event(title):
+    # what another worker's admin_create_event commits
+    event_id = db.session.execute(text(
+        "INSERT INTO event (title, event_date) VALUES (:title, '2099-01-01')"
+    ), {"title": title}).lastrowid
+    db.session.execute(text(
+        "INSERT INTO event_tags (event_id, tag_id) VALUES (:eid, 1)"
+    ), {"eid": event_id})
+    db.session.execute(rec_state.BUMP_VERSION, {"name": "catalog"})
+    db.session.commit()
+    return event_id
+
+
+def wait_for_republish():
+    if rec_state._republisher is not None:
+        rec_state._republisher.join(timeout=30)
+
+
+def test_first_worker_publishes_and_maps(app, snapshots):
+    with app.app_context():
+        rec_state.get_rec_index()
+    assert snapshot.current_version(snapshots) == rec_state.rec_index.snapshot_version
+    assert rec_state.rec_index._events is None   # mapped, not a private copy
+
+
+def test_worker_on_an_old_snapshot_catches_up(app, snapshots):
+    with app.app_context():
+        rec_state.publish_rec_snapshot(snapshots)
+        event_id = write_event("After the snapshot")
+
+        # the snapshot predates the write, so this worker starts one
+        rec_state.get_rec_index()
+        old = rec_state.rec_index.snapshot_version
+        wait_for_republish()
+        rec_state.get_rec_index()
+
+    manifest, _ = snapshot.load(snapshots)
+    assert rec_state.rec_index.snapshot_version == manifest["version"] != old
+    assert manifest["catalog_version"] == rec_state._versions["catalog"]
+    assert rec_state.rec_index.event_tag_ids(event_id) == {1}
+    assert rec_state.rec_index._events is None
+
+
+def test_other_workers_event_write_republishes(app, client, snapshots, monkeypatch):
+    assert client.get("/ai/recommend/1").status_code == 200
+    assert rec_state.rec_index.snapshot_version is not None
+
+    def reload(*args, **kwargs):
+        raise AssertionError("worker built its own index from the DB")
+    with app.app_context():
+        event_id = write_event("Elsewhere")
+        # the republish builds into a fresh index, never the mapped one
+        load = rec_state.load_rec_index
+        monkeypatch.setattr(
+            rec_state, "load_rec_index",
+            lambda neighbors=True, index=rec_state.rec_index:
+                reload() if index is rec_state.rec_index else load(neighbors, index)
+        )
+
+    assert client.get("/ai/recommend/1").status_code == 200
+    wait_for_republish()
+    assert client.get("/ai/recommend/2").status_code == 200
+    assert rec_state.rec_index.event_tag_ids(event_id) == {1}
+    assert rec_state.rec_index._events is None
+
+
+def test_up_to_date_snapshot_is_not_republished(app, snapshots):
+    with app.app_context():
+        first = rec_state.publish_rec_snapshot(snapshots)
+        assert rec_state.publish_rec_snapshot(snapshots, only_if_behind=True) == first
+
+
+def test_publishing_lock_is_exclusive(tmp_path):
+    with snapshot.publishing(str(tmp_path)) as held:
+        assert held
+        # flock is per open file description, so a second open conflicts
+        with snapshot.publishing(str(tmp_path), blocking=False) as again:
+            assert not again
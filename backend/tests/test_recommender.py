@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from ai.recommender import EventRecommender
+from ai.utils import top_k_indices
+from ai.vectorizer import TagVectorizer
+
+
+def loop_recommend(vectorizer, student_tag_ids, events):
+    # the per-event loop EventRecommender.recommend replaced
+    recommender = EventRecommender(vectorizer)
+    student_vec = vectorizer.vectorize(student_tag_ids)
+    scored = [
+        {
+            "event_id": e["event_id"],
+            "title": e["title"],
+            "score": recommender.cosine_similarity(
+                student_vec, vectorizer.vectorize(e["tag_ids"])
+            )
+        }
+        for e in events
+    ]
+    scored.sort(key=lambda x: x["score"], reverse=True)
+    return scored
+
+
+def random_catalog(rng, tags=6, events=200):
+    # few tags, so many events share a score; some events have none, and
+    # some name tags the vectorizer does not know
+    tag_ids = list(range(1, tags + 1))
+    catalog = [
+        {
+            "event_id": i,
+            "title": f"Event {i}",
+            "tag_ids": rng.choice(tags + 2, size=rng.integers(0, 4), replace=False).tolist()
+        }
+        for i in range(events)
+    ]
+    return tag_ids, catalog
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_ranking_matches_the_loop(seed):
+    rng = np.random.default_rng(seed)
+    tag_ids, events = random_catalog(rng)
+    recommender = EventRecommender(TagVectorizer(tag_ids))
+
+    for student in ([], [1], [2, 5], [1, 3, 4, 6], [99]):
+        expected = loop_recommend(TagVectorizer(tag_ids), student, events)
+        got = recommender.recommend(student, events)
+        assert [r["event_id"] for r in got] == [r["event_id"] for r in expected]
+        assert [r["score"] for r in got] == pytest.approx([r["score"] for r in expected])
+
+        for k in (0, 1, 7, 50):
+            top = recommender.recommend(student, events, top_k=k)
+            assert [r["event_id"] for r in top] == [r["event_id"] for r in expected[:k]]
+
+
+def test_top_k_keeps_input_order_among_ties():
+    scores = np.array([0.5, 1.0, 0.5, 0.2, 1.0, 0.5, 0.5])
+    assert top_k_indices(scores, 4).tolist() == [1, 4, 0, 2]
+    assert top_k_indices(scores).tolist() == [1, 4, 0, 2, 5, 6, 3]
+    assert top_k_indices(scores, 0).tolist() == []
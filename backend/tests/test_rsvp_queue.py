@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import rsvp_queue
+from rsvp_queue import RSVPQueue
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rsvp_queue.time, "sleep", lambda s: None)
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def write_spill(path, items):
+    with open(path, "w") as f:
+        for s, e, status in items:
+            f.write(json.dumps({"student_id": s, "event_id": e, "status": status}) + "\n")
+
+
+def test_failed_batch_spills_to_a_file_of_this_process(tmp_path):
+    def failing(batch):
+        raise RuntimeError("db down")
+
+    spill = tmp_path / "spill.ndjson"
+    q = RSVPQueue(failing, spill_file=str(spill))
+    assert q.submit(1, 2, "YES")
+    q.stop()
+
+    assert os.listdir(tmp_path) == [f"spill.ndjson.{os.getpid()}"]
+    assert q.spilled == 1
+
+
+def test_writer_replays_orphaned_spill_files(tmp_path):
+    written = []
+
+    def writer(batch):
+        written.extend(batch)
+        return {"written": len(batch), "invalid": 0}
+
+    spill = tmp_path / "spill.ndjson"
+    write_spill(f"{spill}.{dead_pid()}", [(1, 10, "YES")])
+    write_spill(f"{spill}.{os.getpid()}", [(2, 10, "NO")])
+    write_spill(str(spill), [(3, 10, "MAYBE")])
+    # a live worker's file is still being appended to; not ours to take
+    live = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        write_spill(f"{spill}.{live.pid}", [(4, 10, "YES")])
+
+        q = RSVPQueue(writer, spill_file=str(spill))
+        q._replay_spill()
+        assert sorted(written) == [(1, 10, "YES"), (2, 10, "NO"), (3, 10, "MAYBE")]
+        assert os.listdir(tmp_path) == [f"spill.ndjson.{live.pid}"]
+    finally:
+        live.kill()
+        live.wait()
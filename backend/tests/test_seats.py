@@ -0,0 +1,120 @@
+from sqlalchemy import text
+
+import rec_state
+from models import db
+
+
+def new_event(app, capacity):
+    with app.app_context():
+        event_id = db.session.execute(text(
+            "INSERT INTO event (title, event_date, capacity) "
+            "VALUES ('Workshop', '2099-02-01', :capacity)"
+        ), {"capacity": capacity}).lastrowid
+        db.session.commit()
+    return event_id
+
+
+def seats(app, event_id):
+    with app.app_context():
+        taken = db.session.execute(
+            text("SELECT seats_taken FROM event WHERE event_id = :eid"), {"eid": event_id}
+        ).scalar()
+        statuses = dict(db.session.execute(
+            text("SELECT student_id, rsvp_status FROM rsvps WHERE event_id = :eid"),
+            {"eid": event_id}
+        ).fetchall())
+        counts = db.session.execute(text(
+            "SELECT yes_count, waitlist_count FROM event_rsvp_counts WHERE event_id = :eid"
+        ), {"eid": event_id}).fetchone()
+    return taken, statuses, tuple(counts)
+
+
+def rsvp(client, student_id, event_id, status="YES"):
+    return client.post("/rsvp", json={
+        "student_id": student_id, "event_id": event_id, "status": status
+    }).get_json()["status"]
+
+
+def change(client, student_id, event_id, status):
+    return client.put("/rsvp", json={
+        "student_id": student_id, "event_id": event_id, "status": status
+    }).get_json()
+
+
+def cache(*student_ids):
+    for student_id in student_ids:
+        rec_state.rec_cache.put(student_id, (), ["ranked"])
+
+
+def cached():
+    return set(rec_state.rec_cache._by_student)
+
+
+def test_yes_past_capacity_waits_and_is_promoted_in_order(app, client):
+    event_id = new_event(app, capacity=2)
+    assert [rsvp(client, s, event_id) for s in (1, 2, 3, 4)] == \
+        ["YES", "YES", "WAITLIST", "WAITLIST"]
+    assert rsvp(client, 5, event_id, "MAYBE") == "MAYBE"
+    assert seats(app, event_id) == (
+        2, {1: "YES", 2: "YES", 3: "WAITLIST", 4: "WAITLIST", 5: "MAYBE"}, (2, 2)
+    )
+
+    # asking for YES again keeps the seat, or the place in line
+    assert change(client, 1, event_id, "YES")["status"] == "YES"
+    assert change(client, 4, event_id, "YES")["status"] == "WAITLIST"
+
+    body = change(client, 1, event_id, "NO")
+    assert (body["status"], body["promoted"]) == ("NO", [3])
+    taken, statuses, counts = seats(app, event_id)
+    assert (taken, statuses[3], statuses[4], counts) == (2, "YES", "WAITLIST", (2, 1))
+
+    # leaving the waitlist frees nothing
+    assert change(client, 4, event_id, "MAYBE")["promoted"] == []
+    assert seats(app, event_id)[0] == 2
+
+
+def test_capacity_raise_promotes_and_cut_keeps_seats(app, client, admin):
+    event_id = new_event(app, capacity=1)
+    for s in (1, 2, 3):
+        rsvp(client, s, event_id)
+
+    def update(capacity):
+        return client.put(f"/admin/events/{event_id}", headers=admin, json={
+            "title": "Workshop", "event_date": "2099-02-01", "capacity": capacity
+        })
+
+    assert update(3).status_code == 200
+    taken, statuses, _ = seats(app, event_id)
+    assert (taken, set(statuses.values())) == (3, {"YES"})
+
+    assert update(1).status_code == 200
+    assert seats(app, event_id)[0] == 3
+    assert rsvp(client, 4, event_id) == "WAITLIST"
+
+    assert update(-1).status_code == 400
+    # lifting the limit seats the whole waitlist
+    assert update(None).status_code == 200
+    assert seats(app, event_id)[1][4] == "YES"
+    assert rsvp(client, 5, event_id) == "YES"
+
+
+def test_unlimited_event_never_waitlists(app, client):
+    event_id = new_event(app, capacity=None)
+    assert [rsvp(client, s, event_id) for s in range(1, 11)] == ["YES"] * 10
+    assert seats(app, event_id)[0] == 10
+
+
+def test_promotion_drops_the_promoted_rankings(app, client, admin):
+    event_id = new_event(app, capacity=1)
+    for s in (1, 2, 3, 4):
+        rsvp(client, s, event_id)
+
+    cache(1, 2, 3, 4)
+    assert change(client, 1, event_id, "NO")["promoted"] == [2]
+    assert cached() == {3, 4}
+
+    cache(1, 2)
+    assert client.put(f"/admin/events/{event_id}", headers=admin, json={
+        "title": "Workshop", "event_date": "2099-02-01", "capacity": 2
+    }).status_code == 200
+    assert cached() == {1, 2, 4}
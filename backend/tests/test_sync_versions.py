@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import text
+
+import rec_state
+from config import Config
+from models import db
+
+
+@pytest.fixture
+def synced(app, client, monkeypatch):
+    # check cache_versions on every request, starting from a clean slate
+    monkeypatch.setattr(Config, "SYNC_CHECK_SECONDS", 0)
+    monkeypatch.setattr(rec_state, "_versions", {})
+    monkeypatch.setattr(rec_state, "_student_versions", {})
+    monkeypatch.setattr(rec_state, "_students_since", None)
+    assert client.get("/events").status_code == 200
+    return client
+
+
+def test_other_workers_event_write_reaches_this_worker(app, synced):
+    with app.app_context():
+        # what another worker's admin_create_event commits
+        event_id = db.session.execute(text(
+            "INSERT INTO event (title, event_date) VALUES ('Elsewhere', '2099-01-01')"
+        )).lastrowid
+        db.session.execute(text(
+            "INSERT INTO event_tags (event_id, tag_id) VALUES (:eid, 1)"
+        ), {"eid": event_id})
+        db.session.execute(rec_state.BUMP_VERSION, {"name": "catalog"})
+        db.session.commit()
+
+    titles = [e["title"] for e in synced.get("/events").get_json()]
+    assert "Elsewhere" in titles
+    assert rec_state.rec_index.event_tag_ids(event_id) == {1}
+
+
+def test_own_write_does_not_reload_the_index(synced, monkeypatch):
+    resp = synced.post("/events", json={"title": "Here", "event_date": "2099-01-02"})
+    assert resp.status_code in (200, 201)
+
+    def reload(*args, **kwargs):
+        raise AssertionError("index reloaded for this worker's own write")
+    monkeypatch.setattr(rec_state, "load_rec_index", reload)
+    titles = [e["title"] for e in synced.get("/events").get_json()]
+    assert "Here" in titles
+
+
+def cached_students():
+    return set(rec_state.rec_cache._by_student)
+
+
+def test_other_workers_interest_write_drops_only_that_student(app, synced):
+    for student_id in (1, 2):
+        assert synced.get(f"/ai/recommend/{student_id}").status_code == 200
+    assert cached_students() == {1, 2}
+
+    with app.app_context():
+        # what another worker's replace_student_interests commits
+        db.session.execute(rec_state.BUMP_STUDENT, {"sid": 1})
+        db.session.commit()
+
+    synced.get("/ai/recommend/2")
+    assert cached_students() == {2}
+
+
+def test_own_interest_write_is_not_caught_up_again(synced):
+    synced.get("/ai/recommend/2")
+    assert synced.put("/students/1/interests", json={"tag_ids": [1, 2]}).status_code == 200
+    assert rec_state._student_versions[1] == 1
+
+    synced.get("/ai/recommend/1")
+    synced.get("/ai/recommend/2")
+    assert cached_students() == {1, 2}
+
+
+def test_rolled_back_bump_is_forgotten(app, synced):
+    with app.app_context():
+        rec_state.bump_version("catalog")
+        db.session.rollback()
+    assert "catalog" not in rec_state._versions
+
+
+def test_other_workers_rsvps_reach_popularity(app, synced, monkeypatch):
+    monkeypatch.setattr(Config, "REC_POPULARITY_SYNC_SECONDS", 0)
+    with app.app_context():
+        db.session.execute(text(
+            "UPDATE event_rsvp_counts SET yes_count = yes_count + 100 WHERE event_id = 1"
+        ))
+        db.session.commit()
+        expected = db.session.execute(text(
+            "SELECT yes_count + no_count + maybe_count + waitlist_count "
+            "FROM event_rsvp_counts WHERE event_id = 1"
+        )).scalar()
+
+    synced.get("/ai/recommend/1")
+    state = rec_state.rec_index._current_state()
+    assert state.popularity[state.row(1)] == expected
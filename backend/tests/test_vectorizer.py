@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from ai.recommender import EventRecommender
+from ai.vectorizer import TagVectorizer
+
+
+def random_tag_sets(rng, count, tags=8):
+    # every fourth row has no tags; ids 0 and tags + 1 are unknown
+    return [
+        [] if i % 4 == 0
+        else rng.choice(tags + 2, size=rng.integers(1, 5), replace=False).tolist()
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(params=range(3))
+def catalog(request):
+    rng = np.random.default_rng(request.param)
+    tag_ids = list(range(1, 9))
+    return tag_ids, random_tag_sets(rng, 120), random_tag_sets(rng, 30)
+
+
+def test_csr_matches_the_dense_matrix(catalog):
+    tag_ids, event_tags, student_tags = catalog
+    dense = TagVectorizer(tag_ids).vectorize_many(event_tags)
+    sparse = TagVectorizer(tag_ids, sparse=True).vectorize_many(event_tags)
+
+    assert sparse.shape == dense.shape
+    np.testing.assert_array_equal(sparse.toarray(), dense)
+    np.testing.assert_allclose(sparse.row_norms(), np.linalg.norm(dense, axis=1))
+    assert sparse.row_norms()[0] == 0
+
+    vectorizer = TagVectorizer(tag_ids, sparse=True)
+    for tags in student_tags:
+        cols = vectorizer.indices(tags)
+        overlap = sparse.overlap(cols)
+        np.testing.assert_array_equal(overlap, dense @ TagVectorizer(tag_ids).vectorize(tags))
+
+        rows, counts = sparse.candidates(cols)
+        np.testing.assert_array_equal(rows, np.flatnonzero(overlap))
+        np.testing.assert_array_equal(counts, overlap[rows])
+
+
+def test_sparse_scores_match_dense(catalog):
+    tag_ids, event_tags, student_tags = catalog
+    dense = EventRecommender(TagVectorizer(tag_ids))
+    sparse = EventRecommender(TagVectorizer(tag_ids, sparse=True))
+    dense_matrix, dense_norms = dense.build_matrix([{"tag_ids": t} for t in event_tags])
+    sparse_matrix, sparse_norms = sparse.build_matrix([{"tag_ids": t} for t in event_tags])
+
+    for tags in student_tags:
+        expected = dense.score(tags, dense_matrix, dense_norms)
+        np.testing.assert_allclose(
+            sparse.score(tags, sparse_matrix, sparse_norms), expected
+        )
+        if not tags:
+            assert not expected.any()
+
+        rows, scores = sparse.score_candidates(tags, sparse_matrix, sparse_norms)
+        np.testing.assert_array_equal(rows, np.flatnonzero(expected))
+        np.testing.assert_allclose(scores, expected[rows])
+
+
+def test_sparse_ranking_matches_dense(catalog):
+    tag_ids, event_tags, student_tags = catalog
+    events = [
+        {"event_id": i, "title": f"Event {i}", "tag_ids": tags}
+        for i, tags in enumerate(event_tags)
+    ]
+    dense = EventRecommender(TagVectorizer(tag_ids))
+    sparse = EventRecommender(TagVectorizer(tag_ids, sparse=True))
+    for tags in student_tags:
+        assert [r["event_id"] for r in sparse.recommend(tags, events, top_k=10)] == \
+            [r["event_id"] for r in dense.recommend(tags, events, top_k=10)]
+
+
+def test_empty_matrix():
+    sparse = TagVectorizer([1, 2], sparse=True).vectorize_many([])
+    assert sparse.shape == (0, 2)
+    assert len(sparse.row_norms()) == 0
+    rows, counts = sparse.candidates(np.array([0], dtype=np.int32))
+    assert len(rows) == 0 and len(counts) == 0
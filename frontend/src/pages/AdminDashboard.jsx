@@ -1,15 +1,15 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { useAuth } from "@clerk/clerk-react";
 
-const userId = localStorage.getItem("user_id");
+export default function AdminDashboard() {
+  const { getToken } = useAuth();
 
-const authHeaders = {
-  headers: {
-    "X-User-Id": userId,
-  },
-};
+  // admin routes verify the Clerk session token
+  async function authHeaders() {
+    return { headers: { Authorization: `Bearer ${await getToken()}` } };
+  }
 
-export default function AdminDashboard() {
   const [events, setEvents] = useState([]);
   const [tags, setTags] = useState([]);
   const [selectedTags, setSelectedTags] = useState([]);
@@ -27,9 +27,9 @@ export default function AdminDashboard() {
     fetchTags();
   }, []);
 
-  function fetchEvents() {
+  async function fetchEvents() {
     axios
-      .get("http://127.0.0.1:5000/admin/events", authHeaders)
+      .get("http://127.0.0.1:5000/admin/events", await authHeaders())
       .then((res) => setEvents(res.data));
   }
 
@@ -45,7 +45,7 @@ export default function AdminDashboard() {
     );
   }
 
-  function addEvent() {
+  async function addEvent() {
     axios
       .post(
         "http://127.0.0.1:5000/admin/events",
@@ -53,7 +53,7 @@ export default function AdminDashboard() {
           ...form,
           tag_ids: selectedTags,
         },
-        authHeaders
+        await authHeaders()
       )
       .then(() => {
         fetchEvents();